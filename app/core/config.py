@@ -6,7 +6,54 @@ class Settings(BaseSettings):
     app_name: str = "AIVA Platform"
     environment: str = "local"
     gemini_api_key: str | None = None
+    gemini_base_url: str | None = None
     allowed_origins: str = ""
+    gemini_max_in_flight: int = 64
+    gemini_http_max_connections: int = 64
+    gemini_http_max_keepalive: int = 20
+    gemini_http_keepalive_expiry_seconds: float = 120.0
+    gemini_http2: bool = False
+    gemini_connect_timeout_seconds: float = 3.0
+    gemini_write_timeout_seconds: float = 10.0
+    gemini_pool_timeout_seconds: float = 5.0
+    gemini_generate_timeout_seconds: float = 30.0
+    gemini_stream_timeout_seconds: float = 30.0
+    gemini_cache_timeout_seconds: float = 10.0
+    request_deadline_seconds: float = 55.0
+    gemini_min_call_budget_seconds: float = 1.0
+    gemini_retry_max_attempts: int = 3
+    gemini_retry_base_seconds: float = 0.5
+    gemini_retry_max_seconds: float = 8.0
+    insights_cache_ttl_seconds: int = 300
+    insights_cache_max_entries: int = 256
+    spending_aggregates_max_users: int = 10000
+    spending_aggregates_max_ids_per_user: int = 100000
+    gemini_quota_per_minute: int = 15
+    gemini_quota_burst: int | None = None
+    gemini_quota_backend: str = "memory"
+    gemini_quota_sqlite_path: str = "/tmp/aiva-quota.sqlite3"
+    gemini_quota_redis_url: str = "redis://localhost:6379/0"
+    gemini_model_pool: str | None = None
+    gemini_router_cooldown_seconds: float = 30.0
+    gemini_router_probe_seconds: float = 30.0
+    max_prompt_chars: int = 16000
+    insights_batch_max_items: int = 25
+    insights_batch_max_chars: int = 120000
+    insights_batch_max_concurrency: int | None = None
+    gemini_context_cache_enabled: bool = True
+    gemini_context_cache_ttl_seconds: int = 3600
+    gemini_context_cache_refresh_seconds: int = 300
+    gemini_context_cache_min_tokens: int = 1024
+    insights_jobs_backend: str = "memory"
+    insights_jobs_sqlite_path: str = "/tmp/aiva-jobs.sqlite3"
+    insights_jobs_max_pending: int = 1000
+    insights_jobs_workers: int = 2
+    insights_jobs_max_attempts: int = 20
+    insights_jobs_lease_seconds: int = 300
+    insights_jobs_result_ttl_seconds: int = 3600
+    insights_fallback_mode: str = "auto"
+    server_timing_sample_rate: float = 1.0
+    startup_prewarm: bool = True
 
     model_config = {"env_file": ".env"}
 
@@ -2,31 +2,76 @@
 Circuit breaker for external API calls.
 Prevents cascading failures when external services (like Gemini API) fail.
 """
+import math
+import threading
 import time
 from typing import Optional
 
+from app.helpers.deadline import DeadlineExceededError
+from app.helpers.quota import QuotaExceededError
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the service while the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            f"Circuit breaker '{name}' is OPEN. Service unavailable. "
+            f"Retry in {math.ceil(retry_after)} seconds."
+        )
+
 
 class CircuitBreaker:
     """
-    Simple circuit breaker implementation.
+    Thread-safe circuit breaker driven by a sliding failure-rate window.
 
     States:
     - CLOSED: Normal operation, requests pass through
     - OPEN: Service is failing, requests fail fast
-    - HALF_OPEN: Testing if service recovered
+    - HALF_OPEN: Testing if service recovered (one probe request at a time)
+
+    Outcomes are counted in time buckets covering the last `window_seconds`.
+    The circuit opens once at least `minimum_calls` were made in the window
+    and the share of failures reaches `failure_rate_threshold`.
     """
 
-    def __init__(self, failure_threshold: int = 3, timeout: int = 60):
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5,
+                 minimum_calls: int = 3, window_seconds: int = 60,
+                 bucket_count: int = 10, timeout: int = 60,
+                 ignored_exceptions: tuple = ()):
         """
         Args:
-            failure_threshold: Number of failures before opening circuit
+            name: Dependency name, used in errors and monitoring
+            failure_rate_threshold: Failure share (0-1) that opens the circuit
+            minimum_calls: Calls needed in the window before the rate counts
+            window_seconds: Length of the sliding window
+            bucket_count: Number of time buckets the window is split into
             timeout: Seconds to wait before attempting recovery
+            ignored_exceptions: Exceptions that pass through without counting
+                as failures (e.g. local rejections that never reached the service)
         """
-        self.failure_threshold = failure_threshold
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.bucket_count = bucket_count
         self.timeout = timeout
-        self.failure_count = 0
-        self.last_failure_time: Optional[float] = None
+        self.ignored_exceptions = ignored_exceptions
+
+        self._bucket_width = window_seconds / bucket_count
+        # Each bucket: [epoch, successes, failures]
+        self._buckets = [[-1, 0, 0] for _ in range(bucket_count)]
+        self._lock = threading.Lock()
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
         self.state = "CLOSED"
+        self.last_failure_time: Optional[float] = None
+        self.rejected_count = 0
+        # (from state, to state) -> count, for monitoring
+        self.transitions: dict[tuple[str, str], int] = {}
 
     def call(self, func, *args, **kwargs):
         """
@@ -36,49 +81,223 @@ class CircuitBreaker:
             Function result if successful
 
         Raises:
-            Exception: If circuit is open or function fails
+            CircuitOpenError: If circuit is open (or a probe is already running)
+            Exception: Whatever the function raised
         """
-        if self.state == "OPEN":
-            if time.time() - self.last_failure_time >= self.timeout:
-                self.state = "HALF_OPEN"
-            else:
-                wait_time = int(
-                    self.timeout - (time.time() - self.last_failure_time))
-                raise Exception(
-                    f"Circuit breaker is OPEN. Service unavailable. "
-                    f"Retry in {wait_time} seconds."
-                )
+        is_probe = self._before_call()
 
         try:
             result = func(*args, **kwargs)
-            self._on_success()
-            return result
-        except Exception as e:
-            self._on_failure()
-            raise e
+        except self.ignored_exceptions:
+            self._release_probe(is_probe)
+            raise
+        except Exception:
+            self._on_failure(is_probe)
+            raise
+        except BaseException:
+            self._release_probe(is_probe)
+            raise
+
+        self._on_success(is_probe)
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """
+        Execute a coroutine function through circuit breaker.
+
+        Same semantics as call(), but awaits the result so the event loop
+        is never blocked while the external service is slow. Cancellation
+        releases a half-open probe without counting as a failure.
+        """
+        is_probe = self._before_call()
+
+        try:
+            result = await func(*args, **kwargs)
+        except self.ignored_exceptions:
+            self._release_probe(is_probe)
+            raise
+        except Exception:
+            self._on_failure(is_probe)
+            raise
+        except BaseException:
+            self._release_probe(is_probe)
+            raise
+
+        self._on_success(is_probe)
+        return result
+
+    async def call_stream(self, func, *args, **kwargs):
+        """
+        Start a streaming call through circuit breaker.
+
+        `func` is awaited until the stream has started and returns an async
+        iterator of chunks. A failure to start counts as in call_async();
+        after that the call counts when the stream ends, so a stream that
+        breaks part-way is a failure. A half-open probe is settled as soon
+        as the stream starts, so its slot never waits on a client that
+        stops reading.
+
+        Returns:
+            The chunks, wrapped so the stream's outcome is recorded
+        """
+        is_probe = self._before_call()
 
-    def _on_success(self):
+        try:
+            chunks = await func(*args, **kwargs)
+        except self.ignored_exceptions:
+            self._release_probe(is_probe)
+            raise
+        except Exception:
+            self._on_failure(is_probe)
+            raise
+        except BaseException:
+            self._release_probe(is_probe)
+            raise
+
+        if is_probe:
+            self._on_success(is_probe)
+        return self._monitor_stream(chunks, record_success=not is_probe)
+
+    async def _monitor_stream(self, chunks, record_success: bool):
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except self.ignored_exceptions:
+            raise
+        except Exception:
+            self._on_failure(False)
+            raise
+        if record_success:
+            self._on_success(False)
+
+    def _before_call(self) -> bool:
+        """
+        Decide whether a call may go through.
+
+        Returns:
+            True if this call is the half-open probe
+
+        Raises:
+            CircuitOpenError: If the call must fail fast
+        """
+        with self._lock:
+            if self.state == "CLOSED":
+                return False
+
+            now = time.monotonic()
+            if self.state == "OPEN":
+                remaining = self._opened_at + self.timeout - now
+                if remaining > 0:
+                    self.rejected_count += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._set_state("HALF_OPEN")
+
+            # HALF_OPEN: let exactly one probe through
+            if self._probe_in_flight:
+                self.rejected_count += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self._probe_in_flight = True
+            return True
+
+    def _on_success(self, is_probe: bool):
         """Handle successful call."""
-        self.failure_count = 0
-        if self.state == "HALF_OPEN":
-            self.state = "CLOSED"
+        with self._lock:
+            self._record(failed=False)
+            if is_probe:
+                self._probe_in_flight = False
+                self._set_state("CLOSED")
+                self._opened_at = None
+                self._reset_window()
 
-    def _on_failure(self):
+    def _on_failure(self, is_probe: bool):
         """Handle failed call."""
-        self.failure_count += 1
-        self.last_failure_time = time.time()
+        with self._lock:
+            self._record(failed=True)
+            self.last_failure_time = time.time()
+
+            if is_probe:
+                self._probe_in_flight = False
+                self._open()
+            elif self.state == "CLOSED":
+                calls, failures = self._window_totals()
+                if calls >= self.minimum_calls and \
+                        failures / calls >= self.failure_rate_threshold:
+                    self._open()
+
+    def _release_probe(self, is_probe: bool):
+        """Free the probe slot without changing state."""
+        if is_probe:
+            with self._lock:
+                self._probe_in_flight = False
+
+    def _open(self):
+        self._set_state("OPEN")
+        self._opened_at = time.monotonic()
+
+    def _set_state(self, state: str):
+        key = (self.state, state)
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.state = state
 
-        if self.failure_count >= self.failure_threshold:
-            self.state = "OPEN"
+    def _record(self, failed: bool):
+        epoch = int(time.monotonic() // self._bucket_width)
+        bucket = self._buckets[epoch % self.bucket_count]
+        if bucket[0] != epoch:
+            bucket[0], bucket[1], bucket[2] = epoch, 0, 0
+        bucket[2 if failed else 1] += 1
+
+    def _window_totals(self) -> tuple[int, int]:
+        """Return (calls, failures) recorded in the current window."""
+        oldest = int(time.monotonic() // self._bucket_width) - self.bucket_count + 1
+        calls = failures = 0
+        for epoch, successes, fails in self._buckets:
+            if epoch >= oldest:
+                calls += successes + fails
+                failures += fails
+        return calls, failures
+
+    def _reset_window(self):
+        for bucket in self._buckets:
+            bucket[0], bucket[1], bucket[2] = -1, 0, 0
 
     def get_state(self) -> dict:
         """Get current circuit breaker state."""
-        return {
-            "state": self.state,
-            "failure_count": self.failure_count,
-            "last_failure_time": self.last_failure_time,
-        }
+        with self._lock:
+            calls, failures = self._window_totals()
+            retry_after = None
+            if self.state == "OPEN":
+                retry_after = max(
+                    0.0, round(self._opened_at + self.timeout - time.monotonic(), 1))
+            return {
+                "state": self.state,
+                "failure_count": failures,
+                "calls_in_window": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "last_failure_time": self.last_failure_time,
+                "retry_after": retry_after,
+                "rejected_count": self.rejected_count,
+            }
+
+
+def _gemini_breaker(name: str) -> CircuitBreaker:
+    # Running out of a request's own time budget says nothing about Gemini;
+    # a hung upstream still trips the breaker through the HTTP read timeout
+    return CircuitBreaker(
+        name,
+        failure_rate_threshold=0.5,
+        minimum_calls=3,
+        window_seconds=60,
+        timeout=60,
+        ignored_exceptions=(QuotaExceededError, DeadlineExceededError),
+    )
+
 
+# One breaker per dependency so a failing route can't trip the others
+insights_circuit_breaker = _gemini_breaker("insights")
+checkin_circuit_breaker = _gemini_breaker("checkin")
+hello_circuit_breaker = _gemini_breaker("hello")
 
-# THIS LINE IS CRITICAL - Make sure it's at the bottom
-gemini_circuit_breaker = CircuitBreaker(failure_threshold=3, timeout=60)
+circuit_breakers: dict[str, CircuitBreaker] = {
+    breaker.name: breaker
+    for breaker in (insights_circuit_breaker, checkin_circuit_breaker, hello_circuit_breaker)
+}
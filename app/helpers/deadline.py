@@ -0,0 +1,146 @@
+"""
+Per-request deadlines and client-disconnect cancellation.
+
+Cloud Run stops waiting for a response after its request timeout, and a
+user who closes the tab stops waiting much sooner. Without a deadline the
+app still waits out (and pays quota for) a Gemini call nobody will read.
+
+`DeadlineMiddleware` gives each HTTP request a deadline that model calls
+read through `call_budget()`: a call that cannot fit in the time left is
+not started, and one that runs past it is cancelled. The middleware also
+watches for `http.disconnect` while the route runs and cancels the route,
+along with any upstream call it is awaiting, as soon as the client goes
+away. Work outside a request, such as queued jobs, has no deadline.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from app.helpers.metrics import work_saved
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline leaves no time for (or cuts short) a model call."""
+
+    def __init__(self, remaining: float):
+        self.remaining = remaining
+        super().__init__(
+            f"Request deadline too close for a model call ({max(remaining, 0.0):.1f} s left)."
+        )
+
+
+class Deadline:
+    """The monotonic time by which a request must have answered."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, budget_seconds: float):
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_current: ContextVar[Deadline | None] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _current.get()
+    if deadline is None:
+        return None
+    return deadline.remaining()
+
+
+def call_budget(min_seconds: float) -> float | None:
+    """
+    Time an upstream call may take within the current request's deadline.
+
+    Args:
+        min_seconds: Least time worth starting a call with
+
+    Returns:
+        Seconds left, or None if there is no deadline
+
+    Raises:
+        DeadlineExceededError: If less than `min_seconds` is left
+    """
+    left = remaining()
+    if left is not None and left < min_seconds:
+        work_saved.inc(("deadline_skipped",))
+        raise DeadlineExceededError(left)
+    return left
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that sets a deadline per request and cancels the
+    request when the client disconnects.
+
+    It is the only reader of the server's `receive`: messages are handed to
+    the app through a queue, so a disconnect is seen even while the route
+    is busy awaiting something else.
+
+    Args:
+        app: The wrapped ASGI app
+        budget_seconds: Time each request gets; 0 disables both deadline
+            and disconnect cancellation
+        skip_paths: Paths passed straight through (e.g. scrape endpoints)
+    """
+
+    def __init__(self, app, budget_seconds: float, skip_paths=("/metrics",)):
+        self.app = app
+        self.budget_seconds = budget_seconds
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths or self.budget_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def send_wrapper(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        token = _current.set(Deadline(self.budget_seconds))
+        try:
+            # Created after the deadline is set, so the route's context carries it
+            handler = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+        finally:
+            _current.reset(token)
+
+        async def listen():
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete and not handler.done():
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        listener = asyncio.ensure_future(listen())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            work_saved.inc(("client_disconnect",))
+            logger.info(f"Client disconnected; cancelled {scope['method']} {scope['path']}")
+        finally:
+            listener.cancel()
+            if not handler.done():
+                # This task was cancelled (e.g. at shutdown) rather than the
+                # route: take the route, and its upstream call, down with it
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
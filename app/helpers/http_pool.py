@@ -0,0 +1,176 @@
+"""
+Shared, tuned HTTP connection pool for the Gemini SDK.
+
+The SDK's default httpx client sends every request with `timeout=None`
+unless a timeout is configured, so a stalled connection or slow upstream
+can hold a request for as long as the platform allows. It also keeps at
+most 20 idle connections, so bursts above that open (and TLS-handshake)
+fresh connections and then throw them away.
+
+`PooledAsyncClient` is handed to the SDK instead. It keeps a sized
+keep-alive pool (HTTP/2 if GEMINI_HTTP2 is set and the `h2` package is
+installed), applies separate connect / read / pool timeouts per Gemini
+endpoint whenever the SDK leaves the timeout unset, and counts connection
+reuse and pool saturation for /health/gemini-pool and /metrics.
+"""
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Tuple
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Matched against the request path, in order; the first hit picks the timeouts
+ENDPOINTS: Tuple[Tuple[str, str], ...] = (
+    (":streamGenerateContent", "stream"),
+    (":generateContent", "generate"),
+    ("/cachedContents", "cache"),
+)
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PoolStats:
+    """Connection reuse and saturation counters for one pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        # Requests that arrived with every pooled connection already busy
+        self.saturated_requests = 0
+        self.timeouts: Counter = Counter()
+        self.http_versions: Counter = Counter()
+        self.max_connections = 0
+        self.http2 = False
+
+    async def trace(self, event: str, info: dict) -> None:
+        """httpcore trace hook: sees each new connection and TLS handshake."""
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def get_stats(self) -> dict:
+        reused = max(0, self.requests - self.connections_opened)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reused_requests": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_connections": self.max_connections,
+            "saturated_requests": self.saturated_requests,
+            "timeouts": dict(self.timeouts),
+            "http_versions": dict(self.http_versions),
+            "http2": self.http2,
+        }
+
+
+class PooledAsyncClient(httpx.AsyncClient):
+    """
+    httpx client with per-endpoint default timeouts and pool statistics.
+
+    Args:
+        endpoint_timeouts: Endpoint kind ("generate", "stream", "cache") -> timeouts
+            used when a request is sent without an explicit timeout
+        stats: Counters to update
+        **kwargs: Passed to httpx.AsyncClient (limits, http2, timeout, ...)
+    """
+
+    def __init__(self, endpoint_timeouts: Dict[str, httpx.Timeout], stats: PoolStats, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint_timeouts = endpoint_timeouts
+        self.stats = stats
+        limits = kwargs.get("limits")
+        stats.max_connections = (limits.max_connections if limits else None) or 0
+        stats.http2 = bool(kwargs.get("http2"))
+
+    def endpoint(self, url: httpx.URL) -> str | None:
+        path = url.path
+        for marker, kind in ENDPOINTS:
+            if marker in path:
+                return kind
+        return None
+
+    def build_request(self, method, url, *, timeout=httpx.USE_CLIENT_DEFAULT, **kwargs):
+        request = super().build_request(method, url, timeout=timeout, **kwargs)
+        # The SDK passes timeout=None when none is configured, which httpx
+        # reads as "no timeout at all"
+        if timeout is None or timeout is httpx.USE_CLIENT_DEFAULT:
+            endpoint_timeout = self.endpoint_timeouts.get(self.endpoint(request.url))
+            if endpoint_timeout is not None:
+                request.extensions["timeout"] = endpoint_timeout.as_dict()
+        request.extensions["trace"] = self.stats.trace
+        return request
+
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response:
+        stats = self.stats
+        stats.requests += 1
+        if stats.max_connections and stats.in_flight >= stats.max_connections:
+            stats.saturated_requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            response = await super().send(request, **kwargs)
+        except httpx.TimeoutException as e:
+            stats.timeouts[type(e).__name__] += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+        stats.http_versions[response.http_version] += 1
+        return response
+
+
+def _timeout(read: float) -> httpx.Timeout:
+    settings = get_settings()
+    return httpx.Timeout(connect=settings.gemini_connect_timeout_seconds, read=read,
+                         write=settings.gemini_write_timeout_seconds,
+                         pool=settings.gemini_pool_timeout_seconds)
+
+
+def build_pooled_client(stats: PoolStats) -> PooledAsyncClient:
+    """A client sized and timed from settings."""
+    settings = get_settings()
+    http2 = settings.gemini_http2 and http2_available()
+    if settings.gemini_http2 and not http2:
+        logger.warning("GEMINI_HTTP2 is set but the h2 package is not installed "
+                       "(pip install 'httpx[http2]'); using HTTP/1.1")
+    return PooledAsyncClient(
+        endpoint_timeouts={
+            "generate": _timeout(settings.gemini_generate_timeout_seconds),
+            "stream": _timeout(settings.gemini_stream_timeout_seconds),
+            "cache": _timeout(settings.gemini_cache_timeout_seconds),
+        },
+        stats=stats,
+        timeout=_timeout(settings.gemini_generate_timeout_seconds),
+        limits=httpx.Limits(
+            max_connections=settings.gemini_http_max_connections,
+            max_keepalive_connections=settings.gemini_http_max_keepalive,
+            keepalive_expiry=settings.gemini_http_keepalive_expiry_seconds,
+        ),
+        http2=http2,
+    )
+
+
+@lru_cache
+def get_gemini_http_client() -> PooledAsyncClient:
+    """The process-wide pool used by the Gemini client."""
+    return build_pooled_client(gemini_http_stats)
+
+
+gemini_http_stats = PoolStats()
@@ -0,0 +1,458 @@
+"""
+Bounded job queue and worker pool for slow AI work.
+
+Callers submit a job and get an id back immediately; a small pool of
+asyncio workers drains the queue and stores each job's result or error for
+polling. Jobs that hit the shared Gemini quota or an open circuit are put
+back with a delay instead of failing, so the pool drains at whatever rate
+the quota allows.
+
+Stores:
+- memory: per-process queue (local development, single instance)
+- sqlite: file-backed queue that survives restarts and can be shared by
+  processes on one host; a crashed worker's job is picked up again once
+  its lease runs out
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs."""
+
+    def __init__(self, pending: int):
+        self.pending = pending
+        super().__init__(f"Job queue is full ({pending} pending).")
+
+
+class JobRetryLater(Exception):
+    """Raised by a job handler to put the job back after a delay."""
+
+    def __init__(self, retry_after: float, detail: str):
+        self.retry_after = retry_after
+        self.detail = detail
+        super().__init__(detail)
+
+
+class JobFailedError(Exception):
+    """Raised by a job handler when the job cannot succeed."""
+
+    def __init__(self, detail: str, status_code: int = 500):
+        self.detail = detail
+        self.status_code = status_code
+        super().__init__(detail)
+
+
+def _new_job(kind: str, payload: Dict[str, Any], now: float) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "status_code": None,
+        "attempts": 0,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "available_at": now,
+    }
+
+
+class JobStore(ABC):
+    """Interface for job storage."""
+
+    # True if calls do blocking I/O and should run off the event loop
+    blocking_io = False
+
+    @abstractmethod
+    def submit(self, kind: str, payload: Dict[str, Any], now: float) -> Dict[str, Any]:
+        """
+        Enqueue a job and return it.
+
+        Raises:
+            JobQueueFullError: If max_pending jobs are already waiting or running
+        """
+
+    @abstractmethod
+    def claim(self, now: float) -> Optional[Dict[str, Any]]:
+        """Mark the oldest available job as running and return it."""
+
+    @abstractmethod
+    def complete(self, job_id: str, result: Any, now: float) -> None:
+        """Mark a running job done with its result."""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str, status_code: int, now: float) -> None:
+        """Mark a job failed with an error message and HTTP status code."""
+
+    @abstractmethod
+    def defer(self, job_id: str, available_at: float) -> None:
+        """Put a running job back in the queue, not claimable before available_at."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job by id, or None if it is unknown."""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status."""
+
+
+class MemoryJobStore(JobStore):
+    """Per-process job store."""
+
+    def __init__(self, max_pending: int, result_ttl: float):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: List[str] = []
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, kind, payload, now):
+        with self._lock:
+            self._prune(now)
+            pending = sum(1 for job in self._jobs.values() if job["status"] in (QUEUED, RUNNING))
+            if pending >= self.max_pending:
+                raise JobQueueFullError(pending)
+            job = _new_job(kind, payload, now)
+            self._jobs[job["id"]] = job
+            self._queue.append(job["id"])
+            return dict(job)
+
+    def claim(self, now):
+        with self._lock:
+            for i, job_id in enumerate(self._queue):
+                job = self._jobs[job_id]
+                if job["available_at"] <= now:
+                    del self._queue[i]
+                    job.update(status=RUNNING, started_at=now, attempts=job["attempts"] + 1)
+                    return dict(job)
+            return None
+
+    def complete(self, job_id, result, now):
+        with self._lock:
+            self._jobs[job_id].update(status=SUCCEEDED, result=result, finished_at=now)
+
+    def fail(self, job_id, error, status_code, now):
+        with self._lock:
+            self._jobs[job_id].update(
+                status=FAILED, error=error, status_code=status_code, finished_at=now)
+
+    def defer(self, job_id, available_at):
+        with self._lock:
+            self._jobs[job_id].update(status=QUEUED, available_at=available_at)
+            self._queue.append(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def counts(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+
+class SQLiteJobStore(JobStore):
+    """
+    File-backed job store shared by every process on one host.
+    Uses BEGIN IMMEDIATE so concurrent claims serialise on the file lock.
+    """
+
+    blocking_io = True
+
+    _COLUMNS = ("id", "kind", "status", "payload", "result", "error", "status_code",
+                "attempts", "created_at", "started_at", "finished_at", "available_at")
+
+    def __init__(self, path: str, max_pending: int, result_ttl: float, lease_seconds: float):
+        self.path = path
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+            " payload TEXT NOT NULL, result TEXT, error TEXT, status_code INTEGER,"
+            " attempts INTEGER NOT NULL, created_at REAL NOT NULL, started_at REAL,"
+            " finished_at REAL, available_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, available_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row) -> Dict[str, Any]:
+        job = dict(zip(self._COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def submit(self, kind, payload, now):
+        job = _new_job(kind, payload, now)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                         (now - self.result_ttl,))
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise JobQueueFullError(pending)
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self._COLUMNS)})",
+                tuple(json.dumps(job[c]) if c == "payload" else job[c] for c in self._COLUMNS),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return job
+
+    def claim(self, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Running jobs whose lease ran out belong to a worker that died
+            row = conn.execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM jobs"
+                " WHERE (status = ? AND available_at <= ?) OR (status = ? AND available_at <= ?)"
+                " ORDER BY created_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job = self._row_to_job(row)
+            job.update(status=RUNNING, started_at=now, attempts=job["attempts"] + 1,
+                       available_at=now + self.lease_seconds)
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = ?, available_at = ?"
+                " WHERE id = ?",
+                (RUNNING, now, job["attempts"], job["available_at"], job["id"]),
+            )
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, job_id, result, now):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+            (SUCCEEDED, json.dumps(result), now, job_id),
+        )
+
+    def fail(self, job_id, error, status_code, now):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, status_code = ?, finished_at = ? WHERE id = ?",
+            (FAILED, error, status_code, now, job_id),
+        )
+
+    def defer(self, job_id, available_at):
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, available_at = ? WHERE id = ?",
+            (QUEUED, available_at, job_id),
+        )
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(self._COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def counts(self):
+        counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for status, count in self._connect().execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobWorkerPool:
+    """
+    Runs queued jobs on asyncio worker tasks.
+
+    Args:
+        store: Where jobs live
+        handlers: Job kind -> async handler taking the job payload
+        workers: Number of concurrent worker tasks
+        max_attempts: Give up on a job after this many deferrals
+        poll_interval: Seconds an idle worker waits before checking again
+    """
+
+    def __init__(self, store: JobStore, handlers: Dict[str, JobHandler] | None = None,
+                 workers: int = 2, max_attempts: int = 20, poll_interval: float = 1.0):
+        self.store = store
+        self.handlers: Dict[str, JobHandler] = dict(handlers or {})
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self.succeeded = 0
+        self.failed = 0
+        self.deferred = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    async def _call(self, method, *args):
+        if self.store.blocking_io:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers. Interrupted jobs stay running until their lease ends."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Enqueue a job.
+
+        Raises:
+            JobQueueFullError: If the queue is full
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job = await self._call(self.store.submit, kind, payload, time.time())
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.store.get, job_id)
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            try:
+                job = await self._call(self.store.claim, time.time())
+            except Exception:
+                logger.warning("Job store unavailable", exc_info=True)
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        try:
+            result = await self.handlers[job["kind"]](job["payload"])
+        except JobRetryLater as e:
+            if job["attempts"] >= self.max_attempts:
+                self.failed += 1
+                await self._call(self.store.fail, job_id, e.detail, 503, time.time())
+                return
+            self.deferred += 1
+            logger.info(f"Job {job_id} deferred for {e.retry_after:.1f}s: {e.detail}")
+            await self._call(self.store.defer, job_id, time.time() + e.retry_after)
+        except JobFailedError as e:
+            self.failed += 1
+            await self._call(self.store.fail, job_id, e.detail, e.status_code, time.time())
+        except Exception:
+            logger.error(f"Job {job_id} crashed", exc_info=True)
+            self.failed += 1
+            await self._call(self.store.fail, job_id,
+                             "An unexpected error occurred while running the job.", 500,
+                             time.time())
+        else:
+            self.succeeded += 1
+            await self._call(self.store.complete, job_id, result, time.time())
+
+    def get_state(self) -> dict:
+        try:
+            counts = self.store.counts()
+        except Exception:
+            counts = None
+        return {
+            "backend": type(self.store).__name__,
+            "workers": self.workers,
+            "running": self.running,
+            "jobs": counts,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "deferred": self.deferred,
+        }
+
+
+def build_job_store(name: str) -> JobStore:
+    """Create the job store named in settings."""
+    settings = get_settings()
+    if name == "sqlite":
+        return SQLiteJobStore(
+            settings.insights_jobs_sqlite_path,
+            max_pending=settings.insights_jobs_max_pending,
+            result_ttl=settings.insights_jobs_result_ttl_seconds,
+            lease_seconds=settings.insights_jobs_lease_seconds,
+        )
+    if name == "memory":
+        return MemoryJobStore(
+            max_pending=settings.insights_jobs_max_pending,
+            result_ttl=settings.insights_jobs_result_ttl_seconds,
+        )
+    raise ValueError(f"Unknown job store: {name}")
+
+
+insight_jobs = JobWorkerPool(
+    store=build_job_store(get_settings().insights_jobs_backend),
+    workers=get_settings().insights_jobs_workers,
+    max_attempts=get_settings().insights_jobs_max_attempts,
+)
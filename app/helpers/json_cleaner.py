@@ -1,11 +1,16 @@
-import json
+import re
+from typing import Any, TypeVar
 
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
 
-def parse_ai_json(ai_text: str) -> dict:
-    """
-    Clean up AI output and parse it as JSON.
-    Handles cases where the model wraps JSON in ```json ... ``` fences.
-    """
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def strip_code_fences(ai_text: str) -> str:
+    """Remove the ```json ... ``` fences models sometimes wrap JSON in."""
     cleaned = ai_text.strip()
 
     # If the model wrapped the JSON in a markdown code block
@@ -18,5 +23,98 @@ def parse_ai_json(ai_text: str) -> dict:
             cleaned = cleaned[4:]  # remove 'json'
         cleaned = cleaned.strip()
 
-    # Now cleaned should be pure JSON text
-    return json.loads(cleaned)
+    return cleaned
+
+
+def parse_ai_json(ai_text: str) -> Any:
+    """
+    Clean up AI output and parse it as JSON.
+    Handles cases where the model wraps JSON in ```json ... ``` fences.
+
+    Raises:
+        json.JSONDecodeError: If the text is not JSON (orjson's error subclasses it)
+    """
+    return orjson.loads(strip_code_fences(ai_text))
+
+
+class StreamedStringField:
+    """
+    Decodes one string field of a JSON object while the JSON is still streaming.
+
+    Structured output arrives as JSON fragments; feeding them in returns the
+    field's text as soon as it is complete enough to decode, so a narrative
+    field can be shown before the rest of the object has been generated.
+    Escapes split across chunks are held back until they are whole.
+
+    Args:
+        name: Field to extract
+    """
+
+    def __init__(self, name: str):
+        self._key = re.compile(r'"%s"\s*:\s*"' % re.escape(name))
+        self._text = ""
+        self._pos: int | None = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of JSON text; return the field text decoded since the last call."""
+        self._text += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._key.search(self._text)
+            if match is None:
+                return ""
+            self._pos = match.end()
+
+        text, start = self._text, self._pos
+        end = start
+        while end < len(text):
+            char = text[end]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                end += 1
+                continue
+            width = 2
+            if text[end + 1:end + 2] == "u":
+                # A high surrogate is only decodable together with its low half
+                width = 12 if text[end + 2:end + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if end + width > len(text):
+                break
+            end += width
+        self._pos = end + 1 if self.done else end
+        return orjson.loads('"' + text[start:end] + '"') if end > start else ""
+
+
+def parse_ai_model(ai_text: str, model: type[ModelT]) -> ModelT:
+    """
+    Parse AI output straight into a Pydantic model in one validation pass.
+
+    Structured output is plain JSON and is validated as-is; only text that
+    starts with a code fence is cleaned up first.
+
+    Raises:
+        ValidationError: If the text is not JSON or does not fit the model
+    """
+    if ai_text.lstrip().startswith("```"):
+        ai_text = strip_code_fences(ai_text)
+    return model.model_validate_json(ai_text)
+
+
+def model_response(model: type[BaseModel], body: dict,
+                   response: Response | None = None) -> ORJSONResponse:
+    """
+    Render an already-validated body with the response model's full set of
+    fields, without FastAPI validating it a second time.
+
+    Args:
+        model: The route's response model
+        body: Validated field values
+        response: The route's injected Response, whose headers are kept
+    """
+    return ORJSONResponse(
+        model.model_construct(**body).model_dump(),
+        headers=dict(response.headers) if response is not None else None,
+    )
@@ -0,0 +1,223 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are updated on the hot path and cost one lock and
+a dict update per observation. State that components already track (cache
+hits, quota rejections, breaker state and transitions, job counts) is read
+by collectors only when /metrics is scraped, so it adds nothing per request.
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+# (metric name, labels, value) produced by a collector at scrape time
+Sample = Tuple[str, Dict[str, str], float]
+
+# Seconds; covers in-process routes (ms) up to slow Gemini calls (tens of s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed observations (e.g. latencies) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} "
+                             f"{cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders them."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # (name, type, help, collector)
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, name: str, kind: str, help_text: str,
+                  collect: Callable[[], Iterable[Sample]]) -> None:
+        """
+        Register a metric whose samples are read from elsewhere at scrape time.
+
+        Args:
+            name: Metric family name
+            kind: "counter" or "gauge"
+            help_text: HELP line
+            collect: Returns (sample name, labels, value) tuples
+        """
+        self._collectors.append((name, kind, help_text, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, kind, help_text, collect in self._collectors:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample, labels, value in collect():
+                lines.append(f"{sample}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                             f"{_format_value(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template,
+    method and status. Unmatched paths share one "unmatched" route label so
+    scanners cannot blow up the series count.
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            labels = (getattr(route, "path", None) or "unmatched", scope["method"], str(status[0]))
+            http_requests.inc(labels)
+            http_request_duration.observe(time.perf_counter() - start, labels)
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "aiva_http_requests_total", "HTTP requests by route, method and status.",
+    ("route", "method", "status"))
+http_request_duration = registry.histogram(
+    "aiva_http_request_duration_seconds", "HTTP request latency by route, method and status.",
+    ("route", "method", "status"))
+gemini_calls = registry.counter(
+    "aiva_gemini_calls_total", "Gemini API calls by model, call kind and outcome.",
+    ("model", "kind", "outcome"))
+gemini_call_duration = registry.histogram(
+    "aiva_gemini_call_duration_seconds", "Gemini API call latency by model, call kind and outcome.",
+    ("model", "kind", "outcome"))
+insights_degraded = registry.counter(
+    "aiva_insights_degraded_total", "Insights served by the rule-based fallback, by cause.",
+    ("cause",))
+gemini_retries = registry.counter(
+    "aiva_gemini_retries_total", "Gemini calls retried after a transient failure, by model and call kind.",
+    ("model", "kind"))
+work_saved = registry.counter(
+    "aiva_work_saved_total",
+    "Work avoided by request deadlines and cancellation (calls not started, cancelled or not retried), by kind.",
+    ("kind",))
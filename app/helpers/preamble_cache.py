@@ -0,0 +1,185 @@
+"""
+Preamble (system instruction) reuse through Gemini context caching.
+
+The AIVA persona, task list and JSON format instructions are the same on
+every insights and check-in call. They are registered here once, uploaded
+as Gemini cached content per model, and referenced by name on each call so
+only the per-request data is sent. Caches are refreshed shortly before they
+expire.
+
+Gemini only caches content above a minimum size. Preambles below
+`min_tokens` (estimated), or ones the API refuses to cache, are sent as a
+`system_instruction` instead. That still keeps the static text in one
+stable prefix, which Gemini's implicit prefix caching can reuse.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class _CacheEntry:
+    name: str
+    expires_at: float  # wall-clock seconds
+
+
+class PreambleCache:
+    """
+    Manages cached-content handles for registered preambles.
+
+    Args:
+        ttl_seconds: Lifetime requested for each cached content
+        refresh_margin_seconds: Refresh a cache this long before it expires
+        min_tokens: Smallest preamble (estimated tokens) worth caching
+        enabled: If False, preambles are always sent as system instructions
+        retry_seconds: How long to wait before retrying a failed cache create
+        clock: Wall-clock source, comparable with the API's expire_time
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, refresh_margin_seconds: int = 300,
+                 min_tokens: int = 1024, enabled: bool = True, retry_seconds: int = 300,
+                 clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds // 2)
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+
+        self._preambles: Dict[str, str] = {}
+        self._entries: Dict[Tuple[str, str], _CacheEntry] = {}
+        self._retry_after: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+        self.hits = 0
+        self.creates = 0
+        self.refreshes = 0
+        self.fallbacks = 0
+        self.errors = 0
+
+    def register(self, name: str, text: str) -> None:
+        """Register (or replace) a static preamble under a name."""
+        if self._preambles.get(name) != text:
+            self._preambles[name] = text
+            # Cached content for the old text is stale
+            for key in [k for k in self._entries if k[0] == name]:
+                del self._entries[key]
+
+    def text(self, name: str) -> str:
+        return self._preambles[name]
+
+    def _cacheable(self, name: str) -> bool:
+        return self.enabled and len(self._preambles[name]) / CHARS_PER_TOKEN >= self.min_tokens
+
+    def invalidate(self, name: str, model: str) -> None:
+        """Forget a cache handle, e.g. after the API reports it missing."""
+        self._entries.pop((name, model), None)
+
+    async def config_for(self, client, name: str, model: str) -> Dict[str, Any]:
+        """
+        Generation config that supplies the named preamble.
+
+        Returns:
+            {"cached_content": <name>} when a live cache exists (creating or
+            refreshing it if needed), else {"system_instruction": <text>}
+        """
+        text = self._preambles[name]
+        key = (name, model)
+        if not self._cacheable(name) or self._clock() < self._retry_after.get(key, 0.0):
+            self.fallbacks += 1
+            return {"system_instruction": text}
+
+        entry = self._entries.get(key)
+        if entry and self._clock() < entry.expires_at - self.refresh_margin_seconds:
+            self.hits += 1
+            return {"cached_content": entry.name}
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another caller may have refreshed while we waited
+            entry = self._entries.get(key)
+            if entry and self._clock() < entry.expires_at - self.refresh_margin_seconds:
+                self.hits += 1
+                return {"cached_content": entry.name}
+
+            try:
+                entry = await self._refresh(client, name, model, entry)
+            except Exception as e:
+                self.errors += 1
+                self._retry_after[key] = self._clock() + self.retry_seconds
+                self._entries.pop(key, None)
+                logger.warning(f"Context cache for preamble '{name}' unavailable: {e}")
+                self.fallbacks += 1
+                return {"system_instruction": text}
+
+            self._entries[key] = entry
+            return {"cached_content": entry.name}
+
+    async def _refresh(self, client, name: str, model: str,
+                       entry: _CacheEntry | None) -> _CacheEntry:
+        ttl = f"{self.ttl_seconds}s"
+        if entry is not None and self._clock() < entry.expires_at:
+            # Still alive: extend it rather than uploading again
+            try:
+                cached = await client.aio.caches.update(name=entry.name, config={"ttl": ttl})
+                self.refreshes += 1
+                return _CacheEntry(entry.name, self._expiry(cached))
+            except Exception:
+                logger.warning(f"Could not extend context cache '{entry.name}'; recreating")
+
+        cached = await client.aio.caches.create(
+            model=model,
+            config={
+                "system_instruction": self._preambles[name],
+                "display_name": f"aiva-{name}",
+                "ttl": ttl,
+            },
+        )
+        self.creates += 1
+        return _CacheEntry(cached.name, self._expiry(cached))
+
+    def _expiry(self, cached) -> float:
+        expire_time = getattr(cached, "expire_time", None)
+        if isinstance(expire_time, datetime):
+            return expire_time.timestamp()
+        return self._clock() + self.ttl_seconds
+
+    def get_state(self) -> Dict[str, Any]:
+        now = self._clock()
+        return {
+            "enabled": self.enabled,
+            "preambles": {
+                name: {
+                    "estimated_tokens": len(text) // CHARS_PER_TOKEN,
+                    "mode": "cached_content" if self._cacheable(name) else "system_instruction",
+                }
+                for name, text in self._preambles.items()
+            },
+            "live_caches": {
+                f"{name}@{model}": round(entry.expires_at - now, 1)
+                for (name, model), entry in self._entries.items()
+            },
+            "hits": self.hits,
+            "creates": self.creates,
+            "refreshes": self.refreshes,
+            "fallbacks": self.fallbacks,
+            "errors": self.errors,
+        }
+
+
+preamble_cache = PreambleCache(
+    ttl_seconds=get_settings().gemini_context_cache_ttl_seconds,
+    refresh_margin_seconds=get_settings().gemini_context_cache_refresh_seconds,
+    min_tokens=get_settings().gemini_context_cache_min_tokens,
+    enabled=get_settings().gemini_context_cache_enabled,
+)
@@ -0,0 +1,369 @@
+"""
+Token-bucket quota governor for the Gemini API.
+
+Gemini's free tier allows 20 requests/minute per API key, shared by every
+Cloud Run instance. The governor keeps the bucket in a pluggable backend so
+all instances can draw from the same budget, and rejects immediately when
+it is empty instead of paying for a slow upstream 429.
+
+Backends:
+- memory: per-process bucket (local development, single instance)
+- sqlite: file-backed bucket shared by processes on one host
+- redis:  bucket in a Redis-protocol server shared by the whole cluster
+"""
+import asyncio
+import logging
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceededError(Exception):
+    """Raised when no quota budget is left. Carries seconds until a token frees up."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            f"Gemini quota exhausted. Retry in {retry_after:.1f} seconds."
+        )
+
+
+def _refill(tokens: float, updated: float, capacity: float, rate: float,
+            now: float) -> tuple[float, float]:
+    """
+    Refill the bucket from `updated` to `now`.
+
+    Returns:
+        (token count, new timestamp). The timestamp never moves backwards, so
+        a caller holding a slightly stale `now` can't rewind the bucket.
+    """
+    if now <= updated:
+        return tokens, updated
+    return min(capacity, tokens + (now - updated) * rate), now
+
+
+def _take(tokens: float, rate: float) -> tuple[float, float]:
+    """
+    Try to take one token.
+
+    Returns:
+        (remaining tokens, seconds to wait). Wait is 0.0 if the token was taken.
+    """
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / rate
+
+
+class QuotaBackend(ABC):
+    """Interface for token-bucket state storage."""
+
+    # True if try_acquire does blocking I/O and should run off the event loop
+    blocking_io = False
+
+    @abstractmethod
+    def try_acquire(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """
+        Atomically take one token from the bucket stored under key.
+
+        Returns:
+            0.0 if a token was taken, else seconds until one is available
+        """
+
+    @abstractmethod
+    def peek(self, key: str, capacity: float, rate: float, now: float) -> float:
+        """Return the current token count without taking one."""
+
+
+class MemoryQuotaBackend(QuotaBackend):
+    """Per-process bucket. Each instance gets its own full budget."""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, updated = _refill(tokens, updated, capacity, rate, now)
+            tokens, wait = _take(tokens, rate)
+            self._buckets[key] = (tokens, updated)
+            return wait
+
+    def peek(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            return _refill(tokens, updated, capacity, rate, now)[0]
+
+
+class SQLiteQuotaBackend(QuotaBackend):
+    """
+    File-backed bucket shared by every process on one host.
+    Uses BEGIN IMMEDIATE so concurrent processes serialise on the file lock.
+    """
+
+    blocking_io = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota_buckets ("
+                " key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def try_acquire(self, key, capacity, rate, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM quota_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens, updated = _refill(tokens, updated, capacity, rate, now)
+            tokens, wait = _take(tokens, rate)
+            conn.execute(
+                "INSERT INTO quota_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, updated),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def peek(self, key, capacity, rate, now):
+        row = self._connect().execute(
+            "SELECT tokens, updated FROM quota_buckets WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return capacity
+        return _refill(row[0], row[1], capacity, rate, now)[0]
+
+
+class RedisQuotaBackend(QuotaBackend):
+    """
+    Cluster-wide bucket in a Redis-protocol server.
+
+    Speaks RESP directly over a socket so no client library is needed, and
+    only uses GET/SET/WATCH/MULTI/EXEC. Updates are optimistic: if another
+    instance touches the bucket between WATCH and EXEC, the update is retried.
+    """
+
+    blocking_io = True
+    max_attempts = 5
+
+    def __init__(self, url: str, socket_timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection(
+                (self.host, self.port), timeout=self.socket_timeout)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+            if self.password:
+                self._command("AUTH", self.password)
+            if self.db:
+                self._command("SELECT", str(self.db))
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn[0].close()
+        self._local.conn = None
+
+    def _command(self, *args: str):
+        sock, reader = self._conn()
+        payload = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode()
+            payload.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            sock.sendall(b"".join(payload))
+            return self._read_reply(reader)
+        except OSError:
+            self._reset()
+            raise
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RuntimeError(f"Redis error: {body.decode()}")
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size == -1:
+                return None
+            data = reader.read(size + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            size = int(body)
+            if size == -1:
+                return None
+            return [self._read_reply(reader) for _ in range(size)]
+        raise RuntimeError(f"Unexpected Redis reply: {line!r}")
+
+    def _load(self, key, capacity, now) -> tuple[float, float]:
+        raw = self._command("GET", key)
+        if raw is None:
+            return capacity, now
+        tokens, updated = raw.split(":")
+        return float(tokens), float(updated)
+
+    def try_acquire(self, key, capacity, rate, now):
+        # Keep idle buckets around only as long as a full refill takes
+        ttl_ms = str(int(capacity / rate * 1000) + 1000)
+
+        for _ in range(self.max_attempts):
+            self._command("WATCH", key)
+            tokens, updated = self._load(key, capacity, now)
+            tokens, updated = _refill(tokens, updated, capacity, rate, now)
+            tokens, wait = _take(tokens, rate)
+
+            if wait > 0:
+                self._command("UNWATCH")
+                return wait
+
+            self._command("MULTI")
+            self._command("SET", key, f"{tokens!r}:{updated!r}", "PX", ttl_ms)
+            if self._command("EXEC") is not None:
+                return 0.0
+
+        # Heavy contention: treat as exhausted rather than over-spend
+        return 1.0 / rate
+
+    def peek(self, key, capacity, rate, now):
+        tokens, updated = self._load(key, capacity, now)
+        return _refill(tokens, updated, capacity, rate, now)[0]
+
+
+class QuotaGovernor:
+    """
+    Token bucket in front of every Gemini call.
+
+    The bucket holds up to `burst` tokens and refills at `per_minute` tokens
+    per minute. A per_minute of 0 disables the governor.
+    """
+
+    def __init__(self, backend: QuotaBackend, per_minute: int = 15,
+                 burst: int | None = None, key_prefix: str = "aiva:quota:"):
+        """
+        Args:
+            backend: Where the bucket state lives
+            per_minute: Sustained requests per minute across all instances
+            burst: Bucket capacity (defaults to per_minute)
+            key_prefix: Prefix for bucket keys in shared backends
+        """
+        self.backend = backend
+        self.per_minute = per_minute
+        self.capacity = float(burst or per_minute)
+        self.rate = per_minute / 60.0
+        self.key_prefix = key_prefix
+        self.granted = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def acquire(self, key: str = "gemini") -> None:
+        """
+        Take one request from the budget.
+
+        Raises:
+            QuotaExceededError: If the bucket is empty
+        """
+        if not self.enabled:
+            return
+        self._record(self._try_acquire(key))
+
+    async def acquire_async(self, key: str = "gemini") -> None:
+        """Async variant of acquire(). Runs I/O-bound backends off the event loop."""
+        if not self.enabled:
+            return
+        if not self.backend.blocking_io:
+            self.acquire(key)
+            return
+        self._record(await asyncio.to_thread(self._try_acquire, key))
+
+    def _try_acquire(self, key: str) -> float:
+        """Ask the backend for a token. Fails open if the backend is unreachable."""
+        try:
+            return self.backend.try_acquire(
+                self.key_prefix + key, self.capacity, self.rate, time.time())
+        except Exception:
+            logger.warning("Quota backend unavailable, allowing request", exc_info=True)
+            return 0.0
+
+    def _record(self, wait: float) -> None:
+        if wait > 0:
+            self.rejected += 1
+            raise QuotaExceededError(wait)
+        self.granted += 1
+
+    def get_state(self, key: str = "gemini") -> dict:
+        """Get current quota state."""
+        state = {
+            "backend": type(self.backend).__name__,
+            "enabled": self.enabled,
+            "per_minute": self.per_minute,
+            "capacity": self.capacity,
+            "granted": self.granted,
+            "rejected": self.rejected,
+        }
+        if self.enabled:
+            try:
+                state["tokens_available"] = round(self.backend.peek(
+                    self.key_prefix + key, self.capacity, self.rate, time.time()), 2)
+            except Exception:
+                state["tokens_available"] = None
+        return state
+
+
+def build_quota_backend(name: str) -> QuotaBackend:
+    """Create the quota backend named in settings."""
+    settings = get_settings()
+    if name == "sqlite":
+        return SQLiteQuotaBackend(settings.gemini_quota_sqlite_path)
+    if name == "redis":
+        return RedisQuotaBackend(settings.gemini_quota_redis_url)
+    if name == "memory":
+        return MemoryQuotaBackend()
+    raise ValueError(f"Unknown quota backend: {name}")
+
+
+gemini_quota = QuotaGovernor(
+    backend=build_quota_backend(get_settings().gemini_quota_backend),
+    per_minute=get_settings().gemini_quota_per_minute,
+    burst=get_settings().gemini_quota_burst,
+)
@@ -0,0 +1,97 @@
+"""
+In-memory response cache for AI endpoints.
+Avoids spending a Gemini request when the prompt inputs haven't changed.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import get_settings
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Build a stable hash of the given prompt inputs.
+    Dict keys are sorted so equal data always gives the same key.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL cache with size-bounded LRU eviction.
+
+    Entries expire `ttl` seconds after being stored. When the cache is full,
+    the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: int = 300):
+        """
+        Args:
+            max_entries: Maximum number of cached responses
+            ttl: Seconds before a cached response expires
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, evicting the oldest entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Get current cache statistics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+insights_cache = ResponseCache(
+    max_entries=get_settings().insights_cache_max_entries,
+    ttl=get_settings().insights_cache_ttl_seconds,
+)
@@ -0,0 +1,102 @@
+"""
+Single-flight coalescing for external API calls.
+Concurrent callers asking for the same thing share one upstream call,
+so a burst of identical requests spends one Gemini request instead of many.
+"""
+import asyncio
+from collections import deque
+
+from app.helpers.metrics import work_saved
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    The first caller for a key starts the upstream call; callers arriving
+    while it is in flight wait on the same result. Exceptions fan out to
+    every waiting caller in the same way. Once the call finishes the key is
+    released, so later callers trigger a fresh call.
+
+    A caller going away (cancelled, e.g. on client disconnect) does not
+    cancel a call others still wait on, but the last caller leaving cancels
+    it, since nobody would read the result. The call runs in the first
+    caller's context, so it honours that caller's request deadline.
+    """
+
+    def __init__(self, history_size: int = 50):
+        """
+        Args:
+            history_size: How many recent upstream calls to keep caller counts for
+        """
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._callers: dict[str, int] = {}
+        self._waiting: dict[str, int] = {}
+        self.upstream_calls = 0
+        self.cancelled_calls = 0
+        self.total_callers = 0
+        self.max_callers_per_call = 0
+        self._recent_callers: deque[int] = deque(maxlen=history_size)
+
+    async def do(self, key: str, func, *args, **kwargs):
+        """
+        Run `await func(*args, **kwargs)` once per key across concurrent callers.
+
+        Returns:
+            The shared result of the upstream call
+
+        Raises:
+            Exception: Whatever the upstream call raised, for every caller
+        """
+        self.total_callers += 1
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            self._callers[key] = 1
+            self.upstream_calls += 1
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        else:
+            self._callers[key] += 1
+
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            # Shield so one caller disconnecting doesn't cancel the shared call
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiting[key] == 1 and not task.done():
+                self.cancelled_calls += 1
+                work_saved.inc(("upstream_cancelled",))
+                task.cancel()
+            raise
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        """Release the key and record how many callers the call served."""
+        self._in_flight.pop(key, None)
+        served = self._callers.pop(key, 1)
+        self._recent_callers.append(served)
+        self.max_callers_per_call = max(self.max_callers_per_call, served)
+
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def get_state(self) -> dict:
+        """Get current coalescing statistics."""
+        return {
+            "in_flight": len(self._in_flight),
+            "upstream_calls": self.upstream_calls,
+            "total_callers": self.total_callers,
+            "coalesced_callers": self.total_callers - self.upstream_calls,
+            "max_callers_per_call": self.max_callers_per_call,
+            "cancelled_calls": self.cancelled_calls,
+            "recent_callers_per_call": list(self._recent_callers),
+        }
+
+
+gemini_single_flight = SingleFlight()
@@ -0,0 +1,61 @@
+"""
+Server-Sent Events helpers for streaming AI responses.
+
+A stream sends one `token` event per text chunk as it arrives from the
+model, then a single completion event carrying the full result, or an
+`error` event if the stream fails part-way. For structured (JSON schema)
+responses the chunks are fragments of JSON, so the route passes a `text`
+function that picks out the narrative field's text as it arrives.
+"""
+import logging
+from collections.abc import AsyncIterator, Callable
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM = "text/event-stream"
+
+# Stop proxies and browsers from buffering or caching the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def wants_event_stream(accept: str | None) -> bool:
+    """True if the client opted in to streaming via the Accept header."""
+    return bool(accept) and EVENT_STREAM in accept.lower()
+
+
+def format_event(event: str, data: dict) -> str:
+    """Encode one SSE event. Data is JSON so newlines in text are safe."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+async def stream_events(
+    chunks: AsyncIterator[str],
+    on_complete: Callable[[str], dict],
+    complete_event: str = "done",
+    error_detail: str = "The AI response stream was interrupted.",
+    text: Callable[[str], str] | None = None,
+) -> AsyncIterator[str]:
+    """
+    Turn model text chunks into SSE events.
+
+    Args:
+        chunks: Text chunks from the model
+        on_complete: Builds the final event payload from the full text
+        complete_event: Name of the final event
+        error_detail: Message sent in the `error` event if anything fails
+        text: Maps each chunk to the text to send as a `token` event (no
+            event if empty); chunks are sent as they are by default
+    """
+    parts: list[str] = []
+    try:
+        async for chunk in chunks:
+            parts.append(chunk)
+            token = text(chunk) if text else chunk
+            if token:
+                yield format_event("token", {"text": token})
+        yield format_event(complete_event, on_complete("".join(parts)))
+    except Exception:
+        logger.error("AI response stream failed", exc_info=True)
+        yield format_event("error", {"detail": error_detail})
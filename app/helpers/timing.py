@@ -0,0 +1,127 @@
+"""
+Per-request stage timing.
+
+Routes wrap each stage in `span("name")`. For a sampled request the
+middleware collects the spans, returns them in a `Server-Timing` header
+(visible in browser dev tools) and logs one structured record when the
+response is complete. For unsampled requests, and for work outside a
+request such as queued jobs, `span()` is a shared no-op.
+"""
+import logging
+import random
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: "RequestTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class RequestTimer:
+    """Stage durations for one request, in the order they finished."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        self.spans.append((name, seconds))
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def durations_ms(self) -> Dict[str, float]:
+        """Milliseconds per stage; repeated stages are summed."""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+    def header(self) -> str:
+        """Server-Timing value, e.g. `prompt;dur=0.041, gemini;dur=812.5, total;dur=815.2`."""
+        parts = [f"{name};dur={ms}" for name, ms in self.durations_ms().items()]
+        parts.append(f"total;dur={round(self.elapsed() * 1000, 3)}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimer | None] = ContextVar("request_timer", default=None)
+
+
+def span(name: str):
+    """Time a stage of the current request (a no-op if it is not sampled)."""
+    timer = _current.get()
+    if timer is None:
+        return _NO_SPAN
+    return timer.span(name)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that samples requests for stage timing.
+
+    Args:
+        app: The wrapped ASGI app
+        sample_rate: Share of requests (0-1) to time; 0 disables timing
+        skip_paths: Paths never timed (e.g. scrape endpoints)
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, skip_paths=("/metrics",)):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"] in self.skip_paths
+                or self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timer.header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            record = {
+                "method": scope["method"],
+                "route": getattr(route, "path", None) or scope["path"],
+                "status": status[0],
+                "total_ms": round(timer.elapsed() * 1000, 3),
+                "spans_ms": timer.durations_ms(),
+            }
+            logger.info("Request timing %s", orjson.dumps(record).decode(),
+                        extra={"timing": record})
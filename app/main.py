@@ -1,4 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any
 
@@ -8,21 +11,50 @@ from app.routes.hello import router as hello_router
 from app.routes.insights import router as insights_router
 from app.routes.checkins import router as checkins_router
 from app.routes.health import router as health_router
+from app.routes.transactions import router as transactions_router
+from app.routes.insight_jobs import router as insight_jobs_router
+from app.routes.metrics import router as metrics_router
+from app.helpers.job_queue import insight_jobs
+from app.helpers.deadline import DeadlineMiddleware
+from app.helpers.metrics import MetricsMiddleware
+from app.helpers.timing import ServerTimingMiddleware
 from app.services.spending_engine import load_mock_transactions
+from app.services.warmup import prewarm
 
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the insights job workers for the lifetime of the app, and pre-warm
+    the Gemini client and knowledge base in the background so startup (and
+    /health) does not wait for them.
+    """
+    insight_jobs.start()
+    warmup = asyncio.create_task(asyncio.to_thread(prewarm)) if get_settings().startup_prewarm else None
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    await insight_jobs.stop()
+
+
 app = FastAPI(
     title="AIVA Platform",
     version="2.0.0",
-    description="Emotion-aware budgeting assistant API"
+    description="Emotion-aware budgeting assistant API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include routers
 app.include_router(hello_router, prefix="/v1")
 app.include_router(insights_router, prefix="/v1")
 app.include_router(checkins_router, prefix="/v1")
+app.include_router(transactions_router, prefix="/v1")
+app.include_router(insight_jobs_router, prefix="/v1")
 app.include_router(health_router)
+app.include_router(metrics_router)
 
 
 def get_allowed_origins() -> list:
@@ -33,14 +65,23 @@ def get_allowed_origins() -> list:
     return ["http://localhost:3000", "http://localhost:5173"]
 
 
+# Innermost, so the deadline and disconnect watch wrap just the routes
+app.add_middleware(DeadlineMiddleware, budget_seconds=get_settings().request_deadline_seconds)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=get_allowed_origins(),  # ✅ FIXED: No more wildcard
     allow_credentials=False,  # ✅ FIXED: Disabled unless needed
     allow_methods=["GET", "POST"],  # ✅ FIXED: Only necessary methods
-    allow_headers=["Content-Type"],  # ✅ FIXED: Only necessary headers
+    allow_headers=["Content-Type", "Cache-Control"],  # ✅ FIXED: Only necessary headers
+    expose_headers=["X-Cache", "Retry-After", "Location", "Server-Timing"],
 )
 
+app.add_middleware(ServerTimingMiddleware, sample_rate=get_settings().server_timing_sample_rate)
+
+# Outermost, so it times everything including CORS handling
+app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 def read_root() -> Dict[str, str]:
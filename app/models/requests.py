@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import Dict, List, Optional
+from datetime import date, datetime
+import math
 import re
 
 _DANGEROUS_PATTERNS = [
@@ -8,12 +10,30 @@ _DANGEROUS_PATTERNS = [
     "act as", "you are now", "pretend"
 ]
 
+# Tried after the ISO (YYYY-MM-DD) fast path
+_DATE_FORMATS = ["%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%d %b %Y"]
+
 _ALLOWED_CATEGORIES = [
     "Food", "Transport", "Entertainment", "Shopping",
     "Bills", "Healthcare", "Other"
 ]
 
 
+def check_category_name(category: str) -> str:
+    """
+    Validate a free-form category name, which ends up in AI prompts.
+
+    Raises:
+        ValueError: If it has characters other than letters, spaces, "&" and
+            "-", or looks like a prompt injection
+    """
+    if not re.fullmatch(r"[A-Za-z][A-Za-z &\-]{0,49}", category):
+        raise ValueError(f"Invalid category name: {category!r}")
+    if any(pattern in category.lower() for pattern in _DANGEROUS_PATTERNS):
+        raise ValueError(f"Invalid category name: {category!r}")
+    return category
+
+
 class BaseRequest(BaseModel):
     """Base class providing shared name validation for all request models."""
     name: Optional[str] = Field(
@@ -74,3 +94,116 @@ class CheckinRequest(BaseRequest):
             raise ValueError(
                 f"Category must be one of: {', '.join(_ALLOWED_CATEGORIES)}")
         return v
+
+
+class TransactionRow(BaseModel):
+    """
+    One normalised transaction from an imported bank export.
+    Negative amounts are spending, positive amounts are income.
+    """
+    id: Optional[str] = Field(
+        None,
+        max_length=100,
+        description="Bank transaction id, used to apply later corrections"
+    )
+    date: str = Field(..., description="Transaction date (YYYY-MM-DD)")
+    description: str = Field("", max_length=200)
+    amount: float = Field(..., description="Signed amount in GBP")
+    category: str = Field("Other", max_length=50)
+
+    model_config = {"str_strip_whitespace": True}
+
+    @field_validator('id', mode='before')
+    @classmethod
+    def coerce_id(cls, v):
+        # Many exports use numeric ids
+        if isinstance(v, int) and not isinstance(v, bool):
+            return str(v)
+        return v
+
+    @staticmethod
+    def parse_money(v) -> float:
+        """Parse amounts like 12.5, "-12.50", "£1,234.00" or "(12.00)"."""
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            return float(v)
+        text = str(v).strip().replace(",", "").replace("£", "").replace(" ", "")
+        negative = text.startswith("(") and text.endswith(")")
+        value = float(text.strip("()"))
+        return -value if negative else value
+
+    @field_validator('date', mode='before')
+    @classmethod
+    def normalise_date(cls, v) -> str:
+        if isinstance(v, (date, datetime)):
+            return v.strftime("%Y-%m-%d")
+        text = str(v).strip()
+        if "T" in text:  # ISO timestamp
+            text = text.split("T")[0]
+        try:
+            # Fast path for the common ISO case
+            return date.fromisoformat(text).isoformat()
+        except ValueError:
+            pass
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        raise ValueError("Unrecognised date format")
+
+    @field_validator('amount', mode='before')
+    @classmethod
+    def normalise_amount(cls, v) -> float:
+        try:
+            value = cls.parse_money(v)
+        except ValueError:
+            raise ValueError("Amount must be a number")
+        if not math.isfinite(value):
+            raise ValueError("Amount must be a finite number")
+        return value
+
+    @field_validator('category')
+    @classmethod
+    def validate_category(cls, v: str) -> str:
+        return check_category_name(v)
+
+
+class InsightsBatchItem(BaseModel):
+    """One user's spending summary in a batch insights request."""
+    id: str = Field(
+        ...,
+        pattern=r"^[A-Za-z0-9_.@:\-]{1,100}$",
+        description="Caller's key for this item (e.g. user id), echoed in the result"
+    )
+    spending_summary: Dict[str, float] = Field(
+        ...,
+        min_length=1,
+        max_length=20,
+        description="Spending by category (positive amounts)"
+    )
+
+    @field_validator('spending_summary')
+    @classmethod
+    def validate_summary(cls, v: Dict[str, float]) -> Dict[str, float]:
+        for category, amount in v.items():
+            check_category_name(category)
+            if not math.isfinite(amount) or amount < 0:
+                raise ValueError(f"Amount for {category} must be a finite, non-negative number")
+        return v
+
+
+class InsightsBatchRequest(BaseModel):
+    """Request body for the /ai/insights/batch endpoint."""
+    items: List[InsightsBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Spending summaries to generate insights for"
+    )
+
+    @field_validator('items')
+    @classmethod
+    def unique_ids(cls, v: List[InsightsBatchItem]) -> List[InsightsBatchItem]:
+        if len({item.id for item in v}) != len(v):
+            raise ValueError("Item ids must be unique")
+        return v
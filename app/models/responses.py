@@ -1,5 +1,5 @@
-from typing import Optional, Dict, List, Literal
-from pydantic import BaseModel, Field
+from typing import Any, Optional, Dict, List, Literal
+from pydantic import BaseModel, Field, create_model
 
 
 class ErrorResponse(BaseModel):
@@ -69,6 +69,11 @@ class InsightResponse(BaseModel):
         }
     )
 
+    degraded: bool = Field(
+        False,
+        description="True if AI was unavailable and this insight came from the rule-based fallback"
+    )
+
 
 class CheckinResponse(BaseModel):
     """Response model for check-in follow-up endpoint."""
@@ -91,3 +96,99 @@ class CheckinResponse(BaseModel):
         ...,
         description="Suggested next step for user"
     )
+
+
+def _output_model(name: str, model: type[BaseModel], fields: List[str],
+                  **extra: Any) -> type[BaseModel]:
+    """A model of the fields the AI fills in, reusing `model`'s definitions."""
+    definitions = {f: (model.model_fields[f].annotation, model.model_fields[f]) for f in fields}
+    return create_model(name, __doc__=f"AI-generated fields of {model.__name__}.",
+                        **definitions, **extra)
+
+
+# Response schemas sent to Gemini for structured output
+InsightOutput = _output_model(
+    "InsightOutput", InsightResponse,
+    ["top_category", "emotional_tone", "suggested_action", "aiva_insight"],
+)
+InsightBatchOutput = _output_model(
+    "InsightBatchOutput", InsightResponse,
+    ["top_category", "emotional_tone", "suggested_action", "aiva_insight"],
+    id=(str, Field(..., description="The user id from the section header")),
+)
+
+
+class ImportRowError(BaseModel):
+    """A rejected row from a transaction import."""
+    row: int = Field(..., description="1-based row number in the upload")
+    error: str = Field(..., description="Why the row was rejected")
+
+
+class TransactionImportResponse(BaseModel):
+    """Response model for streaming transaction import."""
+    format: Literal["json", "ndjson", "csv"] = Field(
+        ...,
+        description="Detected upload format"
+    )
+    rows_imported: int = Field(..., description="Rows that passed validation")
+    rows_rejected: int = Field(..., description="Rows that failed validation")
+    errors: List[ImportRowError] = Field(
+        default_factory=list,
+        description="First rejected rows with reasons (capped)"
+    )
+    spending_summary: Dict[str, float] = Field(
+        ...,
+        description="Spending by category across the upload; with user_id, the "
+                    "user's totals after the import (repeated ids replaced)"
+    )
+    first_date: Optional[str] = Field(None, description="Earliest transaction date")
+    last_date: Optional[str] = Field(None, description="Latest transaction date")
+    bytes_received: int = Field(..., description="Size of the upload in bytes")
+    elapsed_seconds: float = Field(..., description="Time spent parsing and summarising")
+    rows_per_second: float = Field(..., description="Import throughput")
+    snapshot_version: Optional[int] = Field(
+        None,
+        description="User's spending aggregate version after the import (with user_id)"
+    )
+
+
+class InsightsBatchResult(BaseModel):
+    """Outcome for one item of a batch insights request."""
+    id: str = Field(..., description="The item's id from the request")
+    insight: Optional[InsightResponse] = Field(
+        None,
+        description="Generated insight, if successful"
+    )
+    error: Optional[str] = Field(None, description="Why this item failed")
+
+
+class InsightsBatchResponse(BaseModel):
+    """Response model for batch insights."""
+    results: List[InsightsBatchResult] = Field(
+        ...,
+        description="One result per requested item, in request order"
+    )
+    upstream_calls: int = Field(..., description="Gemini calls made, retries included")
+    packed_calls: int = Field(..., description="Calls that carried several items")
+    retried_items: int = Field(
+        ...,
+        description="Items retried on their own after a packed result failed to parse"
+    )
+
+
+class InsightJobResponse(BaseModel):
+    """Status of an asynchronous insights job."""
+    job_id: str = Field(..., description="Id to poll with GET /v1/ai/insights/jobs/{job_id}")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(
+        ...,
+        description="Where the job is in its lifecycle"
+    )
+    attempts: int = Field(..., description="Times a worker has picked up the job")
+    created_at: float = Field(..., description="Submission time (Unix seconds)")
+    finished_at: Optional[float] = Field(None, description="Completion time (Unix seconds)")
+    result: Optional[InsightResponse] = Field(None, description="The insight, once succeeded")
+    error: Optional[str] = Field(None, description="Why the job failed")
+    status_code: Optional[int] = Field(
+        None,
+        description="HTTP status the synchronous endpoint would have returned for the failure"
+    )
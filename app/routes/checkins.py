@@ -1,12 +1,21 @@
-import json
 import logging
-from fastapi import APIRouter, HTTPException
+import math
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
 
 from app.models.responses import CheckinResponse, ErrorResponse
 from app.models.requests import CheckinRequest
-from app.services.ai_client import get_gemini_client
-from app.helpers.json_cleaner import parse_ai_json
-from app.helpers.circuit_breaker import gemini_circuit_breaker
+from app.services.ai_client import get_gemini_client, generate_content, start_content_stream
+from app.helpers.json_cleaner import StreamedStringField, parse_ai_model
+from app.helpers.deadline import DeadlineExceededError
+from app.helpers.circuit_breaker import CircuitOpenError, checkin_circuit_breaker
+from app.helpers.response_cache import fingerprint
+from app.helpers.quota import QuotaExceededError
+from app.helpers.single_flight import gemini_single_flight
+from app.helpers.timing import span
+from app.helpers.sse import EVENT_STREAM, SSE_HEADERS, stream_events, wants_event_stream
+from app.services.prompt_builder import PromptTooLargeError, prompt_builder
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,40 +25,34 @@ logger = logging.getLogger(__name__)
     "/ai/checkin",
     response_model=CheckinResponse,
     responses={
+        200: {"content": {EVENT_STREAM: {}}},
         400: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
         500: {"model": ErrorResponse},
         503: {"model": ErrorResponse},
+        504: {"model": ErrorResponse},
     },
 )
-def ai_checkin(req: CheckinRequest):
+async def ai_checkin(req: CheckinRequest, accept: str | None = Header(None)):
     """
     Follow-up endpoint.
     The user has already seen an insight + check-in options
     and has selected one. AIVA responds with a tailored follow-up.
+
+    Send `Accept: text/event-stream` to receive Server-Sent Events: `token`
+    events with the `aiva_followup` text as it arrives, then a `result`
+    event with the parsed CheckinResponse.
     """
     # Input is now validated by Pydantic model
     user_name = req.name or "friend"
     category = req.category
     selected = req.selected_option
 
-    prompt = (
-        "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
-        f"User name: {user_name}.\n"
-        f"Their dominant spending category is: {category}.\n"
-        f"They chose this reflection option: \"{selected}\".\n\n"
-        "TASK 1 — Acknowledge their feelings with genuine empathy.\n"
-        "TASK 2 — Reflect briefly on how this feeling might be connected to their spending.\n"
-        "TASK 3 — Offer 1–2 gentle, realistic next steps that support both emotions and budget.\n"
-        "TASK 4 — Keep the tone warm, non-judgmental, and grounded.\n\n"
-        "FORMAT the response STRICTLY as JSON with:\n"
-        "{\n"
-        "  'aiva_followup': '',\n"
-        "  'detected_emotion': '',\n"
-        "  'supportive_reframe': '',\n"
-        "  'next_step_suggestion': ''\n"
-        "}\n"
-        "Return only JSON. No commentary."
-    )
+    try:
+        with span("prompt"):
+            prompt = prompt_builder.checkin(user_name, category, selected)
+    except PromptTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
         client = get_gemini_client()
@@ -61,13 +64,32 @@ def ai_checkin(req: CheckinRequest):
             )
 
         try:
-            def call_gemini_api():
-                return client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=prompt,
+            if wants_event_stream(accept):
+                # Time to first chunk; the rest streams after the headers
+                with span("gemini"):
+                    chunks = await checkin_circuit_breaker.call_stream(
+                        start_content_stream, client, prompt.text, None, prompt.preamble,
+                        prompt.schema)
+                return StreamingResponse(
+                    stream_events(
+                        chunks,
+                        _parse_followup,
+                        complete_event="result",
+                        error_detail="Failed to generate AIVA's follow-up message.",
+                        # The SDK sends the schema's field order, so aiva_followup comes first
+                        text=StreamedStringField("aiva_followup").feed,
+                    ),
+                    media_type=EVENT_STREAM,
+                    headers=SSE_HEADERS,
                 )
 
-            response = gemini_circuit_breaker.call(call_gemini_api)
+            # Identical in-flight prompts share one upstream call
+            with span("gemini"):
+                response = await gemini_single_flight.do(
+                    fingerprint(prompt.preamble, prompt.text),
+                    checkin_circuit_breaker.call_async,
+                    generate_content, client, prompt.text, None, prompt.preamble,
+                    prompt.schema)
             ai_text = response.text
 
             if not ai_text:
@@ -76,13 +98,32 @@ def ai_checkin(req: CheckinRequest):
                     detail="AI returned an empty response."
                 )
 
+        except CircuitOpenError as e:
+            logger.warning(f"Circuit breaker OPEN: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+
+        except DeadlineExceededError as e:
+            logger.warning(f"Gemini call skipped or cut short by the request deadline: {e}")
+            raise HTTPException(
+                status_code=504,
+                detail="AI service did not respond in time. Please try again."
+            )
+
+        except QuotaExceededError as e:
+            logger.warning(f"Gemini quota exhausted: {e}")
+            raise HTTPException(
+                status_code=429,
+                detail="AI service rate limit exceeded. Please try again in a moment.",
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+
         except Exception as e:
             error_msg = str(e)
 
-            if "Circuit breaker is OPEN" in error_msg:
-                logger.warning(f"Circuit breaker OPEN: {error_msg}")
-                raise HTTPException(status_code=503, detail=error_msg)
-
             if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
                 logger.warning("Gemini API rate limit hit", exc_info=True)
                 raise HTTPException(
@@ -96,11 +137,14 @@ def ai_checkin(req: CheckinRequest):
                 detail="Failed to call AI service. Please try again later."
             )
 
-        followup_data = parse_ai_json(ai_text)
-        return followup_data
+        # Parsed and validated in one pass; rendered without a second one
+        with span("parse"):
+            followup = parse_ai_model(ai_text, CheckinResponse)
+        with span("render"):
+            return ORJSONResponse(followup.model_dump())
 
-    except json.JSONDecodeError:
-        logger.error("AI returned non-JSON for check-in followup", exc_info=True)
+    except ValidationError:
+        logger.error("AI returned an invalid check-in followup", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="AI returned invalid JSON for check-in followup."
@@ -115,3 +159,8 @@ def ai_checkin(req: CheckinRequest):
             status_code=500,
             detail="Failed to generate AIVA's follow-up message."
         )
+
+
+def _parse_followup(ai_text: str) -> dict:
+    """Parse and validate the full streamed text into a CheckinResponse."""
+    return parse_ai_model(ai_text, CheckinResponse).model_dump()
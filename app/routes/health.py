@@ -1,6 +1,13 @@
 from fastapi import APIRouter
 from app.services.ai_client import get_gemini_client
-from app.helpers.circuit_breaker import gemini_circuit_breaker
+from app.helpers.circuit_breaker import circuit_breakers
+from app.helpers.http_pool import gemini_http_stats
+from app.helpers.job_queue import insight_jobs
+from app.helpers.preamble_cache import preamble_cache
+from app.helpers.quota import gemini_quota
+from app.helpers.response_cache import insights_cache
+from app.helpers.single_flight import gemini_single_flight
+from app.services.model_router import model_router
 
 
 router = APIRouter()
@@ -25,6 +32,75 @@ def ai_health():
 def circuit_breaker_status():
     """
     Check circuit breaker status for monitoring.
-    Returns current state, failure count, and last failure time.
+    Returns state, failure rate over the window, and last failure time
+    for each per-dependency breaker.
     """
-    return gemini_circuit_breaker.get_state()
+    return {name: breaker.get_state() for name, breaker in circuit_breakers.items()}
+
+
+@router.get("/health/cache")
+def cache_status():
+    """
+    Check response cache statistics for monitoring.
+    Returns entry count, hit/miss counters and hit ratio.
+    """
+    return {"insights": insights_cache.get_stats()}
+
+
+@router.get("/health/coalescing")
+def coalescing_status():
+    """
+    Check request coalescing statistics for monitoring.
+    Returns upstream call count and how many callers each call served.
+    """
+    return gemini_single_flight.get_state()
+
+
+@router.get("/health/quota")
+def quota_status():
+    """
+    Check Gemini quota governor state for monitoring.
+    Returns the shared budget's backend, budget, tokens left and granted/rejected
+    counters, and the same per model budget in the router's pool.
+    """
+    return {
+        **gemini_quota.get_state(),
+        "models": {model: quota.get_state(key)
+                   for model, quota, key in model_router.quota_governors()},
+    }
+
+
+@router.get("/health/context-cache")
+def context_cache_status():
+    """
+    Check Gemini context (preamble) cache state for monitoring.
+    Returns each preamble's mode, live cache TTLs and hit/create/refresh counters.
+    """
+    return preamble_cache.get_state()
+
+
+@router.get("/health/jobs")
+def jobs_status():
+    """
+    Check insights job queue state for monitoring.
+    Returns backend, worker state, jobs per status and outcome counters.
+    """
+    return insight_jobs.get_state()
+
+
+@router.get("/health/gemini-pool")
+def gemini_pool_status():
+    """
+    Check the Gemini HTTP connection pool for monitoring.
+    Returns connections opened vs requests (reuse), in-flight and saturation counts, and timeouts.
+    """
+    return gemini_http_stats.get_stats()
+
+
+@router.get("/health/models")
+def models_status():
+    """
+    Check the Gemini model router for monitoring.
+    Returns the model pool, per-model usage (calls, tokens, estimated cost, latency) and downshift counts.
+    """
+    return model_router.get_state()
@@ -1,18 +1,40 @@
 import logging
-from fastapi import APIRouter, HTTPException
+import math
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
 
-from app.services.ai_client import get_gemini_client
+from app.models.responses import ErrorResponse
+from app.services.ai_client import get_gemini_client, generate_content, start_content_stream
 from app.models.requests import InsightRequest
+from app.helpers.deadline import DeadlineExceededError
+from app.helpers.circuit_breaker import CircuitOpenError, hello_circuit_breaker
+from app.helpers.quota import QuotaExceededError
+from app.helpers.timing import span
+from app.helpers.sse import EVENT_STREAM, SSE_HEADERS, stream_events, wants_event_stream
+from app.services.prompt_builder import PromptTooLargeError, prompt_builder
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.post("/ai/hello")
-def ai_hello(req: InsightRequest):
+@router.post(
+    "/ai/hello",
+    responses={
+        200: {"content": {EVENT_STREAM: {}}},
+        400: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+        504: {"model": ErrorResponse},
+    },
+)
+async def ai_hello(req: InsightRequest, accept: str | None = Header(None)):
     """
     Simple AI endpoint:
     AIVA greets the user with a warm, encouraging message.
+
+    Send `Accept: text/event-stream` to receive the greeting as Server-Sent
+    Events: `token` events as text arrives, then a `done` event.
     """
     client = get_gemini_client()
 
@@ -25,21 +47,53 @@ def ai_hello(req: InsightRequest):
     # Input is now validated by Pydantic model
     user_name = req.name or "friend"
 
-    prompt = (
-        f"You are AIVA, a kind financial well-being assistant. "
-        f"Greet {user_name} warmly in 2–3 sentences. "
-        f"Acknowledge that money can be stressful, but you're here to help "
-        f"them understand things step by step. Keep the tone supportive and calm."
-    )
+    try:
+        with span("prompt"):
+            prompt = prompt_builder.hello(user_name)
+    except PromptTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-        )
+        if wants_event_stream(accept):
+            # Time to first chunk; the rest streams after the headers
+            with span("gemini"):
+                chunks = await hello_circuit_breaker.call_stream(
+                    start_content_stream, client, prompt.text)
+            return StreamingResponse(
+                stream_events(chunks, lambda text: {"aiva_message": text}),
+                media_type=EVENT_STREAM,
+                headers=SSE_HEADERS,
+            )
+
+        with span("gemini"):
+            response = await hello_circuit_breaker.call_async(
+                generate_content, client, prompt.text)
         ai_text = response.text
         return {"aiva_message": ai_text}
 
+    except CircuitOpenError as e:
+        logger.warning(f"Circuit breaker OPEN: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    except DeadlineExceededError as e:
+        logger.warning(f"Gemini call skipped or cut short by the request deadline: {e}")
+        raise HTTPException(
+            status_code=504,
+            detail="AI service did not respond in time. Please try again."
+        )
+
+    except QuotaExceededError as e:
+        logger.warning(f"Gemini quota exhausted: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="AI service rate limit exceeded. Please try again in a moment.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
     except Exception as e:
         # ✅ FIXED: Use logging instead of print
         logger.error("Error while calling Gemini (hello)", exc_info=True)
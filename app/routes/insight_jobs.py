@@ -0,0 +1,103 @@
+import logging
+import math
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.core.config import get_settings
+from app.models.responses import InsightJobResponse, ErrorResponse
+from app.helpers.job_queue import JobFailedError, JobQueueFullError, JobRetryLater, insight_jobs
+from app.routes.insights import generate_insight
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Delay before retrying an upstream 429 that carried no Retry-After
+DEFAULT_RETRY_SECONDS = 30.0
+
+
+async def run_insights_job(payload: dict) -> dict:
+    """
+    Job handler: run the synchronous insights pipeline for one user.
+
+    Quota rejections, upstream rate limits and an open circuit put the job
+    back in the queue for the advertised Retry-After; other errors fail it.
+    """
+    try:
+        # A degraded insight would end the job; wait for the real one instead
+        return await generate_insight(Response(), cache_control=None,
+                                      user_id=payload.get("user_id"), allow_degraded=False)
+    except HTTPException as e:
+        retry_after = (e.headers or {}).get("Retry-After")
+        if e.status_code == 429 or (e.status_code == 503 and retry_after):
+            raise JobRetryLater(float(retry_after or DEFAULT_RETRY_SECONDS), e.detail)
+        raise JobFailedError(e.detail, e.status_code)
+
+
+insight_jobs.register("insights", run_insights_job)
+
+
+def _job_body(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"],
+        "status_code": job["status_code"],
+    }
+
+
+@router.post(
+    "/ai/insights/jobs",
+    status_code=202,
+    response_model=InsightJobResponse,
+    responses={
+        429: {"model": ErrorResponse},
+    },
+)
+async def create_insights_job(
+    response: Response,
+    user_id: str | None = Query(None, max_length=100),
+) -> InsightJobResponse:
+    """
+    Queue an insight for a user's spending aggregates (the mock dataset if no
+    `user_id` is given) and return a job id immediately.
+
+    Workers drain the queue no faster than the Gemini quota allows, so
+    bulk callers can submit freely instead of retrying on 429. Poll the
+    URL in the Location header for the result.
+    """
+    try:
+        job = await insight_jobs.submit("insights", {"user_id": user_id})
+    except JobQueueFullError as e:
+        logger.warning(f"Insights job rejected: {e}")
+        per_minute = get_settings().gemini_quota_per_minute
+        drain_seconds = e.pending * 60 / per_minute if per_minute > 0 else 60
+        raise HTTPException(
+            status_code=429,
+            detail="Too many insight jobs are waiting. Please try again later.",
+            headers={"Retry-After": str(math.ceil(drain_seconds))},
+        )
+
+    response.headers["Location"] = f"/v1/ai/insights/jobs/{job['id']}"
+    return _job_body(job)
+
+
+@router.get(
+    "/ai/insights/jobs/{job_id}",
+    response_model=InsightJobResponse,
+    responses={
+        404: {"model": ErrorResponse},
+    },
+)
+async def get_insights_job(job_id: str) -> InsightJobResponse:
+    """
+    Poll an insights job. `result` is set once the job has succeeded and
+    `error` once it has failed; finished jobs are kept for
+    INSIGHTS_JOBS_RESULT_TTL_SECONDS.
+    """
+    job = await insight_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return _job_body(job)
@@ -1,33 +1,112 @@
-import json
 import logging
-from fastapi import APIRouter, HTTPException
+import math
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from pydantic import ValidationError
 
-from app.models.responses import InsightResponse, ErrorResponse
-from app.helpers.json_cleaner import parse_ai_json
-from app.helpers.circuit_breaker import gemini_circuit_breaker
-from app.services.spending_engine import load_mock_transactions, summarize_spending
-from app.services.ai_client import get_gemini_client
-from app.services.knowledge_retriever import build_guidance_text, get_checkin_for_category
+from app.core.config import get_settings
+from app.models.requests import InsightsBatchRequest
+from app.models.responses import InsightOutput, InsightResponse, InsightsBatchResponse, ErrorResponse
+from app.helpers.json_cleaner import model_response, parse_ai_model
+from app.helpers.deadline import DeadlineExceededError
+from app.helpers.circuit_breaker import CircuitOpenError, insights_circuit_breaker
+from app.helpers.metrics import insights_degraded
+from app.helpers.timing import span
+from app.helpers.quota import QuotaExceededError
+from app.helpers.single_flight import gemini_single_flight
+from app.helpers.response_cache import fingerprint, insights_cache
+from app.services.spending_aggregates import get_spending_snapshot
+from app.services.spending_engine import describe_spending
+from app.services.insights_batch import default_concurrency, generate_batch_insights
+from app.services.fallback_insights import build_fallback_insight
+from app.services.ai_client import get_gemini_client, generate_content
+from app.services.knowledge_retriever import get_compiled_knowledge_base, retrieve
+from app.services.prompt_builder import PromptTooLargeError, prompt_builder
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-_CATEGORY_CONTEXT: dict[str, str] = {
-    "Food": (
-        "Food often reflects comfort, routine, or convenience spending. "
-        "High food spend can be linked to busy schedules, eating out, or emotional comfort."
-    ),
-    "Transport": (
-        "Transport spending usually points to routine commitments, commuting, or a busy season of movement."
-    ),
-    "Entertainment": (
-        "Entertainment can signal a need for rest, joy, or stress relief after demanding weeks."
-    ),
-    "Shopping": (
-        "Shopping may reflect planned upgrades, self-care, or impulse buys driven by mood."
-    ),
-}
-_DEFAULT_CONTEXT = "This category likely reflects a mix of routine needs and emotional decisions."
+
+async def _model_insight(prompt) -> dict:
+    """
+    Ask Gemini for the AI fields of an insight, as validated structured output.
+
+    Raises:
+        HTTPException: 503 if the AI service is unavailable or its circuit is
+            open, 429 if the quota or upstream rate limit is hit, 504 if the
+            request deadline leaves no time for the call, 500 on any other
+            AI failure
+    """
+    client = get_gemini_client()
+
+    if not client:
+        raise HTTPException(
+            status_code=503,
+            detail="AI service is temporarily unavailable."
+        )
+
+    try:
+        # Identical in-flight prompts share one upstream call
+        with span("gemini"):
+            ai_response = await gemini_single_flight.do(
+                fingerprint(prompt.preamble, prompt.text),
+                insights_circuit_breaker.call_async,
+                generate_content, client, prompt.text, None, prompt.preamble, prompt.schema)
+        ai_text = ai_response.text
+
+    except CircuitOpenError as e:
+        logger.warning(f"Circuit breaker OPEN: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    except DeadlineExceededError as e:
+        logger.warning(f"Gemini call skipped or cut short by the request deadline: {e}")
+        raise HTTPException(
+            status_code=504,
+            detail="AI service did not respond in time. Please try again."
+        )
+
+    except QuotaExceededError as e:
+        logger.warning(f"Gemini quota exhausted: {e}")
+        raise HTTPException(
+            status_code=429,
+            detail="AI service rate limit exceeded. Please try again in a moment.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    except Exception as e:
+        error_msg = str(e)
+
+        if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
+            # ✅ FIXED: Use logging
+            logger.warning("Gemini API rate limit hit", exc_info=True)
+            raise HTTPException(
+                status_code=429,
+                detail="AI service rate limit exceeded. Please try again in a moment."
+            )
+
+        # ✅ FIXED: Use logging
+        logger.error("Gemini API error", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to call AI service. Please try again later."
+        )
+
+    # Parse and validate in one pass
+    try:
+        with span("parse"):
+            insight = parse_ai_model(ai_text or "", InsightOutput)
+    except ValidationError:
+        # ✅ FIXED: Use logging
+        logger.error("AI returned an invalid insight", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="AI returned an invalid insight."
+        )
+
+    return insight.model_dump()
 
 
 @router.post(
@@ -38,19 +117,71 @@ _DEFAULT_CONTEXT = "This category likely reflects a mix of routine needs and emo
         429: {"model": ErrorResponse},
         500: {"model": ErrorResponse},
         503: {"model": ErrorResponse},
+        504: {"model": ErrorResponse},
     },
 )
-def ai_insights() -> InsightResponse:
+async def ai_insights(
+    response: Response,
+    cache_control: str | None = Header(None),
+    user_id: str | None = Query(None, max_length=100),
+    allow_degraded: bool = Query(True),
+) -> InsightResponse:
     """
-    Generate an AI-driven financial insight based on mock transaction data.
+    Generate an AI-driven financial insight from a user's spending aggregates
+    (the mock dataset if no `user_id` is given).
 
     Protected by circuit breaker to prevent cascading failures when
     external AI service experiences issues.
+
+    Responses are cached per user, aggregate version and KB version, so a repeat view
+    needs no summarising or prompt building, and any new or corrected
+    transaction invalidates the cached insight. Send
+    `Cache-Control: no-cache` to force a fresh insight, or `no-store`
+    to bypass the cache entirely.
+
+    If Gemini is unavailable, rate limited or fails, and
+    INSIGHTS_FALLBACK_MODE is "auto", a rule-based insight is returned
+    instead with `degraded: true` (send `allow_degraded=false` to get the
+    error). "always" skips Gemini entirely; "off" disables the fallback.
+    """
+    body = await generate_insight(response, cache_control, user_id, allow_degraded)
+    # The AI fields were validated while parsing; render without a second pass
+    with span("render"):
+        return model_response(InsightResponse, body, response)
+
+
+async def generate_insight(response: Response, cache_control: str | None,
+                           user_id: str | None, allow_degraded: bool = True) -> dict:
+    """
+    Run the insights pipeline behind POST /ai/insights and return the body.
+
+    Sets X-Cache on `response`.
+
+    Raises:
+        HTTPException: As documented on the route
     """
     try:
-        # ---- 1. Load + summarize spending ----
-        transactions = load_mock_transactions()
-        totals = summarize_spending(transactions)
+        # Each stage is timed for the Server-Timing header (if sampled)
+        # ---- 1. Read the running spending totals ----
+        with span("snapshot"):
+            snapshot = get_spending_snapshot(user_id)
+        totals = snapshot.totals
+
+        # ---- 1b. Serve repeat views from the response cache ----
+        cache_directives = (cache_control or "").lower()
+        skip_lookup = "no-cache" in cache_directives or "no-store" in cache_directives
+        skip_store = "no-store" in cache_directives
+        cache_key = fingerprint("insights", snapshot.user_id, snapshot.version,
+                                get_compiled_knowledge_base().version)
+
+        if not skip_lookup:
+            with span("cache"):
+                cached_body = insights_cache.get(cache_key)
+            if cached_body is not None:
+                response.headers["X-Cache"] = "HIT"
+                return cached_body
+
+        response.headers["X-Cache"] = "BYPASS" if skip_lookup else "MISS"
 
         if not totals:
             raise HTTPException(
@@ -59,24 +190,12 @@ def ai_insights() -> InsightResponse:
             )
 
         # ---- 2. Mini intelligence layer ----
-        dominant_category = max(totals, key=totals.get)
-        total_spend = sum(totals.values())
-
-        if total_spend < 50:
-            spend_level = "low"
-        elif total_spend < 150:
-            spend_level = "moderate"
-        else:
-            spend_level = "high"
-
-        category_context = _CATEGORY_CONTEXT.get(dominant_category, _DEFAULT_CONTEXT)
+        with span("summarize"):
+            dominant_category, total_spend, spend_level = describe_spending(totals)
 
-        # ---- 2b. Retrieve guidance from knowledge base (RAG) ----
-        guidance_text = build_guidance_text(
-            dominant_category, user_name="friend")
-
-        # Optional check-in question + options (for multi-category patterns)
-        checkin_entry = get_checkin_for_category(dominant_category)
+        # ---- 2b. Optional check-in question + options (for multi-category patterns) ----
+        with span("retrieve"):
+            checkin_entry = retrieve(dominant_category).checkin
         checkin_question = None
         checkin_options = None
 
@@ -84,101 +203,40 @@ def ai_insights() -> InsightResponse:
             checkin_question = checkin_entry.get("question")
             checkin_options = checkin_entry.get("options")
 
-        # ---- 3. Convert summary to text for the AI ----
-        summary_text = ", ".join(
-            [f"{cat}: £{amt:.2f}" for cat, amt in totals.items()]
-        )
-
-        # ---- 4. Build prompt with our mini-intelligence + RAG context ----
-        prompt = (
-            "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
-            f"Weekly spending summary: {summary_text}.\n"
-            f"Dominant spending category: {dominant_category}.\n"
-            f"Approximate total weekly spend: £{total_spend:.2f} ({spend_level} level).\n"
-            f"Emotional/contextual note about this category: {category_context}\n\n"
-        )
-
-        if guidance_text:
-            prompt += (
-                "Here are additional coaching guidelines and reflections you should follow "
-                "when speaking to the user about this situation:\n"
-                f"{guidance_text}\n\n"
-            )
-
-        prompt += (
-            "TASK 1 — Identify the category with the highest total spending.\n"
-            "TASK 2 — Choose the emotional tone the user needs. Options:\n"
-            "- reassuring\n- motivating\n- grounding\n\n"
-            "TASK 3 — Give ONE gentle and actionable financial suggestion.\n\n"
-            "TASK 4 — Write a short (3–4 sentences) narrative insight using the chosen tone.\n"
-            "Include empathy, clarity, and emotional awareness.\n\n"
-            "FORMAT the response STRICTLY as JSON with:\n"
-            "{\n"
-            "  'top_category': '',\n"
-            "  'emotional_tone': '',\n"
-            "  'suggested_action': '',\n"
-            "  'aiva_insight': ''\n"
-            "}\n"
-            "Return only JSON. No commentary."
-        )
-
-        # ---- 5. Call Gemini with Circuit Breaker Protection ----
-        client = get_gemini_client()
-
-        if not client:
+        # ---- 3. Build prompt from the compiled template ----
+        # Category context and KB guidance are pre-rendered per category
+        try:
+            with span("prompt"):
+                prompt = prompt_builder.insights(
+                    totals, dominant_category, total_spend, spend_level, user_name="friend")
+        except PromptTooLargeError as e:
             raise HTTPException(
-                status_code=503,
-                detail="AI service is temporarily unavailable."
+                status_code=400,
+                detail=f"Spending data is too large to analyze. {e}"
             )
 
-        try:
-            def call_gemini_api():
-                return client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=prompt,
-                )
-
-            response = gemini_circuit_breaker.call(call_gemini_api)
-            ai_text = response.text
-
-        except Exception as e:
-            error_msg = str(e)
-
-            if "Circuit breaker is OPEN" in error_msg:
-                # ✅ FIXED: Use logging
-                logger.warning(f"Circuit breaker OPEN: {error_msg}")
-                raise HTTPException(
-                    status_code=503,
-                    detail=error_msg
-                )
-
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                # ✅ FIXED: Use logging
-                logger.warning("Gemini API rate limit hit", exc_info=True)
-                raise HTTPException(
-                    status_code=429,
-                    detail="AI service rate limit exceeded. Please try again in a moment."
-                )
+        # ---- 4. Call Gemini, or fall back to the deterministic engine ----
+        fallback_mode = get_settings().insights_fallback_mode
+        degraded = fallback_mode == "always"
 
-            # ✅ FIXED: Use logging
-            logger.error("Gemini API error", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to call AI service. Please try again later."
-            )
+        if not degraded:
+            try:
+                insight_data = await _model_insight(prompt)
+            except HTTPException as e:
+                if fallback_mode != "auto" or not allow_degraded:
+                    raise
+                logger.warning(f"Serving fallback insight after AI error ({e.status_code}): {e.detail}")
+                insights_degraded.inc((str(e.status_code),))
+                degraded = True
+        else:
+            insights_degraded.inc(("always",))
 
-        # ---- 6. Parse JSON safely ----
-        try:
-            insight_data = parse_ai_json(ai_text)
-        except json.JSONDecodeError:
-            # ✅ FIXED: Use logging
-            logger.error("AI returned non-JSON", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail="AI returned invalid JSON for insights."
-            )
+        if degraded:
+            with span("fallback"):
+                insight_data = build_fallback_insight(
+                    totals, dominant_category, total_spend, spend_level, user_name="friend")
 
-        # ---- 7. Merge backend summary + AI insight ----
+        # ---- 5. Merge backend summary + AI insight ----
         response_body = {
             "spending_summary": totals,
             **insight_data
@@ -188,6 +246,12 @@ def ai_insights() -> InsightResponse:
             response_body["checkin_question"] = checkin_question
             response_body["checkin_options"] = checkin_options
 
+        if degraded:
+            # Not cached, so the next view gets a real insight once AI recovers
+            response_body["degraded"] = True
+        elif not skip_store:
+            insights_cache.set(cache_key, response_body)
+
         return response_body
 
     except HTTPException:
@@ -199,3 +263,54 @@ def ai_insights() -> InsightResponse:
             status_code=500,
             detail="An unexpected error occurred while generating insights."
         )
+
+
+@router.post(
+    "/ai/insights/batch",
+    response_model=InsightsBatchResponse,
+    responses={
+        503: {"model": ErrorResponse},
+    },
+)
+async def ai_insights_batch(req: InsightsBatchRequest) -> InsightsBatchResponse:
+    """
+    Generate insights for many spending summaries at once.
+
+    Summaries are packed into as few Gemini calls as the prompt size limit
+    and INSIGHTS_BATCH_MAX_ITEMS allow, so a nightly digest spends a handful
+    of quota tokens instead of one per user. Each call returns a JSON array
+    that is split back into per-item insights; items whose part of the
+    output is unusable are retried on their own. At most
+    INSIGHTS_BATCH_MAX_CONCURRENCY calls run at once so a large batch
+    leaves quota for live traffic. Failures are reported per item, so the
+    response is 200 even if some items fail.
+    """
+    client = get_gemini_client()
+
+    if not client:
+        raise HTTPException(
+            status_code=503,
+            detail="AI service is temporarily unavailable."
+        )
+
+    async def call(prompt) -> str:
+        response = await insights_circuit_breaker.call_async(
+            generate_content, client, prompt.text, None, prompt.preamble, prompt.schema)
+        return response.text
+
+    settings = get_settings()
+    report = await generate_batch_insights(
+        [(item.id, item.spending_summary) for item in req.items],
+        call,
+        max_items=settings.insights_batch_max_items,
+        max_concurrency=settings.insights_batch_max_concurrency
+        or default_concurrency(settings.gemini_quota_per_minute),
+    )
+
+    failed = sum(1 for result in report["results"] if result.get("error"))
+    logger.info(
+        "Batch insights: %d items, %d upstream calls (%d packed), %d retried, %d failed",
+        len(req.items), report["upstream_calls"], report["packed_calls"],
+        report["retried_items"], failed,
+    )
+    return report
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Response
+
+from app.helpers.circuit_breaker import circuit_breakers
+from app.helpers.http_pool import gemini_http_stats
+from app.helpers.job_queue import insight_jobs
+from app.helpers.metrics import CONTENT_TYPE, registry
+from app.helpers.preamble_cache import preamble_cache
+from app.helpers.response_cache import insights_cache
+from app.helpers.single_flight import gemini_single_flight
+from app.services.model_router import model_router
+
+router = APIRouter()
+
+BREAKER_STATES = ("CLOSED", "OPEN", "HALF_OPEN")
+
+
+def _breaker_state():
+    for name, breaker in circuit_breakers.items():
+        for state in BREAKER_STATES:
+            yield ("aiva_circuit_breaker_state", {"breaker": name, "state": state},
+                   1 if breaker.state == state else 0)
+
+
+def _breaker_transitions():
+    for name, breaker in circuit_breakers.items():
+        for (old, new), count in list(breaker.transitions.items()):
+            yield ("aiva_circuit_breaker_transitions_total",
+                   {"breaker": name, "from": old, "to": new}, count)
+
+
+def _breaker_rejections():
+    for name, breaker in circuit_breakers.items():
+        yield "aiva_circuit_breaker_rejections_total", {"breaker": name}, breaker.rejected_count
+
+
+def _quota_requests():
+    for model, quota, _ in model_router.quota_governors():
+        yield "aiva_quota_requests_total", {"model": model, "result": "granted"}, quota.granted
+        yield "aiva_quota_requests_total", {"model": model, "result": "rejected"}, quota.rejected
+
+
+def _cache_lookups():
+    stats = insights_cache.get_stats()
+    yield "aiva_response_cache_lookups_total", {"cache": "insights", "result": "hit"}, stats["hits"]
+    yield "aiva_response_cache_lookups_total", {"cache": "insights", "result": "miss"}, stats["misses"]
+
+
+def _cache_hit_ratio():
+    yield "aiva_response_cache_hit_ratio", {"cache": "insights"}, insights_cache.get_stats()["hit_ratio"]
+
+
+def _cache_entries():
+    yield "aiva_response_cache_entries", {"cache": "insights"}, insights_cache.get_stats()["entries"]
+
+
+def _context_cache_events():
+    for event in ("hits", "creates", "refreshes", "fallbacks", "errors"):
+        yield "aiva_context_cache_events_total", {"event": event}, getattr(preamble_cache, event)
+
+
+def _coalescing():
+    state = gemini_single_flight.get_state()
+    yield "aiva_coalesced_callers_total", {}, state["coalesced_callers"]
+
+
+def _jobs():
+    counts = insight_jobs.get_state()["jobs"] or {}
+    for status, count in counts.items():
+        yield "aiva_insight_jobs", {"status": status}, count
+
+
+def _pool_requests():
+    stats = gemini_http_stats.get_stats()
+    yield "aiva_gemini_http_requests_total", {"connection": "new"}, stats["connections_opened"]
+    yield "aiva_gemini_http_requests_total", {"connection": "reused"}, stats["reused_requests"]
+
+
+def _pool_saturation():
+    yield "aiva_gemini_http_saturated_requests_total", {}, gemini_http_stats.saturated_requests
+
+
+def _pool_in_flight():
+    yield "aiva_gemini_http_in_flight", {}, gemini_http_stats.in_flight
+
+
+def _pool_timeouts():
+    for kind, count in list(gemini_http_stats.timeouts.items()):
+        yield "aiva_gemini_http_timeouts_total", {"kind": kind}, count
+
+
+def _model_selections():
+    for name, tier in list(model_router.by_name.items()):
+        yield "aiva_model_selected_total", {"model": name}, tier.selected
+
+
+def _model_downshifts():
+    for (model, reason), count in list(model_router.downshifts.items()):
+        yield "aiva_model_downshifts_total", {"from": model, "reason": reason}, count
+
+
+def _model_tokens():
+    for name, tier in list(model_router.by_name.items()):
+        yield "aiva_model_tokens_total", {"model": name, "direction": "input"}, tier.input_tokens
+        yield "aiva_model_tokens_total", {"model": name, "direction": "output"}, tier.output_tokens
+
+
+def _model_cost():
+    for name, tier in list(model_router.by_name.items()):
+        yield "aiva_model_cost_usd_total", {"model": name}, tier.cost
+
+
+def _model_latency():
+    for name, tier in list(model_router.by_name.items()):
+        if tier.latency is not None:
+            yield "aiva_model_latency_seconds", {"model": name}, tier.latency
+
+
+registry.collector("aiva_circuit_breaker_state", "gauge",
+                   "1 for each breaker's current state, 0 otherwise.", _breaker_state)
+registry.collector("aiva_circuit_breaker_transitions_total", "counter",
+                   "Circuit breaker state transitions.", _breaker_transitions)
+registry.collector("aiva_circuit_breaker_rejections_total", "counter",
+                   "Calls failed fast by an open or probing breaker.", _breaker_rejections)
+registry.collector("aiva_quota_requests_total", "counter",
+                   "Gemini quota token requests by model budget and result.", _quota_requests)
+registry.collector("aiva_response_cache_lookups_total", "counter",
+                   "Response cache lookups by result.", _cache_lookups)
+registry.collector("aiva_response_cache_hit_ratio", "gauge",
+                   "Response cache hits over lookups since start.", _cache_hit_ratio)
+registry.collector("aiva_response_cache_entries", "gauge",
+                   "Entries held in the response cache.", _cache_entries)
+registry.collector("aiva_context_cache_events_total", "counter",
+                   "Preamble context cache events.", _context_cache_events)
+registry.collector("aiva_coalesced_callers_total", "counter",
+                   "Callers served by another caller's in-flight Gemini call.", _coalescing)
+registry.collector("aiva_insight_jobs", "gauge",
+                   "Insight jobs held in the job store by status.", _jobs)
+registry.collector("aiva_gemini_http_requests_total", "counter",
+                   "Gemini HTTP requests by whether they opened a new connection.", _pool_requests)
+registry.collector("aiva_gemini_http_saturated_requests_total", "counter",
+                   "Gemini HTTP requests sent while every pooled connection was busy.", _pool_saturation)
+registry.collector("aiva_gemini_http_in_flight", "gauge",
+                   "Gemini HTTP requests waiting for response headers.", _pool_in_flight)
+registry.collector("aiva_gemini_http_timeouts_total", "counter",
+                   "Gemini HTTP timeouts by kind (connect, read, write, pool).", _pool_timeouts)
+registry.collector("aiva_model_selected_total", "counter",
+                   "Gemini calls routed to each model.", _model_selections)
+registry.collector("aiva_model_downshifts_total", "counter",
+                   "Calls sent to a lighter model, by the preferred model and why it was skipped.",
+                   _model_downshifts)
+registry.collector("aiva_model_tokens_total", "counter",
+                   "Gemini tokens used per model, by direction.", _model_tokens)
+registry.collector("aiva_model_cost_usd_total", "counter",
+                   "Estimated Gemini spend per model in USD.", _model_cost)
+registry.collector("aiva_model_latency_seconds", "gauge",
+                   "Moving average Gemini call latency per model, as used for routing.", _model_latency)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Metrics in the Prometheus text exposition format: request counts and
+    latency per route and status, Gemini call latency and outcomes, breaker
+    state and transitions, quota rejections, cache hit ratios, Gemini
+    connection pool reuse and saturation, and per-model routing and usage.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,74 @@
+import logging
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from app.helpers.timing import span
+from app.models.responses import ErrorResponse, TransactionImportResponse
+from app.services.spending_aggregates import (
+    ConcurrentUpdateError, ReservedUserError, spending_aggregates
+)
+from app.services.transaction_import import ImportFormatError, import_transactions
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.post(
+    "/transactions/import",
+    response_model=TransactionImportResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        409: {"model": ErrorResponse},
+    },
+)
+async def import_transactions_upload(
+    request: Request,
+    user_id: str | None = Query(None, max_length=100),
+) -> TransactionImportResponse:
+    """
+    Import a bank export as a JSON array, NDJSON or CSV.
+
+    The body is parsed incrementally as it streams in, so memory use stays
+    flat regardless of upload size. The format comes from Content-Type
+    (application/json, application/x-ndjson, text/csv) or is sniffed from
+    the data. Invalid rows are skipped and reported; valid rows are
+    summarised by category.
+
+    With a `user_id`, valid rows are also added to that user's running
+    spending aggregates, all at once after the whole upload has parsed: an
+    upload rejected with 400 changes nothing, so it can simply be retried.
+    Rows with an `id` replace any earlier row with the same id, so
+    re-importing a corrected export is safe, and `spending_summary` is then
+    the user's totals after the import. The mock dataset's id is read-only.
+    """
+    staged = None
+    if user_id:
+        try:
+            staged = spending_aggregates.stage(user_id)
+        except ReservedUserError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        with span("import"):
+            report = await import_transactions(
+                request.stream(), request.headers.get("content-type"),
+                on_batch=staged.append if staged else None)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if staged:
+        try:
+            snapshot = spending_aggregates.commit(staged)
+        except ConcurrentUpdateError:
+            raise HTTPException(
+                status_code=409,
+                detail="This user's spending data changed during the import. Please retry."
+            )
+        report["snapshot_version"] = snapshot.version
+        report["spending_summary"] = snapshot.totals
+
+    logger.info(
+        "Imported %d rows (%d rejected) as %s in %.2fs (%.0f rows/sec)",
+        report["rows_imported"], report["rows_rejected"], report["format"],
+        report["elapsed_seconds"], report["rows_per_second"],
+    )
+    return report
@@ -1,13 +1,291 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import AsyncIterator
 from functools import lru_cache
-from google import genai
+
+import httpx
+
 from app.core.config import get_settings
+from app.helpers.deadline import DeadlineExceededError, call_budget, remaining
+from app.helpers.http_pool import get_gemini_http_client
+from app.helpers.metrics import gemini_call_duration, gemini_calls, gemini_retries, work_saved
+from app.helpers.preamble_cache import preamble_cache
+from app.services.model_router import DEFAULT_MODEL, ModelTier, model_router
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth another attempt: INTERNAL, bad gateway,
+# UNAVAILABLE and DEADLINE_EXCEEDED. 429 is not retried on the same model;
+# the router, the quota governors and the routes' Retry-After handle it.
+_TRANSIENT_STATUS = frozenset({500, 502, 503, 504})
+# Failures before the request reached Gemini, so it was not processed
+_TRANSIENT_TRANSPORT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
 
 
 @lru_cache
 def get_gemini_client():
-    api_key = get_settings().gemini_api_key
+    settings = get_settings()
 
-    if not api_key:
+    if not settings.gemini_api_key:
         return None
 
-    return genai.Client(api_key=api_key)
+    # Imported here: google.genai is over half of the app's import time, and
+    # /health should not wait for it on a cold start
+    from google import genai
+    from google.genai import types
+
+    # Async calls share one tuned keep-alive pool with per-endpoint timeouts.
+    # A base URL override points the SDK at a proxy or a local fake server.
+    http_options = types.HttpOptions(
+        base_url=settings.gemini_base_url,
+        httpx_async_client=get_gemini_http_client(),
+    )
+    return genai.Client(api_key=settings.gemini_api_key, http_options=http_options)
+
+
+@lru_cache
+def _get_in_flight_limiter() -> asyncio.Semaphore:
+    return asyncio.Semaphore(get_settings().gemini_max_in_flight)
+
+
+def _is_missing_cache(error: Exception) -> bool:
+    message = str(error).lower()
+    return "cachedcontent" in message.replace(" ", "") or "cached content" in message
+
+
+def _outcome(error: BaseException) -> str:
+    """Outcome label for a failed call."""
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    message = str(error)
+    if "429" in message or "RESOURCE_EXHAUSTED" in message:
+        return "rate_limited"
+    return "error"
+
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, _TRANSIENT_TRANSPORT):
+        return True
+    return getattr(error, "code", None) in _TRANSIENT_STATUS
+
+
+def _retry_delay(attempt: int, error: Exception, failed_model: str | None,
+                 routed: bool) -> float | None:
+    """
+    Seconds to wait before retrying after failed attempt number `attempt`,
+    or None if the call should not be retried.
+
+    Full jitter: uniform in [0, min(cap, base * 2^(attempt - 1))]. A routed
+    call rate limited by Gemini is retried at once if the router has another
+    model to send it to. A retry is only made if the request's deadline
+    leaves room for the wait plus a useful call.
+    """
+    settings = get_settings()
+    if attempt >= settings.gemini_retry_max_attempts:
+        return None
+    if (routed and failed_model is not None and _outcome(error) == "rate_limited"
+            and model_router.has_alternative(failed_model)):
+        delay = 0.0
+    elif _is_transient(error):
+        delay = random.uniform(0, min(settings.gemini_retry_max_seconds,
+                                      settings.gemini_retry_base_seconds * 2 ** (attempt - 1)))
+    else:
+        return None
+    left = remaining()
+    if left is not None and left - delay < settings.gemini_min_call_budget_seconds:
+        work_saved.inc(("retry_skipped_deadline",))
+        return None
+    return delay
+
+
+async def _call_within_deadline(model: str | None, kind: str, attempt):
+    """
+    Run `await attempt(models)` inside the request's deadline, retrying
+    transient failures with jittered exponential backoff while the deadline
+    allows. Each attempt appends the model it used to `models`.
+
+    Raises:
+        DeadlineExceededError: If there is too little time to start an
+            attempt, or the deadline passes during one
+    """
+    models: list[str] = []
+    for number in range(1, get_settings().gemini_retry_max_attempts + 1):
+        timeout = asyncio.timeout(call_budget(get_settings().gemini_min_call_budget_seconds))
+        try:
+            async with timeout:
+                return await attempt(models)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            work_saved.inc(("deadline_cancelled",))
+            raise DeadlineExceededError(remaining() or 0.0) from None
+        except Exception as e:
+            failed_model = models[-1] if models else None
+            delay = _retry_delay(number, e, failed_model, routed=model is None)
+            if delay is None:
+                raise
+            gemini_retries.inc((failed_model or DEFAULT_MODEL, kind))
+            logger.warning(f"Gemini error from {failed_model} on attempt {number}, "
+                           f"retrying in {delay:.2f} s: {e}")
+            await asyncio.sleep(delay)
+
+
+def _observe_call(model: str, kind: str, outcome: str, start: float) -> None:
+    labels = (model, kind, outcome)
+    gemini_calls.inc(labels)
+    gemini_call_duration.observe(time.perf_counter() - start, labels)
+
+
+def _output_config(response_schema) -> dict:
+    if response_schema is None:
+        return {}
+    return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+
+async def _call_with_preamble(call, client, prompt: str, model: str, preamble: str | None,
+                              response_schema=None):
+    """
+    Run a models.* call with the preamble's cached content (or system
+    instruction) and, if given, a structured-output schema. If the cache has
+    vanished server-side, forget it and retry once with the preamble inline.
+    """
+    output = _output_config(response_schema)
+    if preamble is None:
+        if output:
+            return await call(model=model, contents=prompt, config=output)
+        return await call(model=model, contents=prompt)
+
+    config = await preamble_cache.config_for(client, preamble, model)
+    try:
+        return await call(model=model, contents=prompt, config={**config, **output})
+    except Exception as e:
+        if "cached_content" not in config or not _is_missing_cache(e):
+            raise
+        preamble_cache.invalidate(preamble, model)
+        return await call(model=model, contents=prompt,
+                          config={"system_instruction": preamble_cache.text(preamble), **output})
+
+
+async def generate_content(client, prompt: str, model: str | None = None,
+                           preamble: str | None = None, response_schema=None):
+    """
+    Call Gemini through the SDK's async client (`client.aio`).
+
+    At most `gemini_max_in_flight` calls run at once per process. Extra
+    callers wait on the event loop instead of holding a worker thread.
+    Inside a request the call is bounded by the request's deadline, and
+    transient upstream failures are retried while it leaves time; each
+    attempt draws its own quota.
+
+    Args:
+        client: Gemini client
+        prompt: Per-request prompt text
+        model: Model name; None lets `model_router` pick one per attempt
+            from the pool by quota, latency and deadline
+        preamble: Name of a registered preamble (static instructions) to
+            apply through context caching
+        response_schema: Pydantic model (or list of one) the output must
+            match; requests JSON structured output
+
+    Raises:
+        QuotaExceededError: If no model in the pool has budget left
+        DeadlineExceededError: If the request's deadline does not leave
+            time for the call
+    """
+    return await _call_within_deadline(
+        model, "generate",
+        lambda models: _generate_once(client, prompt, model, preamble, response_schema, models))
+
+
+def _record_failure(tier: ModelTier, error: BaseException) -> None:
+    if isinstance(error, Exception):
+        model_router.record_failure(tier, rate_limited=_outcome(error) == "rate_limited")
+
+
+async def _generate_once(client, prompt: str, model: str | None, preamble: str | None,
+                         response_schema, models: list[str]):
+    tier = await model_router.acquire(model)
+    models.append(tier.name)
+
+    async with _get_in_flight_limiter():
+        start = time.perf_counter()
+        try:
+            response = await _call_with_preamble(
+                client.aio.models.generate_content, client, prompt, tier.name, preamble,
+                response_schema)
+        except BaseException as e:
+            _observe_call(tier.name, "generate", _outcome(e), start)
+            _record_failure(tier, e)
+            raise
+        _observe_call(tier.name, "generate", "ok", start)
+        model_router.record_success(tier, time.perf_counter() - start,
+                                    getattr(response, "usage_metadata", None))
+        return response
+
+
+async def _stream_text(client, prompt: str, model: str | None, preamble: str | None,
+                       response_schema, models: list[str]) -> AsyncIterator[str]:
+    tier = await model_router.acquire(model)
+    models.append(tier.name)
+
+    async with _get_in_flight_limiter():
+        start = time.perf_counter()
+        usage = None
+        try:
+            stream = await _call_with_preamble(
+                client.aio.models.generate_content_stream, client, prompt, tier.name, preamble,
+                response_schema)
+            async for chunk in stream:
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                if chunk.text:
+                    yield chunk.text
+        except GeneratorExit:
+            # The consumer stopped reading (e.g. client disconnected)
+            _observe_call(tier.name, "stream", "cancelled", start)
+            raise
+        except BaseException as e:
+            _observe_call(tier.name, "stream", _outcome(e), start)
+            _record_failure(tier, e)
+            raise
+        _observe_call(tier.name, "stream", "ok", start)
+        # Stream duration depends on output length, so it does not feed the latency average
+        model_router.record_success(tier, usage=usage)
+
+
+async def _prepend(first: str | None, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    if first is not None:
+        yield first
+    async for text in rest:
+        yield text
+
+
+async def start_content_stream(client, prompt: str, model: str | None = None,
+                               preamble: str | None = None,
+                               response_schema=None) -> AsyncIterator[str]:
+    """
+    Start a streaming Gemini call and wait for the first text chunk.
+
+    Waiting for the first chunk means quota and upstream errors are raised
+    here, before anything is sent to the user, so routes can still answer
+    with a proper status code. The wait is bounded by the request's deadline
+    and retried like `generate_content`; after the first chunk the stream is
+    bounded by the HTTP read timeout and ends if the client disconnects.
+    Returns an iterator over every text chunk, starting with the first.
+
+    Raises:
+        QuotaExceededError: If no model in the pool has budget left
+        DeadlineExceededError: If the request's deadline does not leave
+            time for the first chunk
+    """
+    async def first_chunk(models):
+        chunks = _stream_text(client, prompt, model, preamble, response_schema, models)
+        try:
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = None
+        return first, chunks
+
+    first, chunks = await _call_within_deadline(model, "stream", first_chunk)
+    return _prepend(first, chunks)
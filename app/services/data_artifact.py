@@ -0,0 +1,101 @@
+"""
+Precompiled data artifact for fast cold starts.
+
+Parsing the JSON data files and compiling the knowledge base (inverted
+index, template splits, vector index) happens on the first request of every
+new instance. `python -m app.services.data_artifact` does that work once,
+at image build time, and pickles the results next to the JSON files. At
+runtime the loaders read the artifact if it exists and still matches the
+source files (by size and mtime), and fall back to the JSON otherwise.
+
+The artifact is built inside the image from the repository's own files,
+so unpickling it is no more trusted than importing the code.
+"""
+import logging
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARTIFACT_PATH = BASE_DIR / "data" / "compiled.pickle"
+SOURCES = {
+    "knowledge_base": BASE_DIR / "data" / "knowledge_base.json",
+    "mock_transactions": BASE_DIR / "data" / "mock_transactions.json",
+}
+# Bump when the pickled layout or the compiled classes change
+FORMAT_VERSION = 3
+
+_artifact: Dict[str, Any] | None = None
+_loaded = False
+
+
+def _fingerprint(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def build_artifact(path: Path = ARTIFACT_PATH) -> Dict[str, Any]:
+    """Compile the data files and write the artifact."""
+    import json
+
+    from app.services.knowledge_retriever import CompiledKnowledgeBase
+
+    with open(SOURCES["knowledge_base"], "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    with open(SOURCES["mock_transactions"], "r") as f:
+        transactions = json.load(f)["transactions"]
+
+    knowledge_base = CompiledKnowledgeBase(entries)
+    knowledge_base.vector_index  # built lazily otherwise
+    for category in list(knowledge_base._by_category):
+        knowledge_base.retrieve(category)
+
+    artifact = {
+        "format": FORMAT_VERSION,
+        "sources": {name: _fingerprint(source) for name, source in SOURCES.items()},
+        "knowledge_base": knowledge_base,
+        "mock_transactions": transactions,
+    }
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def load_artifact() -> Dict[str, Any] | None:
+    """
+    The compiled artifact, or None if it is missing or stale (read once).
+    """
+    global _artifact, _loaded
+    if _loaded:
+        return _artifact
+    _loaded = True
+    if not ARTIFACT_PATH.exists():
+        return None
+    try:
+        with open(ARTIFACT_PATH, "rb") as f:
+            artifact = pickle.load(f)
+        sources = {name: _fingerprint(source) for name, source in SOURCES.items()}
+        if artifact.get("format") != FORMAT_VERSION or artifact.get("sources") != sources:
+            logger.warning("Ignoring stale data artifact %s; rebuild it with "
+                           "`python -m app.services.data_artifact`", ARTIFACT_PATH)
+            return None
+    except Exception:
+        logger.warning("Could not load data artifact %s", ARTIFACT_PATH, exc_info=True)
+        return None
+    _artifact = artifact
+    return _artifact
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    built = build_artifact()
+    print(f"Wrote {ARTIFACT_PATH} ({ARTIFACT_PATH.stat().st_size} bytes, "
+          f"{built['knowledge_base'].size} KB entries, "
+          f"{len(built['mock_transactions'])} transactions) in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,117 @@
+"""
+Deterministic insights for when Gemini cannot be used.
+
+Builds a complete InsightResponse body from the spending summary alone:
+the tone comes from the spend level and how concentrated spending is, the
+suggested action from a per-category table, and the narrative from the
+category context plus the first reflection in the category's KB guidance.
+Everything except the amounts is rendered once per (category, tone, KB
+version), so a build is a dict lookup and one compiled template render.
+"""
+import re
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from app.services.knowledge_retriever import CHECKIN_TYPE, get_compiled_knowledge_base
+from app.services.prompt_builder import CATEGORY_CONTEXT, DEFAULT_CONTEXT, PromptTemplate
+
+# Dominant category share above which moderate spending is treated as high
+CONCENTRATED_SHARE = 0.6
+
+TONE_BY_LEVEL = {"low": "motivating", "moderate": "reassuring", "high": "grounding"}
+
+CATEGORY_ACTIONS: Dict[str, str] = {
+    "Food": "Try preparing one extra meal at home this week.",
+    "Transport": "Check whether one regular trip this week could be walked, shared or combined.",
+    "Entertainment": "Plan one free or low-cost way to unwind before booking the next outing.",
+    "Shopping": "Wait 24 hours before any non-essential purchase this week.",
+}
+DEFAULT_ACTION = "Set a small weekly limit for {category} and check in on it midweek."
+
+OPENINGS = {
+    "motivating": (
+        "You kept this week's spending to about £{total_spend:.2f}, "
+        "and {category_label} was the largest share at £{top_amount:.2f} ({share:.0f}%). "
+    ),
+    "reassuring": (
+        "You spent around £{total_spend:.2f} this week, "
+        "with {category_label} leading at £{top_amount:.2f} ({share:.0f}%). "
+    ),
+    "grounding": (
+        "This week's spending came to about £{total_spend:.2f}, "
+        "and {category_label} was the biggest part of it at £{top_amount:.2f} ({share:.0f}%). "
+    ),
+}
+CLOSINGS = {
+    "motivating": "You're building steady habits, so keep going.",
+    "reassuring": "Nothing here is out of reach to adjust, one small change at a time.",
+    "grounding": "Let's slow things down and take it one small step at a time.",
+}
+
+_FIRST_SENTENCE = re.compile(r"\s*(.+?[.!?])(?:\s|$)", re.S)
+
+
+def _reflection(category: str, user_name: str) -> str:
+    """First sentence of the last paragraph of the category's first KB entry."""
+    for entry in get_compiled_knowledge_base().retrieve(category).entries:
+        if entry.item.get("type") == CHECKIN_TYPE:
+            continue
+        text = user_name.join(entry.text_parts).strip()
+        if not text:
+            continue
+        match = _FIRST_SENTENCE.match(text.split("\n\n")[-1])
+        if match:
+            return match.group(1) + " "
+    return ""
+
+
+def choose_tone(spend_level: str, share: float) -> str:
+    """Pick the emotional tone for a spend level and dominant-category share."""
+    if spend_level == "moderate" and share >= CONCENTRATED_SHARE:
+        return "grounding"
+    return TONE_BY_LEVEL.get(spend_level, "reassuring")
+
+
+@lru_cache(maxsize=512)
+def _compiled(category: str, tone: str, kb_version: str, user_name: str) -> Tuple[PromptTemplate, str]:
+    """Narrative template with everything but the amounts filled in, and the action."""
+    template = PromptTemplate(
+        OPENINGS[tone] + "{context} {reflection}{closing}"
+    ).partial(
+        category_label=category.lower(),
+        context=CATEGORY_CONTEXT.get(category, DEFAULT_CONTEXT),
+        reflection=_reflection(category, user_name),
+        closing=CLOSINGS[tone],
+    )
+    action = CATEGORY_ACTIONS.get(category) or DEFAULT_ACTION.format(category=category.lower())
+    return template, action
+
+
+def build_fallback_insight(totals: Dict[str, float], dominant_category: str,
+                           total_spend: float, spend_level: str,
+                           user_name: str = "friend") -> Dict[str, Any]:
+    """
+    Build the AI fields of an insight without calling the model.
+
+    Args:
+        totals: Spending by category (non-empty)
+        dominant_category: Category with the highest spend
+        total_spend: Sum of totals
+        spend_level: "low", "moderate" or "high"
+        user_name: Name substituted into KB guidance
+
+    Returns:
+        top_category, emotional_tone, suggested_action and aiva_insight
+    """
+    top_amount = totals[dominant_category]
+    share = top_amount / total_spend if total_spend > 0 else 1.0
+    tone = choose_tone(spend_level, share)
+    template, action = _compiled(
+        dominant_category, tone, get_compiled_knowledge_base().version, user_name)
+    return {
+        "top_category": dominant_category,
+        "emotional_tone": tone,
+        "suggested_action": action,
+        "aiva_insight": template.render(
+            total_spend=total_spend, top_amount=top_amount, share=share * 100),
+    }
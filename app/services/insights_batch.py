@@ -0,0 +1,240 @@
+"""
+Batch insights: many users' spending summaries packed into few Gemini calls.
+
+Each user's usual insights prompt becomes one '### USER <id>' section, and
+sections are packed greedily into calls until the prompt size limit or the
+per-call item cap is reached. Every packed call asks for a JSON array, which
+is split back into per-user InsightResponse objects by id. Items whose entry
+is missing or malformed are retried one by one with the single-user prompt;
+the rest of the pack is kept.
+
+Batch calls draw on the same quota as live /ai/insights traffic, so only a
+few calls run at once, and once the quota is spent the remaining items fail
+with a rate-limit error rather than making calls that will be rejected.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.helpers.circuit_breaker import CircuitOpenError
+from app.helpers.json_cleaner import parse_ai_json
+from app.helpers.quota import QuotaExceededError
+from app.models.responses import InsightResponse
+from app.services.knowledge_retriever import retrieve
+from app.services.prompt_builder import BATCH_SEPARATOR, Prompt, PromptTooLargeError, prompt_builder
+from app.services.spending_engine import describe_spending
+
+logger = logging.getLogger(__name__)
+
+# Sends a prompt to the model and returns the response text
+ModelCall = Callable[[Prompt], Awaitable[str]]
+
+
+@dataclass
+class _Item:
+    id: str
+    totals: Dict[str, float]
+    prompt: Prompt
+    section: str
+
+
+class _InvalidItem(ValueError):
+    """The model's output for one item could not be used."""
+
+
+def pack(items: List[_Item], budget: int, max_items: int) -> List[List[_Item]]:
+    """
+    Group items into calls of at most `budget` characters and `max_items`
+    items, keeping request order. An item too large to share a call gets
+    its own.
+    """
+    packs: List[List[_Item]] = []
+    current: List[_Item] = []
+    size = 0
+    for item in items:
+        extra = len(item.section) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and (size + extra > budget or len(current) >= max_items):
+            packs.append(current)
+            current, size = [], 0
+            extra = len(item.section)
+        current.append(item)
+        size += extra
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, CircuitOpenError):
+        return "AI service is temporarily unavailable."
+    if isinstance(error, QuotaExceededError):
+        return "AI service rate limit exceeded. Please try again in a moment."
+    return "Failed to call AI service."
+
+
+def default_concurrency(quota_per_minute: int) -> int:
+    """Calls a batch may have in flight: a tenth of the per-minute quota, at least one."""
+    return max(1, quota_per_minute // 10)
+
+
+class BatchRun:
+    """
+    Generates insights for one batch request.
+
+    Args:
+        call: Sends a prompt to the model and returns its text
+        max_items: Most items packed into one call
+        max_concurrency: Most upstream calls in flight at once
+    """
+
+    def __init__(self, call: ModelCall, max_items: int, max_concurrency: int = 1):
+        self.call = call
+        self.max_items = max_items
+        self.upstream_calls = 0
+        self.packed_calls = 0
+        self.retried_items = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._quota_error: QuotaExceededError | None = None
+
+    async def _call(self, prompt: Prompt, packed: bool = False) -> str:
+        """Send one prompt, waiting for a free slot; fails fast once quota ran out."""
+        async with self._slots:
+            if self._quota_error is not None:
+                raise self._quota_error
+            self.upstream_calls += 1
+            if packed:
+                self.packed_calls += 1
+            try:
+                return await self.call(prompt)
+            except QuotaExceededError as e:
+                self._quota_error = e
+                raise
+
+    def _insight(self, item: _Item, data: Any) -> Dict[str, Any]:
+        """Merge the model's fields for an item with our summary and validate."""
+        if not isinstance(data, dict):
+            raise _InvalidItem("AI returned no insight for this item.")
+        fields = {key: value for key, value in data.items() if key != "id"}
+        body = {"spending_summary": item.totals, **fields}
+
+        checkin = retrieve(describe_spending(item.totals)[0]).checkin
+        if checkin and checkin.get("question") and checkin.get("options"):
+            body["checkin_question"] = checkin["question"]
+            body["checkin_options"] = checkin["options"]
+
+        try:
+            return InsightResponse(**body).model_dump(exclude_none=True)
+        except ValidationError:
+            raise _InvalidItem("AI returned an invalid insight for this item.") from None
+
+    async def _single(self, item: _Item) -> Dict[str, Any]:
+        text = await self._call(item.prompt)
+        try:
+            return self._insight(item, parse_ai_json(text))
+        except json.JSONDecodeError:
+            raise _InvalidItem("AI returned invalid JSON for this item.") from None
+
+    async def _run_single(self, item: _Item) -> Dict[str, Any]:
+        try:
+            return {"id": item.id, "insight": await self._single(item)}
+        except _InvalidItem as e:
+            return {"id": item.id, "error": str(e)}
+        except Exception as e:
+            logger.warning(f"Batch insight for item {item.id} failed: {e}")
+            return {"id": item.id, "error": _error_message(e)}
+
+    async def _run_pack(self, items: List[_Item]) -> List[Dict[str, Any]]:
+        if len(items) == 1:
+            return [await self._run_single(items[0])]
+
+        try:
+            text = await self._call(prompt_builder.insights_batch([i.section for i in items]),
+                                    packed=True)
+        except Exception as e:
+            logger.warning(f"Packed insights call for {len(items)} items failed: {e}")
+            return [{"id": item.id, "error": _error_message(e)} for item in items]
+
+        try:
+            entries = parse_ai_json(text)
+        except json.JSONDecodeError:
+            entries = None
+        if isinstance(entries, dict):
+            # Tolerate {"results": [...]}-style wrapping
+            entries = next((v for v in entries.values() if isinstance(v, list)), None)
+        if not isinstance(entries, list):
+            logger.warning(f"Packed insights output for {len(items)} items was not a JSON array")
+            entries = []
+
+        by_id = {str(e.get("id")): e for e in entries if isinstance(e, dict)}
+        positional = not any(item.id in by_id for item in items) and len(entries) == len(items)
+
+        results: List[Dict[str, Any] | None] = []
+        retry: List[Tuple[int, _Item]] = []
+        for index, item in enumerate(items):
+            data = entries[index] if positional else by_id.get(item.id)
+            try:
+                results.append({"id": item.id, "insight": self._insight(item, data)})
+            except _InvalidItem:
+                results.append(None)
+                retry.append((index, item))
+
+        if retry:
+            self.retried_items += len(retry)
+            retried = await asyncio.gather(*(self._run_single(item) for _, item in retry))
+            for (index, _), result in zip(retry, retried):
+                results[index] = result
+        return results
+
+    async def run(self, summaries: List[Tuple[str, Dict[str, float]]]) -> Dict[str, Any]:
+        """
+        Generate one insight per (id, spending summary).
+
+        Returns:
+            Batch report with per-item results in request order and call counters
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        items: List[_Item] = []
+        for item_id, totals in summaries:
+            dominant_category, total_spend, spend_level = describe_spending(totals)
+            try:
+                prompt = prompt_builder.insights(
+                    totals, dominant_category, total_spend, spend_level, user_name="friend")
+            except PromptTooLargeError as e:
+                results[item_id] = {"id": item_id, "error": str(e)}
+                continue
+            items.append(_Item(item_id, totals, prompt,
+                               prompt_builder.batch_section(item_id, prompt)))
+
+        packs = pack(items, prompt_builder.batch_budget(), self.max_items)
+        for pack_results in await asyncio.gather(*(self._run_pack(p) for p in packs)):
+            for result in pack_results:
+                results[result["id"]] = result
+
+        return {
+            "results": [results[item_id] for item_id, _ in summaries],
+            "upstream_calls": self.upstream_calls,
+            "packed_calls": self.packed_calls,
+            "retried_items": self.retried_items,
+        }
+
+
+async def generate_batch_insights(summaries: List[Tuple[str, Dict[str, float]]],
+                                  call: ModelCall, max_items: int,
+                                  max_concurrency: int = 1) -> Dict[str, Any]:
+    """
+    Generate insights for many spending summaries in as few calls as fit.
+
+    Args:
+        summaries: (item id, spending by category) pairs
+        call: Sends a prompt to the model and returns its text
+        max_items: Most items packed into one call
+        max_concurrency: Most upstream calls in flight at once
+
+    Returns:
+        Batch report matching InsightsBatchResponse
+    """
+    return await BatchRun(call, max_items, max_concurrency).run(summaries)
@@ -1,12 +1,39 @@
+"""
+Knowledge base retrieval.
+
+The KB is compiled once at load into a category -> entries inverted index
+(with per-type sub-indexes) and text templates pre-split on `{user_name}`,
+so a lookup costs the same no matter how large the KB grows. Retrievals are
+memoized per category (least recently used first out past MAX_RETRIEVALS,
+since categories come from user data), and one retrieval serves both the
+guidance block and the check-in lookup.
+
+For pattern-based matching (e.g. picking a "delivery_spike" entry from the
+spending mix), `search_knowledge` runs a top-k cosine search over a local
+vector index of the same entries, optionally pre-filtered by category.
+"""
+import hashlib
 import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any, Mapping, Tuple
 
+from app.services.data_artifact import load_artifact
+from app.services.vector_index import VectorIndex
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 KB_PATH = BASE_DIR / "data" / "knowledge_base.json"
 
+CHECKIN_TYPE = "multi_category_checkin"
+USER_NAME_PLACEHOLDER = "{user_name}"
+# Rendered guidance blocks kept per retrieval (one per distinct user name)
+MAX_RENDERED_NAMES = 64
+# Memoized retrievals kept per compiled KB (one per distinct category)
+MAX_RETRIEVALS = 256
+
 _KB_CACHE: List[Dict[str, Any]] | None = None
+_COMPILED_KB: "CompiledKnowledgeBase | None" = None
 
 
 def load_knowledge_base() -> List[Dict[str, Any]]:
@@ -15,11 +42,154 @@ def load_knowledge_base() -> List[Dict[str, Any]]:
     """
     global _KB_CACHE
     if _KB_CACHE is None:
-        with open(KB_PATH, "r", encoding="utf-8") as f:
-            _KB_CACHE = json.load(f)
+        artifact = load_artifact()
+        if artifact is not None:
+            _KB_CACHE = artifact["knowledge_base"].entries
+        else:
+            with open(KB_PATH, "r", encoding="utf-8") as f:
+                _KB_CACHE = json.load(f)
     return _KB_CACHE
 
 
+@dataclass(frozen=True)
+class CompiledEntry:
+    """A KB entry with its guidance text pre-split for fast rendering."""
+    item: Dict[str, Any]
+    # Text split on {user_name}; rendering is a single join
+    text_parts: Tuple[str, ...]
+    # Question + option lines for check-in entries, already formatted
+    checkin_block: str
+
+    def render(self, user_name: str) -> List[str]:
+        parts = []
+        text = user_name.join(self.text_parts)
+        if text:
+            parts.append(text)
+        if self.checkin_block:
+            parts.append(self.checkin_block)
+        return parts
+
+
+@dataclass(frozen=True)
+class Retrieval:
+    """Everything the insights path needs from the KB for one category."""
+    category: str
+    entries: Tuple[CompiledEntry, ...]
+    checkin: Dict[str, Any] | None
+    # user_name -> rendered guidance block
+    _rendered: Dict[str, str] = field(default_factory=dict, compare=False, repr=False)
+
+    @property
+    def chunks(self) -> List[Dict[str, Any]]:
+        return [entry.item for entry in self.entries]
+
+    def guidance_text(self, user_name: str = "friend") -> str:
+        text = self._rendered.get(user_name)
+        if text is None:
+            parts: List[str] = []
+            for entry in self.entries:
+                parts.extend(entry.render(user_name))
+            text = "\n\n".join(parts)
+            if len(self._rendered) < MAX_RENDERED_NAMES:
+                self._rendered[user_name] = text
+        return text
+
+
+def _compile_entry(item: Dict[str, Any]) -> CompiledEntry:
+    checkin_block = ""
+    if item.get("type") == CHECKIN_TYPE:
+        question = item.get("question")
+        options = item.get("options", [])
+        if question and options:
+            option_lines = "\n".join(f"- {opt}" for opt in options)
+            checkin_block = f"{question}\n{option_lines}"
+    return CompiledEntry(
+        item=item,
+        text_parts=tuple(item.get("text", "").split(USER_NAME_PLACEHOLDER)),
+        checkin_block=checkin_block,
+    )
+
+
+class CompiledKnowledgeBase:
+    """
+    Inverted index over KB entries.
+
+    Args:
+        entries: Raw KB entries, in priority order
+        version: Identifier of this KB revision (defaults to a content hash)
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], version: str | None = None):
+        self.version = version or hashlib.sha256(
+            json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.entries = entries
+        self.size = len(entries)
+        self._vector_index: VectorIndex | None = None
+        # category -> entries in KB order; category -> type -> entries
+        self._by_category: Dict[str, List[CompiledEntry]] = {}
+        self._by_type: Dict[str, Dict[str, List[CompiledEntry]]] = {}
+        self._retrievals: "OrderedDict[str, Retrieval]" = OrderedDict()
+
+        for item in entries:
+            compiled = _compile_entry(item)
+            categories = []
+            if item.get("category") is not None:
+                categories.append(item["category"])
+            if isinstance(item.get("categories"), list):
+                categories.extend(c for c in item["categories"] if c not in categories)
+
+            for category in categories:
+                self._by_category.setdefault(category, []).append(compiled)
+                self._by_type.setdefault(category, {}).setdefault(
+                    item.get("type"), []).append(compiled)
+
+    def entries_of_type(self, category: str, entry_type: str) -> List[CompiledEntry]:
+        return self._by_type.get(category, {}).get(entry_type, [])
+
+    @property
+    def vector_index(self) -> VectorIndex:
+        """Embedding index over the entries, built on first use."""
+        if self._vector_index is None:
+            self._vector_index = VectorIndex(self.entries)
+        return self._vector_index
+
+    def retrieve(self, category: str) -> Retrieval:
+        """Memoized retrieval for a category."""
+        retrieval = self._retrievals.get(category)
+        if retrieval is not None:
+            self._retrievals.move_to_end(category)
+            return retrieval
+        checkins = self.entries_of_type(category, CHECKIN_TYPE)
+        retrieval = Retrieval(
+            category=category,
+            entries=tuple(self._by_category.get(category, ())),
+            checkin=checkins[0].item if checkins else None,
+        )
+        self._retrievals[category] = retrieval
+        while len(self._retrievals) > MAX_RETRIEVALS:
+            self._retrievals.popitem(last=False)
+        return retrieval
+
+
+def get_compiled_knowledge_base() -> CompiledKnowledgeBase:
+    """Compile the knowledge base on first use (or take it from the data artifact)."""
+    global _COMPILED_KB
+    if _COMPILED_KB is None:
+        artifact = load_artifact()
+        if artifact is not None:
+            _COMPILED_KB = artifact["knowledge_base"]
+        else:
+            _COMPILED_KB = CompiledKnowledgeBase(load_knowledge_base())
+    return _COMPILED_KB
+
+
+def retrieve(dominant_category: str) -> Retrieval:
+    """
+    Return the guidance entries and check-in entry for a dominant category.
+    """
+    return get_compiled_knowledge_base().retrieve(dominant_category)
+
+
 def get_relevant_chunks(dominant_category: str) -> List[Dict[str, Any]]:
     """
     Return knowledge chunks that are relevant to a given dominant category.
@@ -27,19 +197,7 @@ def get_relevant_chunks(dominant_category: str) -> List[Dict[str, Any]]:
       - entries with matching 'category'
       - multi-category entries where the category appears in 'categories'
     """
-    kb = load_knowledge_base()
-    relevant: List[Dict[str, Any]] = []
-
-    for item in kb:
-        cat = item.get("category")
-        cats = item.get("categories")
-
-        if cat == dominant_category:
-            relevant.append(item)
-        elif isinstance(cats, list) and dominant_category in cats:
-            relevant.append(item)
-
-    return relevant
+    return retrieve(dominant_category).chunks
 
 
 def build_guidance_text(dominant_category: str, user_name: str = "friend") -> str:
@@ -47,27 +205,7 @@ def build_guidance_text(dominant_category: str, user_name: str = "friend") -> st
     Build a plain-text guidance block from the knowledge base for the model to use.
     Replaces {user_name} placeholders and includes questions/options where present.
     """
-    chunks = get_relevant_chunks(dominant_category)
-    if not chunks:
-        return ""
-
-    parts: List[str] = []
-
-    for item in chunks:
-        # main text with user_name injected
-        text = item.get("text", "").replace("{user_name}", user_name)
-        if text:
-            parts.append(text)
-
-        # if it's a check-in style entry, append question + options
-        if item.get("type") == "multi_category_checkin":
-            question = item.get("question")
-            options = item.get("options", [])
-            if question and options:
-                option_lines = "\n".join(f"- {opt}" for opt in options)
-                parts.append(f"{question}\n{option_lines}")
-
-    return "\n\n".join(parts)
+    return retrieve(dominant_category).guidance_text(user_name)
 
 
 def get_checkin_for_category(dominant_category: str) -> dict | None:
@@ -75,8 +213,24 @@ def get_checkin_for_category(dominant_category: str) -> dict | None:
     Return a single 'check-in' style entry (with question + options)
     for a given dominant category, if available.
     """
-    chunks = get_relevant_chunks(dominant_category)
-    for item in chunks:
-        if item.get("type") == "multi_category_checkin":
-            return item
-    return None
+    return retrieve(dominant_category).checkin
+
+
+def search_knowledge(totals: Mapping[str, float], k: int = 3,
+                     category: str | None = None,
+                     terms: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Return the KB entries most similar to a spending summary.
+
+    Args:
+        totals: Spending by category, e.g. from summarize_spending
+        k: Maximum number of entries to return
+        category: Only consider entries for this category
+        terms: Extra query words, e.g. transaction descriptions
+
+    Returns:
+        Up to k entries, most similar first
+    """
+    matches = get_compiled_knowledge_base().vector_index.search_spending(
+        totals, k=k, category=category, terms=terms)
+    return [item for _, item in matches]
@@ -0,0 +1,304 @@
+"""
+Quota-aware routing across a pool of Gemini models.
+
+Gemini quotas are per model, so pinning every call to one model takes the
+whole service down once that model's budget is spent. GEMINI_MODEL_POOL
+lists models in order of preference, each with its own requests-per-minute
+budget, latency target and price, e.g.
+
+    gemini-2.5-flash:rpm=10:latency=8:input_cost=0.30:output_cost=2.50,
+    gemini-2.5-flash-lite:rpm=15:latency=4:input_cost=0.10:output_cost=0.40
+
+(prices in USD per million tokens). For each call the router takes the
+first model that is usable and has a quota token, downshifting to the next
+when a model is:
+- cooling down after Gemini itself answered 429
+- slower than its latency target (moving average of recent calls); one
+  call is let through every GEMINI_ROUTER_PROBE_SECONDS to notice recovery
+- expected to take longer than the request's remaining deadline
+- out of quota
+
+Models skipped only for latency are still tried, in order, if every other
+model is out of quota or cooling down. Without a pool the router holds one
+model, DEFAULT_MODEL, drawing from the shared `gemini_quota` budget, which
+is the behaviour before routing existed.
+"""
+import logging
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from app.core.config import get_settings
+from app.helpers.deadline import remaining
+from app.helpers.quota import QuotaExceededError, QuotaGovernor, gemini_quota
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Weight of the newest call in the latency moving average
+LATENCY_ALPHA = 0.2
+
+_FIELDS = {"rpm": int, "latency": float, "input_cost": float, "output_cost": float}
+
+
+def parse_model_pool(spec: str) -> List[Tuple[str, dict]]:
+    """
+    Parse a GEMINI_MODEL_POOL value into (model, options) pairs.
+
+    Raises:
+        ValueError: On an unknown option or a malformed value
+    """
+    pool = []
+    for entry in spec.split(","):
+        name, *options = [part.strip() for part in entry.strip().split(":")]
+        if not name:
+            continue
+        parsed = {}
+        for option in options:
+            key, _, value = option.partition("=")
+            if key not in _FIELDS:
+                raise ValueError(f"Unknown model pool option {key!r} for {name}")
+            parsed[key] = _FIELDS[key](value)
+        pool.append((name, parsed))
+    return pool
+
+
+class ModelTier:
+    """
+    One model in the pool, with its budget and observed behaviour.
+
+    Args:
+        name: Gemini model name
+        quota: Governor holding this model's request budget
+        quota_key: Bucket key in the governor's backend
+        latency_target: Seconds; a slower moving average downshifts (None: never)
+        input_cost: USD per million input tokens
+        output_cost: USD per million output tokens
+    """
+
+    def __init__(self, name: str, quota: QuotaGovernor, quota_key: str = "gemini",
+                 latency_target: float | None = None, input_cost: float = 0.0,
+                 output_cost: float = 0.0):
+        self.name = name
+        self.quota = quota
+        self.quota_key = quota_key
+        self.latency_target = latency_target
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+        self.latency: float | None = None
+        self.cooldown_until = 0.0
+        self.last_selected = 0.0
+        self.selected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def cost(self) -> float:
+        """Estimated spend so far in USD."""
+        return (self.input_tokens * self.input_cost + self.output_tokens * self.output_cost) / 1e6
+
+    def skip_reason(self, now: float, deadline_left: float | None, probe_seconds: float) -> str | None:
+        """Why this model should be passed over right now, if it should."""
+        if now < self.cooldown_until:
+            return "cooldown"
+        if self.latency is None:
+            return None
+        if deadline_left is not None and self.latency > deadline_left:
+            return "deadline"
+        if (self.latency_target is not None and self.latency > self.latency_target
+                and now - self.last_selected < probe_seconds):
+            return "slow"
+        return None
+
+    def get_state(self) -> dict:
+        return {
+            "quota_per_minute": self.quota.per_minute,
+            "latency_target_seconds": self.latency_target,
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "cooling_down": time.monotonic() < self.cooldown_until,
+            "selected": self.selected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rate_limited": self.rate_limited,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "estimated_cost_usd": round(self.cost, 6),
+        }
+
+
+class ModelRouter:
+    """
+    Picks a model per call from an ordered pool and records per-model usage.
+
+    Args:
+        tiers: Models in order of preference (heaviest first)
+        cooldown_seconds: How long a model is avoided after an upstream 429
+        probe_seconds: How often a model over its latency target gets a call
+    """
+
+    def __init__(self, tiers: List[ModelTier], cooldown_seconds: float = 30.0,
+                 probe_seconds: float = 30.0):
+        if not tiers:
+            raise ValueError("Model pool is empty")
+        self.tiers = tiers
+        self.by_name: Dict[str, ModelTier] = {tier.name: tier for tier in tiers}
+        self.cooldown_seconds = cooldown_seconds
+        self.probe_seconds = probe_seconds
+        # (preferred model, reason) -> calls sent to a lighter model instead
+        self.downshifts: Counter = Counter()
+
+    async def acquire(self, model: str | None = None) -> ModelTier:
+        """
+        Choose a model for one call and take a quota token for it.
+
+        Args:
+            model: Pin the call to this model instead of routing (models
+                outside the pool draw from the shared budget and are not
+                tracked per model)
+
+        Raises:
+            QuotaExceededError: If no model can take the call; carries the
+                soonest retry time
+        """
+        if model is not None:
+            tier = self.by_name.get(model)
+            if tier is None:
+                # Not registered, so caller-chosen names can't grow the
+                # per-model state and metric labels; usage is not tracked
+                tier = ModelTier(model, gemini_quota)
+            await tier.quota.acquire_async(tier.quota_key)
+            self._select(tier, time.monotonic())
+            return tier
+
+        now = time.monotonic()
+        deadline_left = remaining()
+        skipped: List[Tuple[ModelTier, str]] = []
+        deferred: List[ModelTier] = []
+        retry_after: float | None = None
+
+        for tier in self.tiers:
+            reason = tier.skip_reason(now, deadline_left, self.probe_seconds)
+            if reason in ("slow", "deadline"):
+                deferred.append(tier)
+            if reason:
+                skipped.append((tier, reason))
+                continue
+            try:
+                await tier.quota.acquire_async(tier.quota_key)
+            except QuotaExceededError as e:
+                skipped.append((tier, "quota"))
+                retry_after = e.retry_after if retry_after is None else min(retry_after, e.retry_after)
+                continue
+            return self._chosen(tier, skipped, now)
+
+        # Everything fast enough is out of budget: a slow answer beats none
+        for tier in deferred:
+            try:
+                await tier.quota.acquire_async(tier.quota_key)
+            except QuotaExceededError as e:
+                retry_after = e.retry_after if retry_after is None else min(retry_after, e.retry_after)
+                continue
+            return self._chosen(tier, [(t, r) for t, r in skipped if t is not tier], now)
+
+        if retry_after is None:
+            # Every model is cooling down after upstream 429s
+            retry_after = min(tier.cooldown_until for tier in self.tiers) - now
+        raise QuotaExceededError(max(retry_after, 0.0))
+
+    def _chosen(self, tier: ModelTier, skipped: List[Tuple[ModelTier, str]], now: float) -> ModelTier:
+        if skipped:
+            preferred, reason = skipped[0]
+            self.downshifts[(preferred.name, reason)] += 1
+            logger.info(f"Routing to {tier.name}: {preferred.name} skipped ({reason})")
+        self._select(tier, now)
+        return tier
+
+    @staticmethod
+    def _select(tier: ModelTier, now: float) -> None:
+        tier.selected += 1
+        tier.last_selected = now
+
+    def record_success(self, tier: ModelTier, seconds: float | None = None,
+                       usage=None) -> None:
+        """
+        Record a finished call.
+
+        Args:
+            tier: The model that answered
+            seconds: Call latency, if it should feed the moving average
+            usage: The response's usage_metadata, for token and cost totals
+        """
+        tier.succeeded += 1
+        if seconds is not None:
+            tier.latency = seconds if tier.latency is None else \
+                LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * tier.latency
+        if usage is not None:
+            tier.input_tokens += getattr(usage, "prompt_token_count", None) or 0
+            tier.output_tokens += getattr(usage, "candidates_token_count", None) or 0
+
+    def record_failure(self, tier: ModelTier, rate_limited: bool = False) -> None:
+        """Record a failed call; an upstream 429 cools the model down."""
+        tier.failed += 1
+        if rate_limited:
+            tier.rate_limited += 1
+            tier.cooldown_until = time.monotonic() + self.cooldown_seconds
+            logger.warning(f"{tier.name} rate limited upstream; avoiding it for "
+                           f"{self.cooldown_seconds:.0f} s")
+
+    def has_alternative(self, tier_name: str) -> bool:
+        """Whether a pool model other than `tier_name` is not cooling down."""
+        now = time.monotonic()
+        return any(tier.name != tier_name and now >= tier.cooldown_until for tier in self.tiers)
+
+    def quota_governors(self) -> List[Tuple[str, QuotaGovernor, str]]:
+        """
+        (label, governor, bucket key) for every quota budget calls draw on:
+        one per pool model, plus the shared budget as "shared" if no pool
+        model uses it (pinned calls to models outside the pool still do).
+        """
+        governors = [(tier.name, tier.quota, tier.quota_key) for tier in self.tiers]
+        if all(tier.quota is not gemini_quota for tier in self.tiers):
+            governors.append(("shared", gemini_quota, "gemini"))
+        return governors
+
+    def get_state(self) -> dict:
+        """Get per-model usage and routing statistics."""
+        return {
+            "models": {name: tier.get_state() for name, tier in self.by_name.items()},
+            "pool": [tier.name for tier in self.tiers],
+            "downshifts": [
+                {"from": model, "reason": reason, "count": count}
+                for (model, reason), count in sorted(self.downshifts.items())
+            ],
+        }
+
+
+def build_model_router() -> ModelRouter:
+    """Create the router from GEMINI_MODEL_POOL (DEFAULT_MODEL alone if unset)."""
+    settings = get_settings()
+    pool = parse_model_pool(settings.gemini_model_pool or "")
+    if pool:
+        tiers = [
+            ModelTier(
+                name,
+                QuotaGovernor(backend=gemini_quota.backend,
+                              per_minute=options.get("rpm", settings.gemini_quota_per_minute),
+                              key_prefix=gemini_quota.key_prefix),
+                quota_key=f"gemini:{name}",
+                latency_target=options.get("latency"),
+                input_cost=options.get("input_cost", 0.0),
+                output_cost=options.get("output_cost", 0.0),
+            )
+            for name, options in pool
+        ]
+    else:
+        tiers = [ModelTier(DEFAULT_MODEL, gemini_quota)]
+    return ModelRouter(tiers, cooldown_seconds=settings.gemini_router_cooldown_seconds,
+                       probe_seconds=settings.gemini_router_probe_seconds)
+
+
+model_router = build_model_router()
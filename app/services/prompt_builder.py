@@ -0,0 +1,348 @@
+"""
+Compiled prompt templates for the AI routes.
+
+Templates are parsed once into literal segments and named slots. Sections
+that only depend on the dominant category and the knowledge base (category
+context, KB guidance) are pre-rendered per (category, KB version, user name)
+and cached, so each request only splices in its own variables.
+
+The static persona, task list and JSON format instructions are not part of
+the per-request text: they are registered as named preambles with the
+preamble cache and sent once as Gemini cached content.
+"""
+import logging
+import string
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from app.core.config import get_settings
+from app.helpers.preamble_cache import preamble_cache
+from app.models.responses import CheckinResponse, InsightBatchOutput, InsightOutput
+from app.services.knowledge_retriever import get_compiled_knowledge_base
+
+logger = logging.getLogger(__name__)
+
+# Static sections cached per (category, KB version, user name)
+MAX_CACHED_SECTIONS = 512
+
+CATEGORY_CONTEXT: Dict[str, str] = {
+    "Food": (
+        "Food often reflects comfort, routine, or convenience spending. "
+        "High food spend can be linked to busy schedules, eating out, or emotional comfort."
+    ),
+    "Transport": (
+        "Transport spending usually points to routine commitments, commuting, or a busy season of movement."
+    ),
+    "Entertainment": (
+        "Entertainment can signal a need for rest, joy, or stress relief after demanding weeks."
+    ),
+    "Shopping": (
+        "Shopping may reflect planned upgrades, self-care, or impulse buys driven by mood."
+    ),
+}
+DEFAULT_CONTEXT = "This category likely reflects a mix of routine needs and emotional decisions."
+
+
+class PromptTooLargeError(ValueError):
+    """Raised when a rendered prompt exceeds the configured maximum size."""
+
+    def __init__(self, size: int, limit: int):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"Prompt is {size} characters; the limit is {limit}.")
+
+
+class PromptTemplate:
+    """
+    A `str.format`-style template compiled once into literals and slots.
+
+    Args:
+        source: Template text with `{name}` or `{name:spec}` slots; use `{{`
+            and `}}` for literal braces
+    """
+
+    def __init__(self, source: str):
+        self._segments: List[Tuple[str, str | None, str]] = []
+        for literal, name, spec, conversion in string.Formatter().parse(source):
+            if conversion:
+                raise ValueError("Conversions are not supported in prompt templates.")
+            self._segments.append((literal, name, spec or ""))
+        self._merge()
+
+    @classmethod
+    def _from_segments(cls, segments: List[Tuple[str, str | None, str]]) -> "PromptTemplate":
+        template = cls.__new__(cls)
+        template._segments = segments
+        template._merge()
+        return template
+
+    def _merge(self) -> None:
+        """Fold adjacent literals together, so a render only formats the slots."""
+        merged: List[Tuple[str, str | None, str]] = []
+        pending = ""
+        for literal, name, spec in self._segments:
+            pending += literal
+            if name is not None:
+                merged.append((pending, name, spec))
+                pending = ""
+        self._segments = merged
+        self._tail = pending
+        self.fields = frozenset(name for _, name, _ in merged)
+
+    def partial(self, **values: Any) -> "PromptTemplate":
+        """Return a template with some slots already rendered into literals."""
+        segments: List[Tuple[str, str | None, str]] = []
+        for literal, name, spec in self._segments:
+            if name in values:
+                segments.append((literal + format(values[name], spec), None, ""))
+            else:
+                segments.append((literal, name, spec))
+        segments.append((self._tail, None, ""))
+        return self._from_segments(segments)
+
+    def render(self, **values: Any) -> str:
+        """
+        Fill every slot.
+
+        Raises:
+            TypeError: If a slot has no value
+        """
+        parts = []
+        try:
+            for literal, name, spec in self._segments:
+                parts.append(literal)
+                parts.append(format(values[name], spec))
+        except KeyError as e:
+            raise TypeError(f"Missing value for prompt slot {e.args[0]!r}") from None
+        parts.append(self._tail)
+        return "".join(parts)
+
+
+HELLO_TEMPLATE = PromptTemplate(
+    "You are AIVA, a kind financial well-being assistant. "
+    "Greet {user_name} warmly in 2–3 sentences. "
+    "Acknowledge that money can be stressful, but you're here to help "
+    "them understand things step by step. Keep the tone supportive and calm."
+)
+
+INSIGHTS_PREAMBLE = (
+    "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
+    "TASK 1 — Identify the category with the highest total spending.\n"
+    "TASK 2 — Choose the emotional tone the user needs. Options:\n"
+    "- reassuring\n- motivating\n- grounding\n\n"
+    "TASK 3 — Give ONE gentle and actionable financial suggestion.\n\n"
+    "TASK 4 — Write a short (3–4 sentences) narrative insight using the chosen tone.\n"
+    "Include empathy, clarity, and emotional awareness.\n\n"
+    "FORMAT the response STRICTLY as JSON with:\n"
+    "{\n"
+    "  'top_category': '',\n"
+    "  'emotional_tone': '',\n"
+    "  'suggested_action': '',\n"
+    "  'aiva_insight': ''\n"
+    "}\n"
+    "Return only JSON. No commentary."
+)
+
+INSIGHTS_TEMPLATE = PromptTemplate(
+    "Weekly spending summary: {summary_text}.\n"
+    "Dominant spending category: {dominant_category}.\n"
+    "Approximate total weekly spend: £{total_spend:.2f} ({spend_level} level).\n"
+    "Emotional/contextual note about this category: {category_context}"
+    "{guidance_section}"
+)
+
+GUIDANCE_TEMPLATE = PromptTemplate(
+    "\n\nHere are additional coaching guidelines and reflections you should follow "
+    "when speaking to the user about this situation:\n"
+    "{guidance_text}"
+)
+
+CHECKIN_PREAMBLE = (
+    "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
+    "TASK 1 — Acknowledge their feelings with genuine empathy.\n"
+    "TASK 2 — Reflect briefly on how this feeling might be connected to their spending.\n"
+    "TASK 3 — Offer 1–2 gentle, realistic next steps that support both emotions and budget.\n"
+    "TASK 4 — Keep the tone warm, non-judgmental, and grounded.\n\n"
+    "FORMAT the response STRICTLY as JSON with:\n"
+    "{\n"
+    "  'aiva_followup': '',\n"
+    "  'detected_emotion': '',\n"
+    "  'supportive_reframe': '',\n"
+    "  'next_step_suggestion': ''\n"
+    "}\n"
+    "Return only JSON. No commentary."
+)
+
+CHECKIN_TEMPLATE = PromptTemplate(
+    "User name: {user_name}.\n"
+    "Their dominant spending category is: {category}.\n"
+    "They chose this reflection option: \"{selected_option}\"."
+)
+
+INSIGHTS_BATCH_PREAMBLE = (
+    "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
+    "You will receive spending data for several users. Each user's section "
+    "starts with a line '### USER <id>'. Treat every user independently.\n\n"
+    "For EACH user:\n"
+    "TASK 1 — Identify the category with the highest total spending.\n"
+    "TASK 2 — Choose the emotional tone the user needs. Options:\n"
+    "- reassuring\n- motivating\n- grounding\n\n"
+    "TASK 3 — Give ONE gentle and actionable financial suggestion.\n\n"
+    "TASK 4 — Write a short (3–4 sentences) narrative insight using the chosen tone.\n"
+    "Include empathy, clarity, and emotional awareness.\n\n"
+    "FORMAT the response STRICTLY as a JSON array with one object per user, "
+    "in the order given:\n"
+    "[\n"
+    "  {\n"
+    "    'id': '<the user id>',\n"
+    "    'top_category': '',\n"
+    "    'emotional_tone': '',\n"
+    "    'suggested_action': '',\n"
+    "    'aiva_insight': ''\n"
+    "  }\n"
+    "]\n"
+    "Return only JSON. No commentary."
+)
+
+BATCH_SECTION_TEMPLATE = PromptTemplate("### USER {id}\n{text}")
+BATCH_SEPARATOR = "\n\n"
+
+# Static instructions are sent once as a cached preamble, not per request
+preamble_cache.register("insights", INSIGHTS_PREAMBLE)
+preamble_cache.register("checkin", CHECKIN_PREAMBLE)
+preamble_cache.register("insights_batch", INSIGHTS_BATCH_PREAMBLE)
+
+# Structured-output schema requested with each preamble
+RESPONSE_SCHEMAS: Dict[str, Any] = {
+    "insights": InsightOutput,
+    "checkin": CheckinResponse,
+    "insights_batch": list[InsightBatchOutput],
+}
+
+
+class Prompt(NamedTuple):
+    """
+    Per-request prompt text, the registered preamble it runs under and the
+    schema the model's output must match.
+    """
+    text: str
+    preamble: str | None = None
+    schema: Any = None
+
+
+class PromptBuilder:
+    """
+    Renders the AI route prompts from compiled templates.
+
+    Args:
+        max_chars: Largest prompt allowed (preamble included), in characters
+        batch_max_chars: Largest packed batch prompt allowed, in characters
+    """
+
+    def __init__(self, max_chars: int, batch_max_chars: int | None = None):
+        self.max_chars = max_chars
+        self.batch_max_chars = batch_max_chars or max_chars
+        self._insights_sections: "OrderedDict[Tuple[str, str, str], PromptTemplate]" = OrderedDict()
+        self.section_hits = 0
+        self.section_misses = 0
+
+    def _checked(self, text: str, preamble: str | None = None,
+                 limit: int | None = None) -> Prompt:
+        limit = limit or self.max_chars
+        size = len(text) + (len(preamble_cache.text(preamble)) if preamble else 0)
+        if size > limit:
+            logger.warning(f"Prompt of {size} chars exceeds limit of {limit}")
+            raise PromptTooLargeError(size, limit)
+        return Prompt(text, preamble, RESPONSE_SCHEMAS.get(preamble))
+
+    def _insights_section(self, category: str, user_name: str) -> PromptTemplate:
+        """Insights template with the category- and KB-dependent parts filled in."""
+        kb = get_compiled_knowledge_base()
+        key = (category, kb.version, user_name)
+        template = self._insights_sections.get(key)
+        if template is not None:
+            self.section_hits += 1
+            self._insights_sections.move_to_end(key)
+            return template
+
+        self.section_misses += 1
+        guidance_text = kb.retrieve(category).guidance_text(user_name)
+        template = INSIGHTS_TEMPLATE.partial(
+            dominant_category=category,
+            category_context=CATEGORY_CONTEXT.get(category, DEFAULT_CONTEXT),
+            guidance_section=(GUIDANCE_TEMPLATE.render(guidance_text=guidance_text)
+                              if guidance_text else ""),
+        )
+        self._insights_sections[key] = template
+        if len(self._insights_sections) > MAX_CACHED_SECTIONS:
+            self._insights_sections.popitem(last=False)
+        return template
+
+    def insights(self, totals: Dict[str, float], dominant_category: str,
+                 total_spend: float, spend_level: str, user_name: str = "friend") -> Prompt:
+        """
+        Build the insights prompt (runs under the "insights" preamble).
+
+        Raises:
+            PromptTooLargeError: If the prompt exceeds max_chars
+        """
+        summary_text = ", ".join(f"{cat}: £{amt:.2f}" for cat, amt in totals.items())
+        return self._checked(self._insights_section(dominant_category, user_name).render(
+            summary_text=summary_text,
+            total_spend=total_spend,
+            spend_level=spend_level,
+        ), "insights")
+
+    def batch_section(self, item_id: str, prompt: Prompt) -> str:
+        """One user's section of a packed batch prompt."""
+        return BATCH_SECTION_TEMPLATE.render(id=item_id, text=prompt.text)
+
+    def batch_budget(self) -> int:
+        """Characters available for packed sections under the batch preamble."""
+        return self.batch_max_chars - len(INSIGHTS_BATCH_PREAMBLE)
+
+    def insights_batch(self, sections: List[str]) -> Prompt:
+        """
+        Pack several users' sections into one prompt (runs under the
+        "insights_batch" preamble).
+
+        Raises:
+            PromptTooLargeError: If the prompt exceeds batch_max_chars
+        """
+        return self._checked(BATCH_SEPARATOR.join(sections), "insights_batch",
+                             self.batch_max_chars)
+
+    def checkin(self, user_name: str, category: str, selected_option: str) -> Prompt:
+        """
+        Build the check-in follow-up prompt (runs under the "checkin" preamble).
+
+        Raises:
+            PromptTooLargeError: If the prompt exceeds max_chars
+        """
+        return self._checked(CHECKIN_TEMPLATE.render(
+            user_name=user_name, category=category, selected_option=selected_option),
+            "checkin")
+
+    def hello(self, user_name: str) -> Prompt:
+        """
+        Build the greeting prompt.
+
+        Raises:
+            PromptTooLargeError: If the prompt exceeds max_chars
+        """
+        return self._checked(HELLO_TEMPLATE.render(user_name=user_name))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_chars": self.max_chars,
+            "batch_max_chars": self.batch_max_chars,
+            "cached_sections": len(self._insights_sections),
+            "section_hits": self.section_hits,
+            "section_misses": self.section_misses,
+        }
+
+
+prompt_builder = PromptBuilder(
+    max_chars=get_settings().max_prompt_chars,
+    batch_max_chars=get_settings().insights_batch_max_chars,
+)
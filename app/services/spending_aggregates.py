@@ -0,0 +1,345 @@
+"""
+Incrementally maintained per-user spending aggregates.
+
+Running totals per category and per week are updated as transactions are
+appended or corrected, so reading a user's spending summary costs
+O(categories) instead of a scan over every transaction. Each change gives
+the user a new snapshot version, which downstream caches can key on.
+
+Imports are staged as a delta (the rows with an id, and per-week,
+per-category sums of the rows without one) and only applied once the whole
+upload has parsed, so a failed import changes nothing and staging costs
+nothing in proportion to the user's history. The store keeps at most
+`spending_aggregates_max_users` users, evicting the least recently used,
+and the mock dataset's user id is read-only.
+
+Each user remembers the contributions of at most
+`spending_aggregates_max_ids_per_user` transaction ids, oldest forgotten
+first. A forgotten transaction stays in the totals but can no longer be
+corrected, deleted or replaced by a re-sent id.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.spending_engine import load_mock_transactions
+from app.services.transaction_store import to_day, day_to_iso
+
+MOCK_USER_ID = "mock"
+
+
+class ReservedUserError(ValueError):
+    """Raised when a caller tries to change the read-only mock user."""
+
+
+class ConcurrentUpdateError(RuntimeError):
+    """Raised when a staged import is committed after the user changed underneath it."""
+
+
+# (week, category, spend or None for income) of one transaction
+Contribution = Tuple[str, str, Optional[float]]
+
+
+def _week_start(date: str) -> str:
+    day = to_day(date)
+    return day_to_iso(day - (day + 3) % 7)
+
+
+def _contribution(tx: Dict[str, Any]) -> Contribution:
+    amount = tx["amount"]
+    # Same rule as summarize_spending: income is ignored
+    return _week_start(tx["date"]), tx["category"], None if amount > 0 else abs(amount)
+
+
+@dataclass(frozen=True)
+class SpendingSnapshot:
+    """Point-in-time copy of one user's aggregates."""
+    user_id: str
+    version: int
+    totals: Dict[str, float]
+    weekly: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    transaction_count: int = 0
+
+
+class UserAggregates:
+    """
+    Running totals for one user. Not thread-safe on its own.
+
+    Args:
+        max_ids: Transaction ids whose contributions are kept for corrections
+    """
+
+    def __init__(self, max_ids: int = 100000):
+        self.max_ids = max_ids
+        self.totals: Dict[str, float] = {}
+        self.weekly: Dict[str, Dict[str, float]] = {}
+        self._counts: Dict[Tuple[Optional[str], str], int] = {}
+        # tx id -> contribution so corrections can be reversed, oldest first
+        self._contributions: "OrderedDict[str, Contribution]" = OrderedDict()
+        self.transaction_count = 0
+        self.version = 0
+
+    def add(self, tx: Dict[str, Any]) -> None:
+        self._add(str(tx["id"]) if tx.get("id") else None, _contribution(tx))
+
+    def _add(self, tx_id: str | None, contribution: Contribution) -> None:
+        week, category, spend = contribution
+        self.transaction_count += 1
+        if spend is not None:
+            self._apply(week, category, spend, 1)
+        if tx_id is not None:
+            self._contributions[tx_id] = contribution
+            if len(self._contributions) > self.max_ids:
+                # Its spend stays in the totals; it just can't be reversed any more
+                self._contributions.popitem(last=False)
+
+    def has(self, tx_id: str) -> bool:
+        return tx_id in self._contributions
+
+    def remove(self, tx_id: str) -> bool:
+        contribution = self._contributions.pop(tx_id, None)
+        if contribution is None:
+            return False
+        week, category, spend = contribution
+        if spend is not None:
+            self._apply(week, category, -spend, -1)
+        self.transaction_count -= 1
+        return True
+
+    def merge(self, staged: "StagedUpdate") -> None:
+        """Apply a staged import's delta."""
+        for tx_id, contribution in staged.replacements.items():
+            self.remove(tx_id)
+            self._add(tx_id, contribution)
+        for (week, category), (spend, rows) in staged.anonymous.items():
+            self._apply(week, category, spend, rows)
+        self.transaction_count += staged.anonymous_count
+
+    def _apply(self, week: str, category: str, spend: float, rows: int) -> None:
+        """Add `spend` (negative to reverse) from `rows` spending rows (likewise)."""
+        self.totals[category] = self.totals.get(category, 0.0) + spend
+        week_totals = self.weekly.setdefault(week, {})
+        week_totals[category] = week_totals.get(category, 0.0) + spend
+
+        # Drop categories with no remaining spending rows, like a fresh scan would
+        for key, totals in (((None, category), self.totals), ((week, category), week_totals)):
+            count = self._counts.get(key, 0) + rows
+            if count <= 0:
+                self._counts.pop(key, None)
+                totals.pop(category, None)
+            else:
+                self._counts[key] = count
+        if not week_totals:
+            del self.weekly[week]
+
+
+def _append(user: UserAggregates, transactions: Iterable[Dict[str, Any]]) -> None:
+    for tx in transactions:
+        # Re-sent ids replace the earlier version of the transaction
+        if tx.get("id") and user.has(str(tx["id"])):
+            user.remove(str(tx["id"]))
+        user.add(tx)
+
+
+class StagedUpdate:
+    """
+    The change an import will make to one user's aggregates.
+
+    Rows with an id are kept (the last version of each id), since they may
+    replace an earlier row; rows without one are only summed per week and
+    category.
+    """
+
+    def __init__(self, user_id: str, base_version: int):
+        self.user_id = user_id
+        self.base_version = base_version
+        self.replacements: "OrderedDict[str, Contribution]" = OrderedDict()
+        # (week, category) -> (spend, spending rows) of rows without an id
+        self.anonymous: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        self.anonymous_count = 0
+
+    def append(self, transactions: Iterable[Dict[str, Any]]) -> None:
+        for tx in transactions:
+            week, category, spend = contribution = _contribution(tx)
+            if tx.get("id"):
+                tx_id = str(tx["id"])
+                self.replacements.pop(tx_id, None)
+                self.replacements[tx_id] = contribution
+                continue
+            self.anonymous_count += 1
+            if spend is not None:
+                total, rows = self.anonymous.get((week, category), (0.0, 0))
+                self.anonymous[(week, category)] = (total + spend, rows + 1)
+
+
+class SpendingAggregateStore:
+    """
+    Thread-safe, size-bounded registry of per-user aggregates.
+
+    Args:
+        max_users: Users kept before the least recently used is evicted
+        max_ids_per_user: Transaction ids per user kept for corrections
+    """
+
+    def __init__(self, max_users: int = 10000, max_ids_per_user: int = 100000):
+        self.max_users = max_users
+        self.max_ids_per_user = max_ids_per_user
+        self._users: "OrderedDict[str, UserAggregates]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Versions are unique across users, so an evicted and re-created user
+        # never reuses a version a cache may still hold
+        self._versions = itertools.count(1)
+        self.evictions = 0
+
+    @staticmethod
+    def _check_writable(user_id: str) -> None:
+        if user_id == MOCK_USER_ID:
+            raise ReservedUserError(f"User id {user_id!r} is reserved.")
+
+    def _user(self, user_id: str) -> UserAggregates | None:
+        user = self._users.get(user_id)
+        if user is not None:
+            self._users.move_to_end(user_id)
+        return user
+
+    def _store(self, user_id: str, user: UserAggregates) -> int:
+        user.version = next(self._versions)
+        self._users[user_id] = user
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self.evictions += 1
+        return user.version
+
+    def append(self, user_id: str, transactions: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add transactions to a user's running totals.
+
+        Transactions with an `id` can later be corrected or removed.
+
+        Returns:
+            The user's new snapshot version
+
+        Raises:
+            ReservedUserError: For the mock dataset's user id
+        """
+        self._check_writable(user_id)
+        with self._lock:
+            user = self._user(user_id) or UserAggregates(self.max_ids_per_user)
+            _append(user, transactions)
+            return self._store(user_id, user)
+
+    def stage(self, user_id: str) -> StagedUpdate:
+        """
+        Start an update that only takes effect when passed to commit().
+
+        Raises:
+            ReservedUserError: For the mock dataset's user id
+        """
+        self._check_writable(user_id)
+        with self._lock:
+            return StagedUpdate(user_id, self.version(user_id))
+
+    def commit(self, staged: StagedUpdate) -> SpendingSnapshot:
+        """
+        Apply a staged update to the user's aggregates.
+
+        Returns:
+            Snapshot of the user's aggregates after the update
+
+        Raises:
+            ConcurrentUpdateError: If the user changed since the update was staged
+        """
+        with self._lock:
+            user = self._users.get(staged.user_id)
+            if (user.version if user else 0) != staged.base_version:
+                raise ConcurrentUpdateError(staged.user_id)
+            user = user or UserAggregates(self.max_ids_per_user)
+            user.merge(staged)
+            self._store(staged.user_id, user)
+            return self.snapshot(staged.user_id)
+
+    def correct(self, user_id: str, tx_id: str, transaction: Dict[str, Any]) -> int:
+        """
+        Replace a previously appended transaction.
+
+        Returns:
+            The user's new snapshot version
+
+        Raises:
+            KeyError: If the user or transaction id is unknown
+            ReservedUserError: For the mock dataset's user id
+        """
+        self._check_writable(user_id)
+        with self._lock:
+            user = self._users[user_id]
+            if not user.remove(tx_id):
+                raise KeyError(tx_id)
+            user.add({**transaction, "id": tx_id})
+            return self._store(user_id, user)
+
+    def delete(self, user_id: str, tx_id: str) -> int:
+        """
+        Remove a previously appended transaction.
+
+        Raises:
+            KeyError: If the user or transaction id is unknown
+            ReservedUserError: For the mock dataset's user id
+        """
+        self._check_writable(user_id)
+        with self._lock:
+            user = self._users[user_id]
+            if not user.remove(tx_id):
+                raise KeyError(tx_id)
+            return self._store(user_id, user)
+
+    def version(self, user_id: str) -> int:
+        """Current snapshot version (0 for unknown users)."""
+        user = self._users.get(user_id)
+        return user.version if user else 0
+
+    def snapshot(self, user_id: str, include_weekly: bool = False) -> SpendingSnapshot:
+        """Copy of a user's totals. Unknown users get an empty snapshot."""
+        with self._lock:
+            user = self._user(user_id)
+            if user is None:
+                return SpendingSnapshot(user_id=user_id, version=0, totals={})
+            weekly = {}
+            if include_weekly:
+                weekly = {week: dict(totals) for week, totals in user.weekly.items()}
+            return SpendingSnapshot(
+                user_id=user_id,
+                version=user.version,
+                totals=dict(user.totals),
+                weekly=weekly,
+                transaction_count=user.transaction_count,
+            )
+
+    def ensure_seeded(self, user_id: str, loader) -> None:
+        """Populate a user from `loader()` the first time it is needed."""
+        if user_id in self._users:
+            return
+        with self._lock:
+            if user_id not in self._users:
+                user = UserAggregates(self.max_ids_per_user)
+                _append(user, loader())
+                self._store(user_id, user)
+
+
+spending_aggregates = SpendingAggregateStore(
+    get_settings().spending_aggregates_max_users,
+    get_settings().spending_aggregates_max_ids_per_user,
+)
+
+
+def get_spending_snapshot(user_id: Optional[str] = None) -> SpendingSnapshot:
+    """
+    Spending snapshot for a user, or for the mock dataset if no user is given.
+    """
+    if user_id is None:
+        spending_aggregates.ensure_seeded(MOCK_USER_ID, load_mock_transactions)
+        user_id = MOCK_USER_ID
+    return spending_aggregates.snapshot(user_id)
@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from app.services.data_artifact import load_artifact
 
 
 # Base directory: app/
@@ -10,8 +12,11 @@ DATA_PATH = BASE_DIR / "data" / "mock_transactions.json"
 
 def load_mock_transactions() -> List[Dict[str, Any]]:
     """
-    Load mock transactions from the JSON file.
+    Load mock transactions from the data artifact, or the JSON file.
     """
+    artifact = load_artifact()
+    if artifact is not None:
+        return list(artifact["mock_transactions"])
     with open(DATA_PATH, "r") as f:
         data = json.load(f)
     return data["transactions"]
@@ -36,3 +41,21 @@ def summarize_spending(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
         totals[category] += abs(amt)
 
     return totals
+
+
+def describe_spending(totals: Dict[str, float]) -> Tuple[str, float, str]:
+    """
+    Pick out the dominant category, total spend and a coarse spend level
+    ("low", "moderate" or "high") from a non-empty spending summary.
+    """
+    dominant_category = max(totals, key=totals.get)
+    total_spend = sum(totals.values())
+
+    if total_spend < 50:
+        spend_level = "low"
+    elif total_spend < 150:
+        spend_level = "moderate"
+    else:
+        spend_level = "high"
+
+    return dominant_category, total_spend, spend_level
@@ -0,0 +1,346 @@
+"""
+Streaming import of bank transaction exports.
+
+Uploads are parsed incrementally as bytes arrive, so peak memory depends on
+the batch size, not the upload size. Supported formats:
+- json:   a JSON array of transaction objects
+- ndjson: one JSON object per line
+- csv:    header row plus one transaction per line
+
+Each row is validated and normalised into {date, description, amount,
+category}, then fed to the vectorized summarizer one batch at a time.
+"""
+import codecs
+import csv
+import json
+import time
+from collections.abc import AsyncIterator
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from app.models.requests import TransactionRow
+from app.services.transaction_store import TransactionStore, summarize_by_category
+
+SUPPORTED_FORMATS = ("json", "ndjson", "csv")
+BATCH_SIZE = 5000
+MAX_ROW_CHARS = 64 * 1024
+MAX_REPORTED_ERRORS = 20
+
+_CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+
+# Column names used by common bank exports, mapped to our field names
+_FIELD_ALIASES = {
+    "date": "date", "transaction date": "date", "posted date": "date",
+    "booking date": "date",
+    "amount": "amount", "value": "amount",
+    "debit": "debit", "money out": "debit", "paid out": "debit",
+    "credit": "credit", "money in": "credit", "paid in": "credit",
+    "category": "category",
+    "id": "id", "transaction id": "id", "transaction_id": "id",
+    "description": "description", "name": "description", "memo": "description",
+    "narrative": "description", "reference": "description",
+}
+
+
+class ImportFormatError(ValueError):
+    """Raised when the upload as a whole can't be parsed."""
+
+
+def detect_format(content_type: str | None, head: str) -> str:
+    """Pick a format from the Content-Type, falling back to sniffing the data."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in _CONTENT_TYPES:
+        return _CONTENT_TYPES[media_type]
+
+    stripped = head.lstrip()
+    if stripped.startswith("["):
+        return "json"
+    if stripped.startswith("{"):
+        return "ndjson"
+    return "csv"
+
+
+async def _decode(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Decode UTF-8 incrementally, dropping a leading byte-order mark.
+
+    Raises:
+        ImportFormatError: If the upload is not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    consumed = 0  # bytes fed to the decoder so far
+
+    def decode(chunk: bytes, final: bool = False) -> str:
+        nonlocal consumed
+        # Bytes of an incomplete character held over from the previous chunk
+        pending = len(decoder.getstate()[0])
+        try:
+            text = decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            offset = consumed - pending + e.start
+            raise ImportFormatError(
+                f"Upload is not valid UTF-8 (byte offset {offset}). "
+                "Export the file as UTF-8 and try again."
+            ) from None
+        consumed += len(chunk)
+        return text
+
+    async for chunk in chunks:
+        text = decode(chunk)
+        if text:
+            yield text
+    tail = decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def _lines(text_chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Split decoded text into lines without holding more than one line."""
+    buffer = ""
+    async for text in text_chunks:
+        buffer += text
+        *complete, buffer = buffer.split("\n")
+        for line in complete:
+            yield line.rstrip("\r")
+        if len(buffer) > MAX_ROW_CHARS:
+            raise ImportFormatError(f"Line longer than {MAX_ROW_CHARS} characters.")
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson(text_chunks: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (row number, parsed object) for each non-empty NDJSON line."""
+    row = 0
+    async for line in _lines(text_chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, ValueError(f"Invalid JSON: {e.msg}")
+
+
+async def iter_csv(text_chunks: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, dict) for each CSV record.
+    Quoted fields may span lines; records are held until their quotes balance.
+    """
+    header: List[str] | None = None
+    pending: List[str] = []
+    row = 0
+
+    async for line in _lines(text_chunks):
+        pending.append(line)
+        if sum(part.count('"') for part in pending) % 2:
+            continue  # inside a quoted field that continues on the next line
+        record = "\n".join(pending)
+        pending = []
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        yield row, dict(zip(header, values))
+
+    if pending:
+        raise ImportFormatError("CSV ended inside a quoted field.")
+
+
+async def iter_json_array(text_chunks: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, parsed object) for each element of a top-level JSON array,
+    decoding one element at a time as data arrives.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = finished = False
+    row = 0
+    source = text_chunks.__aiter__()
+    exhausted = False
+
+    while not finished:
+        # Skip whitespace and separators before the next value
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ImportFormatError("Expected a JSON array of transactions.")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                finished = True
+                continue
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted or len(buffer) - pos > MAX_ROW_CHARS:
+                    raise ImportFormatError("Malformed JSON array.")
+            else:
+                row += 1
+                yield row, value
+                pos = end
+                continue
+
+        if exhausted:
+            raise ImportFormatError("JSON array is not closed.")
+        try:
+            buffer = buffer[pos:] + await source.__anext__()
+            pos = 0
+        except StopAsyncIteration:
+            exhausted = True
+
+
+_PARSERS = {"json": iter_json_array, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def normalise_row(raw: Any) -> Dict[str, Any]:
+    """
+    Map a raw row onto TransactionRow fields and validate it.
+
+    Raises:
+        ValueError: If the row is not an object or fails validation
+    """
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object.")
+
+    fields: Dict[str, Any] = {}
+    for key, value in raw.items():
+        name = _FIELD_ALIASES.get(str(key).strip().lower())
+        if name and value not in (None, ""):
+            fields.setdefault(name, value)
+
+    # Separate money in/out columns become one signed amount
+    if "amount" not in fields and ("debit" in fields or "credit" in fields):
+        fields["amount"] = (TransactionRow.parse_money(fields.get("credit", 0))
+                            - TransactionRow.parse_money(fields.get("debit", 0)))
+    fields.pop("debit", None)
+    fields.pop("credit", None)
+
+    try:
+        return TransactionRow(**fields).model_dump()
+    except ValidationError as e:
+        first = e.errors()[0]
+        field = ".".join(str(part) for part in first["loc"]) or "row"
+        raise ValueError(f"{field}: {first['msg']}") from None
+
+
+class SpendingAccumulator:
+    """Running spending summary fed one batch of normalised rows at a time."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        self.first_date: str | None = None
+        self.last_date: str | None = None
+
+    def add_batch(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        batch = TransactionStore.from_records(rows)
+        for category, amount in summarize_by_category(batch).items():
+            self.totals[category] = self.totals.get(category, 0.0) + amount
+
+        dates = [row["date"] for row in rows]
+        low, high = min(dates), max(dates)
+        if self.first_date is None or low < self.first_date:
+            self.first_date = low
+        if self.last_date is None or high > self.last_date:
+            self.last_date = high
+
+
+async def import_transactions(chunks: AsyncIterator[bytes],
+                              content_type: str | None = None,
+                              on_batch=None) -> Dict[str, Any]:
+    """
+    Parse, validate and summarise an upload as it streams in.
+
+    Args:
+        chunks: Raw request body chunks
+        content_type: Request Content-Type, used to pick the format
+        on_batch: Optional callback receiving each batch of normalised rows
+
+    Returns:
+        Import report with counts, spending summary and throughput
+
+    Raises:
+        ImportFormatError: If the upload as a whole can't be parsed
+    """
+    start = time.perf_counter()
+    received = 0
+
+    async def counted() -> AsyncIterator[bytes]:
+        nonlocal received
+        async for chunk in chunks:
+            received += len(chunk)
+            yield chunk
+
+    text_chunks = _decode(counted())
+
+    # Peek at the first text to sniff the format, then put it back
+    head = ""
+    async for text in text_chunks:
+        head = text
+        break
+
+    async def replay() -> AsyncIterator[str]:
+        if head:
+            yield head
+        async for text in text_chunks:
+            yield text
+
+    fmt = detect_format(content_type, head)
+    accumulator = SpendingAccumulator()
+    batch: List[Dict[str, Any]] = []
+    imported = rejected = 0
+    errors: List[Dict[str, Any]] = []
+
+    async for row_number, raw in _PARSERS[fmt](replay()):
+        try:
+            batch.append(normalise_row(raw))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": row_number, "error": str(e)})
+            continue
+
+        if len(batch) >= BATCH_SIZE:
+            accumulator.add_batch(batch)
+            if on_batch:
+                on_batch(batch)
+            imported += len(batch)
+            batch = []
+
+    accumulator.add_batch(batch)
+    if on_batch and batch:
+        on_batch(batch)
+    imported += len(batch)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "format": fmt,
+        "rows_imported": imported,
+        "rows_rejected": rejected,
+        "errors": errors,
+        "spending_summary": accumulator.totals,
+        "first_date": accumulator.first_date,
+        "last_date": accumulator.last_date,
+        "bytes_received": received,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round((imported + rejected) / elapsed, 1) if elapsed else 0.0,
+    }
@@ -0,0 +1,218 @@
+"""
+Offline vector-similarity search over knowledge base entries.
+
+Entries are embedded with a local hashing TF-IDF embedder (no model download,
+no network): tokens are hashed into a fixed number of signed buckets,
+weighted by sublinear term frequency and inverse document frequency, and
+L2-normalised. Vectors are stored column-major in one NumPy matrix, so a
+query only touches the few buckets its tokens hash to, which keeps searches
+sub-millisecond at 100k entries.
+
+The category index from knowledge_retriever is still available as an exact
+pre-filter: pass `category=` to search only that category's entries.
+"""
+import math
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+DEFAULT_DIMENSIONS = 256
+# Token -> bucket lookups memoized per embedder; query tokens come from users
+MAX_CACHED_TOKENS = 65536
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens; underscores split words."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def entry_text(item: Dict[str, Any]) -> str:
+    """Text used to embed a KB entry: its text plus category and subtype labels."""
+    labels = [item.get("category") or "", item.get("subtype") or "", item.get("type") or ""]
+    if isinstance(item.get("categories"), list):
+        labels.extend(item["categories"])
+    parts = [item.get("text", "").replace("{user_name}", ""), item.get("question") or ""]
+    parts.extend(item.get("options") or [])
+    parts.extend(label.replace("_", " ") for label in labels)
+    return " ".join(parts)
+
+
+class HashingEmbedder:
+    """
+    Hashing-trick TF-IDF embedder.
+
+    Args:
+        dimensions: Number of hash buckets (vector size)
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS):
+        self.dimensions = dimensions
+        self.idf = np.ones(dimensions, dtype=np.float32)
+        self._buckets: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(token)
+        if bucket is not None:
+            self._buckets.move_to_end(token)
+            return bucket
+        # crc32 is stable across processes, unlike hash()
+        h = zlib.crc32(token.encode("utf-8"))
+        bucket = self._buckets[token] = (
+            h % self.dimensions, 1.0 if h & 0x80000000 else -1.0)
+        if len(self._buckets) > MAX_CACHED_TOKENS:
+            self._buckets.popitem(last=False)
+        return bucket
+
+    def _term_frequencies(self, weights: Mapping[str, float]) -> Dict[int, float]:
+        """Signed bucket weights for a token -> weight mapping."""
+        row: Dict[int, float] = {}
+        for token, weight in weights.items():
+            index, sign = self._bucket(token)
+            row[index] = row.get(index, 0.0) + sign * weight
+        return row
+
+    @staticmethod
+    def _counts(text: str) -> Dict[str, float]:
+        counts: Dict[str, float] = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0.0) + 1.0
+        return {token: 1.0 + math.log(count) for token, count in counts.items()}
+
+    def fit_transform(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Learn IDF weights from the documents and embed them.
+
+        Returns:
+            float32 matrix of shape (dimensions, documents), columns L2-normalised
+        """
+        rows = [self._term_frequencies(self._counts(text)) for text in texts]
+        matrix = np.zeros((self.dimensions, len(rows)), dtype=np.float32)
+        for column, row in enumerate(rows):
+            if row:
+                matrix[list(row), column] = list(row.values())
+
+        df = np.count_nonzero(matrix, axis=1)
+        self.idf = (np.log((1 + len(rows)) / (1 + df)) + 1.0).astype(np.float32)
+        matrix *= self.idf[:, None]
+
+        norms = np.linalg.norm(matrix, axis=0)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def embed_weighted(self, weights: Mapping[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed a query given as token -> weight.
+
+        Returns:
+            (bucket indexes, values) of the normalised sparse query vector
+        """
+        tokens: Dict[str, float] = {}
+        for phrase, weight in weights.items():
+            for token in tokenize(phrase):
+                tokens[token] = tokens.get(token, 0.0) + weight
+        row = self._term_frequencies(tokens)
+        indexes = np.fromiter(row, dtype=np.intp, count=len(row))
+        values = np.fromiter(row.values(), dtype=np.float32, count=len(row))
+        values *= self.idf[indexes]
+        norm = float(np.linalg.norm(values))
+        if norm:
+            values /= norm
+        return indexes, values
+
+    def embed(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        return self.embed_weighted(self._counts(text))
+
+
+class VectorIndex:
+    """
+    Top-k cosine search over KB entries.
+
+    Args:
+        entries: Raw KB entries
+        dimensions: Embedding size
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], dimensions: int = DEFAULT_DIMENSIONS):
+        self.entries = entries
+        self.embedder = HashingEmbedder(dimensions)
+        # Column-major: a query reads only the rows for its own buckets
+        self.matrix = self.embedder.fit_transform(entry_text(item) for item in entries)
+
+        by_category: Dict[str, List[int]] = {}
+        for row, item in enumerate(entries):
+            categories = [item["category"]] if item.get("category") is not None else []
+            if isinstance(item.get("categories"), list):
+                categories.extend(c for c in item["categories"] if c not in categories)
+            for category in categories:
+                by_category.setdefault(category, []).append(row)
+        self._category_rows = {
+            category: np.asarray(rows, dtype=np.intp) for category, rows in by_category.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def _search(self, indexes: np.ndarray, values: np.ndarray, k: int,
+                category: str | None) -> List[Tuple[float, Dict[str, Any]]]:
+        if not len(indexes) or not len(self.entries):
+            return []
+
+        if category is None:
+            rows = None
+            # Accumulate bucket rows in place rather than gathering a copy
+            scores = self.matrix[indexes[0]] * values[0]
+            for index, value in zip(indexes[1:], values[1:]):
+                scores += self.matrix[index] * value
+        else:
+            rows = self._category_rows.get(category)
+            if rows is None:
+                return []
+            scores = values @ self.matrix[np.ix_(indexes, rows)]
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if rows is not None:
+            return [(float(scores[i]), self.entries[rows[i]]) for i in top if scores[i] > 0]
+        return [(float(scores[i]), self.entries[i]) for i in top if scores[i] > 0]
+
+    def search(self, text: str, k: int = 3,
+               category: str | None = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Entries most similar to a free-text query.
+
+        Returns:
+            Up to k (cosine similarity, entry) pairs, best first; zero-score
+            entries are omitted
+        """
+        indexes, values = self.embedder.embed(text)
+        return self._search(indexes, values, k, category)
+
+    def search_spending(self, totals: Mapping[str, float], k: int = 3,
+                        category: str | None = None,
+                        terms: Iterable[str] = ()) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Entries most similar to a spending summary.
+
+        Each category contributes in proportion to its share of total spend;
+        `terms` (e.g. transaction descriptions or "spike") are added with
+        unit weight.
+        """
+        total = sum(totals.values())
+        weights: Dict[str, float] = {}
+        if total > 0:
+            for name, amount in totals.items():
+                weights[name] = weights.get(name, 0.0) + amount / total
+        for term in terms:
+            weights[term] = weights.get(term, 0.0) + 1.0
+        indexes, values = self.embedder.embed_weighted(weights)
+        return self._search(indexes, values, k, category)
@@ -0,0 +1,54 @@
+"""
+Startup pre-warming.
+
+A new instance can answer /health as soon as the app is imported, but its
+first AI request would still pay for importing google.genai, building the
+client, loading the knowledge base and seeding the mock aggregates. The
+lifespan hook runs `prewarm()` in a worker thread right after startup so
+that work overlaps the time before real traffic arrives instead of landing
+on a user's request.
+"""
+import logging
+import time
+from typing import Dict
+
+from app.services.ai_client import get_gemini_client
+from app.services.knowledge_retriever import get_compiled_knowledge_base
+from app.services.prompt_builder import prompt_builder
+from app.services.spending_aggregates import get_spending_snapshot
+from app.services.spending_engine import describe_spending
+
+logger = logging.getLogger(__name__)
+
+
+def _prompt() -> None:
+    snapshot = get_spending_snapshot()
+    if snapshot.totals:
+        dominant, total, level = describe_spending(snapshot.totals)
+        prompt_builder.insights(snapshot.totals, dominant, total, level, user_name="friend")
+
+
+STEPS = (
+    ("gemini_client", get_gemini_client),
+    ("knowledge_base", get_compiled_knowledge_base),
+    ("prompt", _prompt),
+)
+
+
+def prewarm() -> Dict[str, float]:
+    """
+    Run each warm-up step, logging failures instead of raising.
+
+    Returns:
+        Milliseconds per step
+    """
+    timings: Dict[str, float] = {}
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning(f"Prewarm step {name} failed", exc_info=True)
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"Prewarm finished: {timings}")
+    return timings
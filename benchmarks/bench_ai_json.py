@@ -0,0 +1,103 @@
+"""
+AI output parse throughput: legacy helper vs one-pass model parsing.
+
+Legacy path, as before structured output: strip fences by hand, parse with
+stdlib json, validate the merged body as an InsightResponse, validate it
+again as FastAPI does for a returned dict, and render with json.dumps.
+
+Current path: validate the model text straight into InsightOutput
+(pydantic-core's JSON parser; fences stripped only if present), merge,
+and render once with orjson.
+
+Batch arrays are compared as stdlib json vs orjson parse plus per-item
+validation, as in the batch insights service.
+
+Usage:
+    python -m benchmarks.bench_ai_json [--parses 20000]
+"""
+import argparse
+import json
+import time
+
+import orjson
+
+from app.helpers.json_cleaner import parse_ai_json, parse_ai_model
+from app.models.responses import InsightOutput, InsightResponse
+
+TOTALS = {"Food": 36.70, "Transport": 18.00, "Entertainment": 9.99, "Shopping": 24.50}
+INSIGHT = {
+    "top_category": "Food",
+    "emotional_tone": "reassuring",
+    "suggested_action": "Try preparing one extra meal at home this week.",
+    "aiva_insight": (
+        "It looks like food was your top spending category this week. That often "
+        "happens when days are busy and cooking feels like one more task. You're "
+        "doing well by checking in, and small changes add up."
+    ),
+}
+PLAIN = json.dumps(INSIGHT, indent=2)
+FENCED = f"```json\n{PLAIN}\n```"
+BATCH = json.dumps([{"id": f"user-{i}", **INSIGHT} for i in range(25)])
+
+
+def legacy_parse_ai_json(ai_text: str) -> dict:
+    cleaned = ai_text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`").lstrip()
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+        cleaned = cleaned.strip()
+    return json.loads(cleaned)
+
+
+def legacy_insight(text: str) -> bytes:
+    body = {"spending_summary": TOTALS, **legacy_parse_ai_json(text)}
+    InsightResponse(**body)
+    # FastAPI's response_model pass over the returned dict
+    rendered = InsightResponse.model_validate(body).model_dump()
+    return json.dumps(rendered, ensure_ascii=False).encode("utf-8")
+
+
+def current_insight(text: str) -> bytes:
+    body = {"spending_summary": TOTALS, **parse_ai_model(text, InsightOutput).model_dump()}
+    return orjson.dumps(InsightResponse.model_construct(**body).model_dump())
+
+
+def legacy_batch(text: str) -> int:
+    return sum(1 for e in legacy_parse_ai_json(text)
+               if InsightResponse(spending_summary=TOTALS, **e))
+
+
+def current_batch(text: str) -> int:
+    return sum(1 for e in parse_ai_json(text)
+               if InsightResponse(spending_summary=TOTALS, **e))
+
+
+def per_sec(fn, text: str, parses: int) -> float:
+    start = time.perf_counter()
+    for _ in range(parses):
+        fn(text)
+    return parses / (time.perf_counter() - start)
+
+
+def main(parses: int):
+    assert json.loads(legacy_insight(PLAIN)) == json.loads(current_insight(PLAIN))
+    assert json.loads(legacy_insight(FENCED)) == json.loads(current_insight(FENCED))
+
+    cases = [
+        ("insight", legacy_insight, current_insight, PLAIN, parses),
+        ("fenced", legacy_insight, current_insight, FENCED, parses),
+        ("batch x25", legacy_batch, current_batch, BATCH, max(1, parses // 25)),
+    ]
+    print(f"{'output':<10} {'legacy/sec':>11} {'current/sec':>12} {'speedup':>8}")
+    for name, legacy, current, text, n in cases:
+        old = per_sec(legacy, text, n)
+        new = per_sec(current, text, n)
+        print(f"{name:<10} {old:>11.0f} {new:>12.0f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--parses", type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.parses)
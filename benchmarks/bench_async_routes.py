@@ -0,0 +1,146 @@
+"""
+Compare the legacy threadpool Gemini call path with the native async path.
+
+Runs /v1/ai/hello in-process (ASGI transport, no network) against a stubbed
+Gemini client that sleeps for a fixed latency, and reports requests/sec and
+p99 latency at several client concurrency levels. The legacy path is a
+replica of the old sync `def` handler calling `client.models.generate_content`.
+
+Usage:
+    python -m benchmarks.bench_async_routes [--latency 0.2] [--requests 400]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from app.routes import hello
+from app.routes.hello import router as hello_router
+from app.models.requests import InsightRequest
+
+
+class StubGeminiClient:
+    """Fake genai.Client exposing both the sync and the async models API."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.models = SimpleNamespace(generate_content=self._generate_sync)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self._generate_async)
+        )
+
+    def _generate_sync(self, *, model, contents, config=None):
+        time.sleep(self.latency)
+        return SimpleNamespace(text="Hello from the stub model.")
+
+    async def _generate_async(self, *, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(text="Hello from the stub model.")
+
+
+def build_legacy_app(client: StubGeminiClient) -> FastAPI:
+    """App with the pre-async handler shape: sync def, blocking SDK call."""
+    app = FastAPI()
+
+    @app.post("/v1/ai/hello")
+    def legacy_hello(req: InsightRequest):
+        response = client.models.generate_content(
+            model="gemini-2.5-flash",
+            contents=f"Greet {req.name or 'friend'}",
+        )
+        return {"aiva_message": response.text}
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def build_async_app(client: StubGeminiClient) -> FastAPI:
+    """App using the real async hello router."""
+    hello.get_gemini_client = lambda: client
+    app = FastAPI()
+    app.include_router(hello_router, prefix="/v1")
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def run_load(app: FastAPI, concurrency: int, total: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies: list[float] = []
+    health_latencies: list[float] = []
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                resp = await client.post("/v1/ai/hello", json={"name": "Faith"})
+                latencies.append(time.perf_counter() - start)
+                assert resp.status_code == 200, resp.text
+
+        async def health_probe(done: asyncio.Event):
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        done = asyncio.Event()
+        probe = asyncio.create_task(health_probe(done))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "health_max_ms": max(health_latencies, default=0.0) * 1000,
+    }
+
+
+async def main(latency: float, total: int, levels: list[int]):
+    client = StubGeminiClient(latency)
+    apps = {
+        "legacy-threadpool": build_legacy_app(client),
+        "native-async": build_async_app(client),
+    }
+
+    print(f"stub latency={latency * 1000:.0f}ms, requests per run={total}")
+    print(f"{'path':<18} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'/health max ms':>15}")
+    for concurrency in levels:
+        for name, app in apps.items():
+            result = await run_load(app, concurrency, total)
+            print(
+                f"{name:<18} {concurrency:>5} {result['rps']:>9.1f} "
+                f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                f"{result['health_max_ms']:>15.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Stub model latency in seconds")
+    parser.add_argument("--requests", type=int, default=400,
+                        help="Requests per (path, concurrency) run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[5, 20, 80])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.requests, args.concurrency))
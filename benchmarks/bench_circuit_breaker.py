@@ -0,0 +1,89 @@
+"""
+Microbenchmarks for CircuitBreaker.
+
+Measures the per-call overhead of the breaker when CLOSED, and the cost of
+the OPEN-state fast-fail, on both the sync and async paths. The fast-fail
+should cost microseconds, compared with the 5-10 s a failing Gemini call
+took during the 2026-01-27 incident.
+
+Usage:
+    python -m benchmarks.bench_circuit_breaker [--iterations 200000]
+"""
+import argparse
+import asyncio
+import time
+
+from app.helpers.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _ok():
+    return None
+
+
+async def _ok_async():
+    return None
+
+
+def _fail():
+    raise RuntimeError("upstream down")
+
+
+def open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("bench", minimum_calls=1, timeout=3600)
+    try:
+        breaker.call(_fail)
+    except RuntimeError:
+        pass
+    assert breaker.state == "OPEN"
+    return breaker
+
+
+def bench_sync(breaker: CircuitBreaker, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            breaker.call(func)
+        except CircuitOpenError:
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+async def bench_async(breaker: CircuitBreaker, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        try:
+            await breaker.call_async(func)
+        except CircuitOpenError:
+            pass
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_baseline(iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        _ok()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(iterations: int):
+    results = {
+        "direct call (no breaker)": bench_baseline(iterations),
+        "closed, sync call": bench_sync(CircuitBreaker("bench"), _ok, iterations),
+        "closed, async call": asyncio.run(
+            bench_async(CircuitBreaker("bench"), _ok_async, iterations)),
+        "open fast-fail, sync": bench_sync(open_breaker(), _ok, iterations),
+        "open fast-fail, async": asyncio.run(
+            bench_async(open_breaker(), _ok_async, iterations)),
+    }
+
+    print(f"{iterations} iterations per case")
+    print(f"{'case':<28} {'us/call':>9}")
+    for name, seconds in results.items():
+        print(f"{name:<28} {seconds * 1e6:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.iterations)
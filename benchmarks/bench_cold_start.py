@@ -0,0 +1,124 @@
+"""
+Cold-start profile: import time per module and time to first /health.
+
+Imports `app.main` in a fresh interpreter under `python -X importtime` and
+reports the slowest modules by cumulative import time, grouped by top-level
+package as well. Then starts uvicorn in a subprocess several times and
+measures the time from process launch to the first 200 from /health, and
+to the first AI insight (rule-based, so no Gemini is needed).
+
+Exits with status 1 if the median time to first /health is over --target-ms,
+so it can gate a scale-to-zero deployment. Build the data artifact first
+(`python -m app.services.data_artifact`) to measure what the image ships.
+
+Usage:
+    python -m benchmarks.bench_cold_start [--runs 5] [--target-ms 2000] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.bench_load_replay import free_port
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile() -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module `app.main` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            rows.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return rows
+
+
+def print_import_profile(rows: list[tuple[str, int, int]], top: int) -> None:
+    total = next((cumulative for module, _, cumulative in rows if module == "app.main"), 0)
+    print(f"Import of app.main: {total / 1000:.1f} ms\n")
+
+    print(f"{'module':<48} {'self ms':>9} {'cumulative ms':>14}")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"{module:<48} {self_us / 1000:>9.1f} {cumulative_us / 1000:>14.1f}")
+
+    by_package: dict[str, int] = defaultdict(int)
+    for module, self_us, _ in rows:
+        by_package[module.split(".")[0]] += self_us
+    print(f"\n{'package (self time summed)':<48} {'ms':>9}")
+    for package, self_us in sorted(by_package.items(), key=lambda r: -r[1])[:top]:
+        print(f"{package:<48} {self_us / 1000:>9.1f}")
+
+
+def time_to_first(env: dict) -> tuple[float, float]:
+    """Seconds from launch to the first /health 200 and to the first insight."""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"App exited with status {process.returncode}")
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            health = time.perf_counter() - start
+            client.post("/v1/ai/insights").raise_for_status()
+            insight = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return health, insight
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile app cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=2000.0,
+                        help="Median time to first /health that counts as a pass")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print_import_profile(import_profile(), args.top)
+
+    # Rule-based insights, so the first-insight time needs no Gemini
+    env = {**os.environ, "INSIGHTS_FALLBACK_MODE": "always"}
+    health_ms, insight_ms = [], []
+    for _ in range(args.runs):
+        health, insight = time_to_first(env)
+        health_ms.append(health * 1000)
+        insight_ms.append(insight * 1000)
+
+    health_p50 = statistics.median(health_ms)
+    print(f"\nOver {args.runs} launches:")
+    print(f"  time to first /health:  median {health_p50:.0f} ms, max {max(health_ms):.0f} ms "
+          f"(target {args.target_ms:.0f} ms)")
+    print(f"  time to first insight:  median {statistics.median(insight_ms):.0f} ms, "
+          f"max {max(insight_ms):.0f} ms")
+    if health_p50 > args.target_ms:
+        print("FAIL: time to first /health is over target")
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Fallback insight build latency (p50/p99) and validity.
+
+Builds deterministic insights for random spending summaries across known
+and unknown categories and all spend levels, validates every one as an
+InsightResponse, and reports per-build latency. The target is well under
+one millisecond per build.
+
+Usage:
+    python -m benchmarks.bench_fallback_insights [--builds 20000]
+"""
+import argparse
+import random
+import time
+
+from app.models.responses import InsightResponse
+from app.services.fallback_insights import build_fallback_insight
+from app.services.spending_engine import describe_spending
+
+CATEGORIES = ["Food", "Transport", "Entertainment", "Shopping", "Bills", "Travel"]
+
+
+def make_summaries(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    summaries = []
+    for _ in range(count):
+        categories = rng.sample(CATEGORIES, rng.randint(1, len(CATEGORIES)))
+        scale = rng.choice([10, 40, 120])
+        summaries.append({c: round(rng.uniform(1, scale), 2) for c in categories})
+    return summaries
+
+
+def main(builds: int):
+    summaries = make_summaries(builds)
+    described = [describe_spending(totals) for totals in summaries]
+
+    tones = {}
+    for totals, (dominant, total, level) in zip(summaries[:1000], described):
+        fields = build_fallback_insight(totals, dominant, total, level)
+        InsightResponse(spending_summary=totals, **fields)
+        tones[fields["emotional_tone"]] = tones.get(fields["emotional_tone"], 0) + 1
+
+    timings = []
+    for totals, (dominant, total, level) in zip(summaries, described):
+        start = time.perf_counter()
+        build_fallback_insight(totals, dominant, total, level)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[int(len(timings) * 0.99)] * 1e6
+    print(f"{'builds':>7} {'p50 us':>8} {'p99 us':>8} {'max us':>8}  tones (first 1000)")
+    print(f"{builds:>7} {p50:>8.1f} {p99:>8.1f} {timings[-1] * 1e6:>8.1f}  {tones}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--builds", type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.builds)
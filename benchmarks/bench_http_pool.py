@@ -0,0 +1,176 @@
+"""
+Connection handshake savings of the pooled Gemini HTTP client.
+
+Sends waves of concurrent generate calls through the real google-genai SDK
+to the local fake Gemini server over TLS (a throwaway self-signed cert made
+with `openssl`; plain HTTP if it is not installed). The server charges
+two simulated round trips (--rtt) for each new connection, standing in for
+the TCP and TLS handshakes to a remote Gemini region. Three httpx pool
+configurations are compared:
+
+    no keep-alive    every call opens and TLS-handshakes a new connection
+    httpx defaults   the SDK's default pool: 100 connections, 20 kept alive
+    tuned pool       app settings (GEMINI_HTTP_MAX_CONNECTIONS / _MAX_KEEPALIVE /
+                     _KEEPALIVE_EXPIRY_SECONDS), with per-endpoint timeouts
+
+Waves are separated by --idle seconds, longer than httpx's default 5 s
+keep-alive expiry when set to e.g. 6, to show connections surviving gaps
+between bursts. The report gives calls/sec, p50/p99 call latency, and connections and TLS
+handshakes per 100 calls.
+
+Usage:
+    python -m benchmarks.bench_http_pool [--concurrency 20] [--waves 10] [--latency 0.05]
+        [--rtt 0.03] [--idle 0]
+"""
+import argparse
+import asyncio
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from google import genai
+from google.genai import types
+
+from app.core.config import get_settings
+from app.helpers.http_pool import PoolStats, PooledAsyncClient, build_pooled_client
+from benchmarks.bench_load_replay import free_port
+
+MODEL = "gemini-2.5-flash"
+
+
+def make_cert(directory: Path) -> tuple[Path, Path] | None:
+    if shutil.which("openssl") is None:
+        return None
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", str(key), "-out", str(cert), "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def start_server(port: int, latency: float, rtt: float,
+                 cert: tuple[Path, Path] | None) -> subprocess.Popen:
+    """Run the fake server in its own process so it does not share our GIL."""
+    command = [sys.executable, "-m", "benchmarks.fake_gemini_server", "--port", str(port),
+               "--latency-median", str(latency), "--latency-p99", str(latency),
+               "--quota-per-minute", "0", "--connect-rtt", str(rtt)]
+    if cert:
+        command += ["--ssl-certfile", str(cert[0]), "--ssl-keyfile", str(cert[1])]
+    process = subprocess.Popen(command)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Fake Gemini server did not start")
+
+
+def variants(verify) -> dict:
+    timeout = httpx.Timeout(30.0)
+    return {
+        "no keep-alive": lambda stats: PooledAsyncClient(
+            {}, stats, timeout=timeout, verify=verify,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=0)),
+        "httpx defaults": lambda stats: PooledAsyncClient(
+            {}, stats, timeout=timeout, verify=verify, limits=httpx.Limits(
+                max_connections=100, max_keepalive_connections=20)),
+        "tuned pool": lambda stats: _tuned(stats, verify),
+    }
+
+
+def _tuned(stats: PoolStats, verify) -> PooledAsyncClient:
+    client = build_pooled_client(stats)
+    if verify is True:
+        return client
+    # Same limits and timeouts, trusting the throwaway certificate
+    return PooledAsyncClient(client.endpoint_timeouts, stats, timeout=client.timeout,
+                             verify=verify, http2=stats.http2, limits=httpx.Limits(
+                                 max_connections=get_settings().gemini_http_max_connections,
+                                 max_keepalive_connections=get_settings().gemini_http_max_keepalive,
+                                 keepalive_expiry=get_settings().gemini_http_keepalive_expiry_seconds))
+
+
+async def run_variant(make_client, base_url: str, concurrency: int, waves: int,
+                      idle: float = 0.0) -> dict:
+    stats = PoolStats()
+    http_client = make_client(stats)
+    client = genai.Client(api_key="fake-key", http_options=types.HttpOptions(
+        base_url=base_url, httpx_async_client=http_client))
+    latencies: list[float] = []
+
+    async def call():
+        start = time.perf_counter()
+        await client.aio.models.generate_content(model=MODEL, contents="Say hello")
+        latencies.append(time.perf_counter() - start)
+
+    busy = 0.0
+    for wave in range(waves):
+        if wave and idle:
+            await asyncio.sleep(idle)
+        start = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(concurrency)))
+        busy += time.perf_counter() - start
+    await http_client.aclose()
+
+    calls = len(latencies)
+    latencies.sort()
+    return {
+        "calls_per_sec": calls / busy,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(calls * 0.99) - 1] * 1000,
+        "connections_per_100": stats.connections_opened * 100 / calls,
+        "handshakes_per_100": stats.tls_handshakes * 100 / calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pooled Gemini HTTP client.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--waves", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Fake Gemini latency per call in seconds")
+    parser.add_argument("--rtt", type=float, default=0.03,
+                        help="Simulated network round trip; each new connection costs two")
+    parser.add_argument("--idle", type=float, default=0.0,
+                        help="Seconds between waves (calls/sec counts only busy time)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert = make_cert(Path(tmp))
+        port = free_port()
+        server = start_server(port, args.latency, args.rtt, cert)
+        scheme = "https" if cert else "http"
+        verify = ssl.create_default_context(cafile=str(cert[0])) if cert else True
+
+        print(f"{args.waves} waves of {args.concurrency} concurrent calls over {scheme}, "
+              f"fake latency {args.latency * 1000:.0f} ms, RTT {args.rtt * 1000:.0f} ms, "
+              f"{args.idle:g} s between waves\n")
+        print(f"{'pool':<16} {'calls/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'conns/100':>10} {'TLS/100':>8}")
+        try:
+            for name, make_client in variants(verify).items():
+                result = asyncio.run(run_variant(make_client, f"{scheme}://127.0.0.1:{port}",
+                                                 args.concurrency, args.waves, args.idle))
+                print(f"{name:<16} {result['calls_per_sec']:>8.1f} {result['p50_ms']:>8.1f} "
+                      f"{result['p99_ms']:>8.1f} {result['connections_per_100']:>10.1f} "
+                      f"{result['handshakes_per_100']:>8.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
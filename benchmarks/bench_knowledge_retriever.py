@@ -0,0 +1,100 @@
+"""
+Per-request knowledge base retrieval cost as the KB grows.
+
+Builds synthetic KBs of up to 50k entries (about ENTRIES_PER_CATEGORY per
+category, so bigger KBs cover more categories) and times what one insights
+request needs from the KB (guidance block + check-in entry) with the old
+linear scan, which ran once for each, against the compiled category index.
+Index lookups should stay flat as the KB grows; the scan grows linearly.
+
+Usage:
+    python -m benchmarks.bench_knowledge_retriever [--sizes 1000 10000 50000]
+"""
+import argparse
+import time
+
+from app.services.knowledge_retriever import CHECKIN_TYPE, CompiledKnowledgeBase
+
+ENTRIES_PER_CATEGORY = 25
+TYPES = ["minimise", "pattern", "celebrate", CHECKIN_TYPE]
+
+
+def make_kb(size: int) -> tuple[list[dict], int]:
+    categories = max(1, size // ENTRIES_PER_CATEGORY)
+    kb = []
+    for i in range(size):
+        category = f"Category{i % categories}"
+        entry = {
+            "id": f"entry_{i}",
+            "type": TYPES[i % len(TYPES)],
+            "text": f"Hey {{user_name}}, note {i} about {category}.",
+        }
+        if entry["type"] == CHECKIN_TYPE:
+            entry["categories"] = [category, f"Category{(i + 1) % categories}"]
+            entry["question"] = "How are you feeling about this?"
+            entry["options"] = ["Stressed", "Celebrating", "Not sure"]
+        else:
+            entry["category"] = category
+        kb.append(entry)
+    return kb, categories
+
+
+def scan_request(kb: list[dict], category: str, user_name: str):
+    """The pre-index request path: two full scans of the KB."""
+    def relevant():
+        return [item for item in kb
+                if item.get("category") == category
+                or (isinstance(item.get("categories"), list)
+                    and category in item["categories"])]
+
+    parts = []
+    for item in relevant():
+        text = item.get("text", "").replace("{user_name}", user_name)
+        if text:
+            parts.append(text)
+        if item.get("type") == CHECKIN_TYPE:
+            option_lines = "\n".join(f"- {opt}" for opt in item["options"])
+            parts.append(f"{item['question']}\n{option_lines}")
+    checkin = next((i for i in relevant() if i.get("type") == CHECKIN_TYPE), None)
+    return "\n\n".join(parts), checkin
+
+
+def index_request(index: CompiledKnowledgeBase, category: str, user_name: str):
+    retrieval = index.retrieve(category)
+    return retrieval.guidance_text(user_name), retrieval.checkin
+
+
+def per_call_us(func, categories: int, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        func(f"Category{i % categories}")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(sizes: list[int]):
+    print(f"{'entries':>8} {'compile ms':>11} {'scan us/req':>12} "
+          f"{'index us/req':>13} {'speedup':>8}")
+    for size in sizes:
+        kb, categories = make_kb(size)
+        start = time.perf_counter()
+        index = CompiledKnowledgeBase(kb)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        for category in ("Category0", "Category7"):
+            assert scan_request(kb, category, "friend") == \
+                index_request(index, category, "friend")
+
+        scan = per_call_us(lambda c: scan_request(kb, c, "friend"), categories, 50)
+        # Warm the per-category memo once, as a long-running server would be
+        per_call_us(lambda c: index_request(index, c, "friend"), categories, categories)
+        indexed = per_call_us(
+            lambda c: index_request(index, c, "friend"), categories, 20_000)
+        print(f"{size:>8} {compile_ms:>11.1f} {scan:>12.0f} "
+              f"{indexed:>13.1f} {scan / indexed:>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 50_000])
+    args = parser.parse_args()
+    main(args.sizes)
@@ -0,0 +1,346 @@
+"""
+End-to-end load replay of the 2026-01-27 incident burst.
+
+Starts a local fake Gemini server (see `fake_gemini_server.py`: log-normal
+latency, a 20 req/min quota and optional 429 / 503 injection), starts the real
+app under uvicorn in a subprocess pointed at it through GEMINI_BASE_URL,
+and replays the incident's traffic shape open-loop over real HTTP:
+
+    baseline   light mixed traffic (hello, insights, checkin)
+    attack     a rapid burst of POST /v1/ai/insights
+    recovery   light mixed traffic again, to see how fast service returns
+
+/health is probed on a fixed interval throughout. The report gives, per
+endpoint, throughput and p50/p95/p99 latency with status counts (and how
+many insights were degraded), /health latency under load, and quota
+efficiency: how many upstream calls the app made, how many Gemini
+rejected, and how many user requests each successful call served, plus
+the app's retries and the work its request deadlines saved.
+
+Phase durations are scaled by --time-scale (1.0 replays the full ~5
+minute incident); arrival rates are not scaled. Insights requests send
+`Cache-Control: no-cache` unless --allow-cache is given, so every request
+reaches the Gemini path the way distinct users would.
+
+Usage:
+    python -m benchmarks.bench_load_replay [--time-scale 0.1] [--attack-rps 20]
+        [--latency-median 0.8] [--latency-p99 4] [--error-rate 0.05]
+        [--unavailable-rate 0.05] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_gemini_server import FakeGeminiServer
+
+INSIGHTS = "POST /v1/ai/insights"
+HELLO = "POST /v1/ai/hello"
+CHECKIN = "POST /v1/ai/checkin"
+HEALTH = "GET /health"
+
+REQUESTS = {
+    INSIGHTS: ("POST", "/v1/ai/insights", None),
+    HELLO: ("POST", "/v1/ai/hello", {"name": "Load Test"}),
+    CHECKIN: ("POST", "/v1/ai/checkin", {"category": "Food", "selected_option": "Stress"}),
+}
+
+# Cloud Run's request timeout; requests still open after this count as timeouts
+CLIENT_TIMEOUT = 60.0
+
+
+@dataclass
+class Phase:
+    name: str
+    seconds: float
+    rps: float
+    mix: dict  # endpoint -> weight
+
+
+def incident_profile(attack_rps: float) -> list[Phase]:
+    """Traffic shape of the 2026-01-27 incident at full length."""
+    light = {INSIGHTS: 2, HELLO: 1, CHECKIN: 1}
+    return [
+        Phase("baseline", 20, 1.0, light),
+        Phase("attack", 240, attack_rps, {INSIGHTS: 1}),
+        Phase("recovery", 60, 1.0, light),
+    ]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    phase: str
+    status: int | str  # HTTP status, or "timeout" / "error"
+    seconds: float
+    degraded: bool = False
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_gemini(server: FakeGeminiServer, port: int) -> uvicorn.Server:
+    runner = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="off"))
+    threading.Thread(target=runner.run, daemon=True).start()
+    while not runner.started:
+        time.sleep(0.05)
+    return runner
+
+
+def start_app(port: int, gemini_url: str, extra_env: dict, logs: bool = False) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_BASE_URL": gemini_url,
+        **extra_env,
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=None if logs else subprocess.DEVNULL,
+        stderr=None if logs else subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup with status {process.returncode} "
+                               "(rerun with --app-logs to see why)")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not become healthy within 60 s")
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, phase: str,
+               headers: dict, samples: list[Sample]) -> None:
+    method, path, body = REQUESTS[endpoint]
+    start = time.perf_counter()
+    degraded = False
+    try:
+        response = await client.request(method, path, json=body, headers=headers)
+        status: int | str = response.status_code
+        if endpoint == INSIGHTS and status == 200:
+            degraded = bool(response.json().get("degraded"))
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError:
+        status = "error"
+    samples.append(Sample(endpoint, phase, status, time.perf_counter() - start, degraded))
+
+
+async def probe_health(client: httpx.AsyncClient, interval: float, stop: asyncio.Event,
+                       phase_of, samples: list[Sample]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            status: int | str = (await client.get("/health")).status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError:
+            status = "error"
+        samples.append(Sample(HEALTH, phase_of(), status, time.perf_counter() - start))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def replay(base_url: str, phases: list[Phase], time_scale: float,
+                 insights_headers: dict, health_interval: float, seed: int) -> tuple[list, float]:
+    """Send the profile open-loop; returns the samples and wall-clock seconds."""
+    rng = random.Random(seed)
+    samples: list[Sample] = []
+    current = [phases[0].name]
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, timeout=CLIENT_TIMEOUT, limits=limits) as client, \
+            httpx.AsyncClient(base_url=base_url, timeout=CLIENT_TIMEOUT) as health_client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(
+            probe_health(health_client, health_interval, stop, lambda: current[0], samples))
+        tasks = []
+        start = time.perf_counter()
+        for phase in phases:
+            current[0] = phase.name
+            endpoints, weights = zip(*phase.mix.items())
+            interval = 1.0 / phase.rps
+            phase_end = time.perf_counter() + phase.seconds * time_scale
+            next_at = time.perf_counter()
+            while next_at < phase_end:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                endpoint = rng.choices(endpoints, weights)[0]
+                headers = insights_headers if endpoint == INSIGHTS else {}
+                tasks.append(asyncio.create_task(send(client, endpoint, phase.name, headers, samples)))
+                next_at += interval
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+    return samples, elapsed
+
+
+def percentile(values: list[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(samples: list[Sample], elapsed: float, gemini: dict, app_metrics: str) -> dict:
+    by_endpoint: dict[str, list[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+
+    endpoints = {}
+    for endpoint, group in sorted(by_endpoint.items()):
+        latencies = [s.seconds * 1000 for s in group]
+        statuses = Counter(str(s.status) for s in group)
+        endpoints[endpoint] = {
+            "requests": len(group),
+            "throughput_rps": round(len(group) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(max(latencies), 1),
+            "statuses": dict(sorted(statuses.items())),
+            "degraded": sum(1 for s in group if s.degraded),
+            "p99_ms_by_phase": {
+                phase: round(percentile([s.seconds * 1000 for s in group if s.phase == phase], 99), 1)
+                for phase in dict.fromkeys(s.phase for s in group)
+            },
+        }
+
+    # Users served by a real (non-degraded) Gemini answer
+    served = sum(1 for s in samples if s.endpoint != HEALTH and s.status == 200 and not s.degraded)
+    upstream_ok = gemini.get("succeeded", 0)
+    rejected = gemini.get("quota_rejected", 0) + gemini.get("injected_429", 0)
+    app_quota_rejected = 0
+    retries = 0
+    work_saved: Counter = Counter()
+    for line in app_metrics.splitlines():
+        if line.startswith("aiva_quota_requests_total{") and 'result="rejected"' in line:
+            app_quota_rejected += int(float(line.split()[-1]))
+        elif line.startswith("aiva_gemini_retries_total{"):
+            retries += int(float(line.split()[-1]))
+        elif line.startswith("aiva_work_saved_total{"):
+            work_saved[line.split('"')[1]] += int(float(line.split()[-1]))
+
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "endpoints": endpoints,
+        "quota": {
+            "upstream_calls": gemini.get("calls", 0),
+            "upstream_succeeded": upstream_ok,
+            "upstream_rejected_429": rejected,
+            "wasted_call_share": round(rejected / gemini["calls"], 3) if gemini.get("calls") else 0.0,
+            "rejected_by_app_quota": app_quota_rejected,
+            "ai_responses_served": served,
+            "responses_per_upstream_success": round(served / upstream_ok, 2) if upstream_ok else 0.0,
+            "retries": retries,
+            "work_saved": dict(work_saved),
+        },
+        "gemini": gemini,
+    }
+
+
+def print_report(report: dict, args) -> None:
+    print(f"Incident replay: time scale {args.time_scale}, attack {args.attack_rps} req/s, "
+          f"Gemini latency p50 {args.latency_median}s / p99 {args.latency_p99}s, "
+          f"quota {args.gemini_quota}/min, injected 429s {args.error_rate:.0%}, "
+          f"503s {args.unavailable_rate:.0%}")
+    print(f"Wall clock: {report['elapsed_seconds']}s\n")
+    print(f"{'endpoint':<22} {'reqs':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'degraded':>9}  statuses")
+    for endpoint, row in report["endpoints"].items():
+        statuses = " ".join(f"{code}:{count}" for code, count in row["statuses"].items())
+        print(f"{endpoint:<22} {row['requests']:>6} {row['throughput_rps']:>7} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['degraded']:>9}  {statuses}")
+
+    health = report["endpoints"].get(HEALTH)
+    if health:
+        phases = ", ".join(f"{phase} {ms} ms" for phase, ms in health["p99_ms_by_phase"].items())
+        print(f"\n/health p99 by phase: {phases}")
+
+    quota = report["quota"]
+    print(f"\nUpstream Gemini calls: {quota['upstream_calls']} "
+          f"({quota['upstream_succeeded']} succeeded, {quota['upstream_rejected_429']} rejected with 429, "
+          f"{quota['wasted_call_share']:.0%} wasted)")
+    print(f"Calls held back by the app's own quota: {quota['rejected_by_app_quota']}")
+    print(f"AI responses served: {quota['ai_responses_served']} "
+          f"({quota['responses_per_upstream_success']} per successful upstream call)")
+    saved = ", ".join(f"{kind} {count}" for kind, count in sorted(quota["work_saved"].items()))
+    print(f"Transient-error retries: {quota['retries']}; work saved: {saved or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the incident burst against the app.")
+    parser.add_argument("--time-scale", type=float, default=0.1,
+                        help="Multiplier on phase durations (1.0 = full incident length)")
+    parser.add_argument("--attack-rps", type=float, default=20.0)
+    parser.add_argument("--latency-median", type=float, default=0.8)
+    parser.add_argument("--latency-p99", type=float, default=4.0)
+    parser.add_argument("--gemini-quota", type=int, default=20,
+                        help="Fake Gemini calls admitted per minute (free tier: 20)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Share of admitted Gemini calls answered with an injected 429")
+    parser.add_argument("--unavailable-rate", type=float, default=0.0,
+                        help="Share of admitted Gemini calls answered with an injected 503")
+    parser.add_argument("--health-interval", type=float, default=0.25)
+    parser.add_argument("--allow-cache", action="store_true",
+                        help="Let insights requests hit the response cache")
+    parser.add_argument("--app-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the app, e.g. INSIGHTS_FALLBACK_MODE=off")
+    parser.add_argument("--app-logs", action="store_true", help="Show the app's log output")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", default=None, help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    fake = FakeGeminiServer(args.latency_median, args.latency_p99, args.gemini_quota,
+                            args.error_rate, seed=args.seed,
+                            unavailable_rate=args.unavailable_rate)
+    gemini_port, app_port = free_port(), free_port()
+    fake_runner = start_fake_gemini(fake, gemini_port)
+    app_process = start_app(app_port, f"http://127.0.0.1:{gemini_port}",
+                            dict(item.split("=", 1) for item in args.app_env), args.app_logs)
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        headers = {} if args.allow_cache else {"Cache-Control": "no-cache"}
+        samples, elapsed = asyncio.run(replay(
+            base_url, incident_profile(args.attack_rps), args.time_scale, headers,
+            args.health_interval, args.seed))
+        app_metrics = httpx.get(f"{base_url}/metrics", timeout=10).text
+    finally:
+        app_process.terminate()
+        app_process.wait(timeout=30)
+        fake_runner.should_exit = True
+
+    report = summarize(samples, elapsed, dict(fake.stats), app_metrics)
+    print_report(report, args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
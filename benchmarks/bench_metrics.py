@@ -0,0 +1,85 @@
+"""
+Metrics instrumentation overhead.
+
+Times the hot-path operations (counter increment, histogram observation)
+and the per-request cost of MetricsMiddleware around a trivial ASGI app,
+then the cost of rendering /metrics with a realistic number of series.
+
+Usage:
+    python -m benchmarks.bench_metrics [--ops 200000] [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from app.helpers.metrics import MetricsMiddleware, MetricsRegistry
+
+LABELS = ("/v1/ai/insights", "POST", "200")
+
+
+class _Route:
+    path = "/v1/ai/insights"
+
+
+async def plain_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+def ns_per_op(fn, ops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - start) / ops * 1e9
+
+
+async def us_per_request(app, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "path": "/v1/ai/insights", "method": "POST"}
+        await app(scope, _receive, _send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(ops: int, requests: int):
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "Bench counter.", ("route", "method", "status"))
+    histogram = registry.histogram("bench_seconds", "Bench histogram.", ("route", "method", "status"))
+
+    print(f"{'operation':<28} {'cost':>12}")
+    print(f"{'counter.inc':<28} {ns_per_op(lambda: counter.inc(LABELS), ops):>9.0f} ns")
+    print(f"{'histogram.observe':<28} {ns_per_op(lambda: histogram.observe(0.042, LABELS), ops):>9.0f} ns")
+
+    bare = asyncio.run(us_per_request(plain_app, requests))
+    wrapped = asyncio.run(us_per_request(MetricsMiddleware(plain_app), requests))
+    print(f"{'ASGI request, bare':<28} {bare:>9.2f} us")
+    print(f"{'ASGI request, instrumented':<28} {wrapped:>9.2f} us")
+    print(f"{'middleware overhead':<28} {wrapped - bare:>9.2f} us")
+
+    # ~20 routes x 5 statuses of histogram series, like a busy instance
+    for route in range(20):
+        for status in ("200", "400", "429", "500", "503"):
+            labels = (f"/route/{route}", "POST", status)
+            counter.inc(labels)
+            histogram.observe(0.1, labels)
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed = (time.perf_counter() - start) * 1e3
+    print(f"{'render 100 series':<28} {elapsed:>9.2f} ms ({len(text) // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.ops, args.requests)
@@ -0,0 +1,150 @@
+"""
+Quota-aware model routing against the local fake Gemini server.
+
+Runs the real app twice against a fresh fake server that gives each model
+its own quota and latency (like Gemini's per-model limits):
+
+    single model   GEMINI_MODEL_POOL holds the primary model only
+    router         the primary plus a lighter, cheaper fallback model
+
+and sends POST /v1/ai/hello open-loop at --rps for --seconds, each with a
+different name so no calls are coalesced. The report gives, per variant,
+AI answers served vs 429s, p50/p95 latency, and the app's per-model usage
+from /health/models (calls, tokens, estimated cost, downshifts).
+
+With --slow-primary the primary model's latency is set above its target,
+so the router also downshifts on latency rather than only on quota.
+
+Usage:
+    python -m benchmarks.bench_model_router [--rps 4] [--seconds 30] [--slow-primary]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import string
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.bench_load_replay import free_port, start_app, start_fake_gemini
+from benchmarks.fake_gemini_server import FakeGeminiServer
+
+PRIMARY = "gemini-2.5-flash"
+LIGHT = "gemini-2.5-flash-lite"
+
+# (requests per minute, median latency s, latency target s, $ per 1M input, $ per 1M output)
+PROFILES = {
+    PRIMARY: (10, 0.8, 2.0, 0.30, 2.50),
+    LIGHT: (30, 0.3, 1.0, 0.10, 0.40),
+}
+
+
+def pool_spec(models: list[str]) -> str:
+    return ",".join(
+        f"{name}:rpm={rpm}:latency={target}:input_cost={input_cost}:output_cost={output_cost}"
+        for name in models
+        for rpm, _, target, input_cost, output_cost in [PROFILES[name]]
+    )
+
+
+def fake_server(slow_primary: bool, seed: int) -> FakeGeminiServer:
+    models = {}
+    for name, (rpm, latency, target, _, _) in PROFILES.items():
+        if slow_primary and name == PRIMARY:
+            latency = target * 1.5
+        models[name] = {"quota_per_minute": rpm, "latency_median": latency,
+                        "latency_p99": latency * 2}
+    return FakeGeminiServer(quota_per_minute=0, models=models, seed=seed)
+
+
+async def load(base_url: str, rps: float, seconds: float, seed: int) -> list[tuple[int | str, float]]:
+    rng = random.Random(seed)
+    results: list[tuple[int | str, float]] = []
+
+    async def send(client: httpx.AsyncClient) -> None:
+        name = "".join(rng.choices(string.ascii_letters, k=12))
+        start = time.perf_counter()
+        try:
+            status: int | str = (await client.post("/v1/ai/hello", json={"name": name})).status_code
+        except httpx.HTTPError:
+            status = "error"
+        results.append((status, time.perf_counter() - start))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        tasks = []
+        next_at = time.perf_counter()
+        end = next_at + seconds
+        while next_at < end:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(client)))
+            next_at += 1.0 / rps
+        await asyncio.gather(*tasks)
+    return results
+
+
+def run_variant(models: list[str], args) -> dict:
+    fake = fake_server(args.slow_primary, args.seed)
+    gemini_port, app_port = free_port(), free_port()
+    runner = start_fake_gemini(fake, gemini_port)
+    env = {"GEMINI_MODEL_POOL": pool_spec(models), "GEMINI_CONTEXT_CACHE_ENABLED": "false"}
+    app = start_app(app_port, f"http://127.0.0.1:{gemini_port}", env, args.app_logs)
+    base_url = f"http://127.0.0.1:{app_port}"
+    try:
+        results = asyncio.run(load(base_url, args.rps, args.seconds, args.seed))
+        router = httpx.get(f"{base_url}/health/models").json()
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        runner.should_exit = True
+
+    ok = sorted(seconds * 1000 for status, seconds in results if status == 200)
+    return {
+        "requests": len(results),
+        "statuses": Counter(str(status) for status, _ in results),
+        "p50_ms": statistics.median(ok) if ok else 0.0,
+        "p95_ms": ok[int(len(ok) * 0.95) - 1] if len(ok) >= 20 else (ok[-1] if ok else 0.0),
+        "router": router,
+    }
+
+
+def print_variant(name: str, result: dict) -> None:
+    statuses = " ".join(f"{code}:{count}" for code, count in sorted(result["statuses"].items()))
+    served = result["statuses"].get("200", 0)
+    print(f"{name}: {served}/{result['requests']} answered ({statuses}), "
+          f"p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms")
+    print(f"  {'model':<24} {'calls':>6} {'ok':>5} {'429':>5} {'latency s':>10} "
+          f"{'tokens in/out':>15} {'cost $':>10}")
+    for model, state in result["router"]["models"].items():
+        tokens = f"{state['input_tokens']}/{state['output_tokens']}"
+        latency = "-" if state["latency_seconds"] is None else f"{state['latency_seconds']:.2f}"
+        print(f"  {model:<24} {state['selected']:>6} {state['succeeded']:>5} "
+              f"{state['rate_limited']:>5} {latency:>10} {tokens:>15} "
+              f"{state['estimated_cost_usd']:>10.6f}")
+    for shift in result["router"]["downshifts"]:
+        print(f"  downshifted from {shift['from']} ({shift['reason']}): {shift['count']}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quota-aware model routing.")
+    parser.add_argument("--rps", type=float, default=4.0)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--slow-primary", action="store_true",
+                        help="Make the primary model slower than its latency target")
+    parser.add_argument("--app-logs", action="store_true", help="Show the app's log output")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"POST /v1/ai/hello at {args.rps:g} req/s for {args.seconds:g} s; fake Gemini quotas "
+          + ", ".join(f"{name} {profile[0]}/min" for name, profile in PROFILES.items())
+          + (" (primary slower than its target)" if args.slow_primary else "") + "\n")
+    print_variant("single model", run_variant([PRIMARY], args))
+    print_variant("router", run_variant([PRIMARY, LIGHT], args))
+
+
+if __name__ == "__main__":
+    main()
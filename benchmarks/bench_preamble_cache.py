@@ -0,0 +1,113 @@
+"""
+Input tokens billed per call with and without preamble caching, plus an
+offline walk through the context cache lifecycle.
+
+Runs insights-shaped calls through `generate_content` against the fake
+Gemini client in three modes:
+- inline:             static instructions resent inside every prompt
+- system_instruction: instructions sent as a separate system instruction
+- cached_content:     instructions uploaded once and referenced by name
+
+Then steps a fake clock through create -> reuse -> refresh before expiry ->
+server-side loss -> recreate, checking each transition.
+
+The real AIVA preambles are ~200 tokens, below Gemini's 1024-token minimum
+for explicit caching, so in production they use the system_instruction
+mode; --preamble-tokens pads the preamble to show the cached mode.
+
+Usage:
+    python -m benchmarks.bench_preamble_cache [--calls 200] [--preamble-tokens 1500]
+"""
+import argparse
+import asyncio
+
+from app.helpers.preamble_cache import PreambleCache
+from app.helpers.quota import gemini_quota
+from app.services import ai_client
+from app.services.ai_client import generate_content
+from app.services.prompt_builder import INSIGHTS_PREAMBLE, prompt_builder
+from benchmarks.fake_gemini import FakeClock, FakeGeminiClient
+
+MODEL = "gemini-2.5-flash"
+TOTALS = {"Food": 36.70, "Transport": 18.00, "Entertainment": 9.99}
+
+
+def padded_preamble(tokens: int) -> str:
+    padding = " Stay warm and specific." * max(0, (tokens * 4 - len(INSIGHTS_PREAMBLE)) // 24)
+    return INSIGHTS_PREAMBLE + padding
+
+
+async def run_mode(mode: str, preamble: str, calls: int) -> dict:
+    clock = FakeClock()
+    client = FakeGeminiClient(min_cache_tokens=1024, clock=clock)
+    cache = PreambleCache(enabled=mode == "cached_content", min_tokens=1024, clock=clock)
+    cache.register("insights", preamble)
+    ai_client.preamble_cache = cache
+
+    text = prompt_builder.insights(TOTALS, "Food", 64.69, "moderate").text
+    for _ in range(calls):
+        if mode == "inline":
+            await generate_content(client, f"{preamble}\n\n{text}", MODEL)
+        else:
+            await generate_content(client, text, MODEL, "insights")
+    return {**client.billed_tokens(), **client.cache_ops}
+
+
+async def lifecycle(preamble: str) -> list[str]:
+    clock = FakeClock()
+    client = FakeGeminiClient(min_cache_tokens=1024, clock=clock)
+    cache = PreambleCache(ttl_seconds=3600, refresh_margin_seconds=300, clock=clock)
+    cache.register("insights", preamble)
+    ai_client.preamble_cache = cache
+    steps = []
+
+    async def call(label: str):
+        await generate_content(client, "Weekly spending summary: Food: £1.00.", MODEL, "insights")
+        used_cache = client.calls[-1].cached_tokens > 0
+        steps.append(f"{label:<38} cache={'yes' if used_cache else 'no ':<4} "
+                     f"creates={cache.creates} refreshes={cache.refreshes} "
+                     f"live={sum(c.expires_at > clock() for c in client.caches.values())}")
+        return used_cache
+
+    assert await call("first call creates the cache")
+    assert await call("second call reuses it")
+    assert cache.creates == 1 and cache.hits == 1
+
+    clock.advance(3600 - 200)  # inside the refresh margin
+    assert await call("near expiry: TTL extended")
+    assert cache.refreshes == 1 and cache.creates == 1
+
+    client.caches.clear()  # lost server-side
+    assert not await call("cache lost: retried inline")
+    assert await call("next call recreates it")
+    assert cache.creates == 2
+
+    clock.advance(7200)  # long idle, fully expired
+    assert await call("after full expiry: recreated")
+    assert cache.creates == 3
+    return steps
+
+
+def main(calls: int, preamble_tokens: int):
+    gemini_quota.per_minute = 0  # measure tokens, not the rate limiter
+    preamble = padded_preamble(preamble_tokens)
+
+    print(f"preamble ~{len(preamble) // 4} tokens, {calls} calls\n")
+    print(f"{'mode':<19} {'full-rate tokens/call':>22} {'cached tokens/call':>19} "
+          f"{'cache creates':>14}")
+    for mode in ("inline", "system_instruction", "cached_content"):
+        stats = asyncio.run(run_mode(mode, preamble, calls))
+        print(f"{mode:<19} {stats['full_rate_input_tokens'] / calls:>22.0f} "
+              f"{stats['cached_input_tokens'] / calls:>19.0f} {stats['create']:>14}")
+
+    print("\nlifecycle:")
+    for step in asyncio.run(lifecycle(preamble)):
+        print(f"  {step}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--preamble-tokens", type=int, default=1500)
+    args = parser.parse_args()
+    main(args.calls, args.preamble_tokens)
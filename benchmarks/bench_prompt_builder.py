@@ -0,0 +1,127 @@
+"""
+Prompt renders/sec: per-request string building vs compiled templates.
+
+The legacy path rebuilds the insights and check-in prompts with f-strings
+and concatenation, re-rendering the KB guidance block (placeholder replace
+and option joining) on every call. The compiled path splices only the
+per-request values into a template whose category and KB sections are
+pre-rendered; the static instructions go out separately as a cached
+preamble. The compiled text must appear verbatim in the legacy prompt.
+
+Usage:
+    python -m benchmarks.bench_prompt_builder [--renders 50000]
+"""
+import argparse
+import time
+
+from app.services.knowledge_retriever import get_relevant_chunks
+from app.services.prompt_builder import CATEGORY_CONTEXT, DEFAULT_CONTEXT, prompt_builder
+
+TOTALS = {"Food": 36.70, "Transport": 18.00, "Entertainment": 9.99, "Shopping": 24.50}
+CATEGORIES = ["Food", "Entertainment", "Transport", "Shopping"]
+
+
+def legacy_guidance_text(category: str, user_name: str) -> str:
+    parts = []
+    for item in get_relevant_chunks(category):
+        text = item.get("text", "").replace("{user_name}", user_name)
+        if text:
+            parts.append(text)
+        if item.get("type") == "multi_category_checkin":
+            question = item.get("question")
+            options = item.get("options", [])
+            if question and options:
+                option_lines = "\n".join(f"- {opt}" for opt in options)
+                parts.append(f"{question}\n{option_lines}")
+    return "\n\n".join(parts)
+
+
+def legacy_insights(totals, dominant_category, total_spend, spend_level):
+    category_context = CATEGORY_CONTEXT.get(dominant_category, DEFAULT_CONTEXT)
+    guidance_text = legacy_guidance_text(dominant_category, "friend")
+    summary_text = ", ".join([f"{cat}: £{amt:.2f}" for cat, amt in totals.items()])
+    prompt = (
+        "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
+        f"Weekly spending summary: {summary_text}.\n"
+        f"Dominant spending category: {dominant_category}.\n"
+        f"Approximate total weekly spend: £{total_spend:.2f} ({spend_level} level).\n"
+        f"Emotional/contextual note about this category: {category_context}\n\n"
+    )
+    if guidance_text:
+        prompt += (
+            "Here are additional coaching guidelines and reflections you should follow "
+            "when speaking to the user about this situation:\n"
+            f"{guidance_text}\n\n"
+        )
+    prompt += (
+        "TASK 1 — Identify the category with the highest total spending.\n"
+        "TASK 2 — Choose the emotional tone the user needs. Options:\n"
+        "- reassuring\n- motivating\n- grounding\n\n"
+        "TASK 3 — Give ONE gentle and actionable financial suggestion.\n\n"
+        "TASK 4 — Write a short (3–4 sentences) narrative insight using the chosen tone.\n"
+        "Include empathy, clarity, and emotional awareness.\n\n"
+        "FORMAT the response STRICTLY as JSON with:\n"
+        "{\n"
+        "  'top_category': '',\n"
+        "  'emotional_tone': '',\n"
+        "  'suggested_action': '',\n"
+        "  'aiva_insight': ''\n"
+        "}\n"
+        "Return only JSON. No commentary."
+    )
+    return prompt
+
+
+def legacy_checkin(user_name, category, selected):
+    return (
+        "You are AIVA, an emotionally intelligent financial well-being assistant.\n\n"
+        f"User name: {user_name}.\n"
+        f"Their dominant spending category is: {category}.\n"
+        f"They chose this reflection option: \"{selected}\".\n\n"
+        "TASK 1 — Acknowledge their feelings with genuine empathy.\n"
+        "TASK 2 — Reflect briefly on how this feeling might be connected to their spending.\n"
+        "TASK 3 — Offer 1–2 gentle, realistic next steps that support both emotions and budget.\n"
+        "TASK 4 — Keep the tone warm, non-judgmental, and grounded.\n\n"
+        "FORMAT the response STRICTLY as JSON with:\n"
+        "{\n"
+        "  'aiva_followup': '',\n"
+        "  'detected_emotion': '',\n"
+        "  'supportive_reframe': '',\n"
+        "  'next_step_suggestion': ''\n"
+        "}\n"
+        "Return only JSON. No commentary."
+    )
+
+
+def renders_per_sec(render, renders: int) -> float:
+    start = time.perf_counter()
+    for i in range(renders):
+        render(CATEGORIES[i % len(CATEGORIES)])
+    return renders / (time.perf_counter() - start)
+
+
+def main(renders: int):
+    cases = {
+        "insights": (
+            lambda c: legacy_insights(TOTALS, c, 89.19, "moderate"),
+            lambda c: prompt_builder.insights(TOTALS, c, 89.19, "moderate").text,
+        ),
+        "checkin": (
+            lambda c: legacy_checkin("Sam", c, "I've been really stressed."),
+            lambda c: prompt_builder.checkin("Sam", c, "I've been really stressed.").text,
+        ),
+    }
+    print(f"{'prompt':<9} {'legacy/sec':>11} {'compiled/sec':>13} {'speedup':>8}")
+    for name, (legacy, compiled) in cases.items():
+        for category in CATEGORIES:
+            assert compiled(category) in legacy(category), (name, category)
+        old = renders_per_sec(legacy, renders)
+        new = renders_per_sec(compiled, renders)
+        print(f"{name:<9} {old:>11.0f} {new:>13.0f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.renders)
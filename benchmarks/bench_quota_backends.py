@@ -0,0 +1,95 @@
+"""
+Check that each quota backend enforces one shared budget across instances.
+
+Simulates several Cloud Run instances (one QuotaGovernor and backend client
+each, several threads per instance) hammering the governor for a short
+window, then reports how many requests were granted against the budget
+and the acquire latency per backend. The Redis backend runs against the
+local stand-in from benchmarks/fake_redis.py.
+
+Usage:
+    python -m benchmarks.bench_quota_backends [--instances 10] [--seconds 2]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from app.helpers.quota import (
+    MemoryQuotaBackend,
+    QuotaExceededError,
+    QuotaGovernor,
+    RedisQuotaBackend,
+    SQLiteQuotaBackend,
+)
+from benchmarks.fake_redis import FakeRedisServer
+
+
+def hammer(governors: list[QuotaGovernor], threads_per_instance: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def worker(governor: QuotaGovernor):
+        local: list[float] = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                governor.acquire()
+            except QuotaExceededError:
+                pass
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [
+        threading.Thread(target=worker, args=(g,))
+        for g in governors for _ in range(threads_per_instance)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        "granted": sum(g.granted for g in governors),
+        "rejected": sum(g.rejected for g in governors),
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def main(instances: int, threads: int, seconds: float, per_minute: int):
+    budget = per_minute + per_minute * seconds / 60
+    print(f"{instances} instances x {threads} threads for {seconds}s, "
+          f"budget {per_minute}/min -> expect ~{budget:.1f} granted cluster-wide")
+    print(f"{'backend':<8} {'granted':>8} {'rejected':>9} {'p50 us':>9} {'p99 us':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp, FakeRedisServer() as redis_server:
+        sqlite_path = os.path.join(tmp, "quota.sqlite3")
+        factories = {
+            "memory": MemoryQuotaBackend,
+            "sqlite": lambda: SQLiteQuotaBackend(sqlite_path),
+            "redis": lambda: RedisQuotaBackend(redis_server.url),
+        }
+        for name, factory in factories.items():
+            governors = [
+                QuotaGovernor(factory(), per_minute=per_minute)
+                for _ in range(instances)
+            ]
+            result = hammer(governors, threads, seconds)
+            print(f"{name:<8} {result['granted']:>8} {result['rejected']:>9} "
+                  f"{result['p50_us']:>9.1f} {result['p99_us']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--instances", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--per-minute", type=int, default=20)
+    args = parser.parse_args()
+    main(args.instances, args.threads, args.seconds, args.per_minute)
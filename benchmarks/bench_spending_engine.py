@@ -0,0 +1,87 @@
+"""
+Benchmark the row-based and columnar spending engines.
+
+Generates synthetic transaction histories and times `summarize_spending`
+(list of dicts, Python loop) against the NumPy-backed TransactionStore
+aggregations: by category, by week, and over a date range. The row-based
+engine is skipped above --row-limit rows since building that many dicts
+needs several GB of memory.
+
+Usage:
+    python -m benchmarks.bench_spending_engine [--sizes 10000 1000000 10000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.spending_engine import summarize_spending
+from app.services.transaction_store import (
+    TransactionStore,
+    day_to_iso,
+    summarize_by_category,
+    summarize_by_week,
+)
+
+CATEGORIES = ["Food", "Transport", "Income", "Entertainment", "Shopping",
+              "Bills", "Healthcare", "Other"]
+FIRST_DAY = 19723  # 2024-01-01
+
+
+def make_store(rows: int, seed: int = 7) -> TransactionStore:
+    rng = np.random.default_rng(seed)
+    days = FIRST_DAY + rng.integers(0, 730, rows)
+    amounts = np.round(rng.uniform(-250.0, 80.0, rows), 2)
+    codes = rng.integers(0, len(CATEGORIES), rows).astype(np.int32)
+    return TransactionStore(days, amounts, codes, list(CATEGORIES))
+
+
+def to_records(store: TransactionStore) -> list[dict]:
+    return [
+        {"date": day_to_iso(d), "amount": float(a), "category": store.categories[c]}
+        for d, a, c in zip(store.days, store.amounts, store.category_codes)
+    ]
+
+
+def best_of(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes: list[int], row_limit: int):
+    print(f"{'rows':>10} {'store MB':>9} {'rows loop ms':>13} {'by cat ms':>10} "
+          f"{'by week ms':>11} {'90-day ms':>10} {'speedup':>8}")
+    for rows in sizes:
+        store = make_store(rows)
+        by_cat = best_of(lambda: summarize_by_category(store))
+        by_week = best_of(lambda: summarize_by_week(store))
+        ranged = best_of(
+            lambda: summarize_by_category(store, "2025-01-01", "2025-03-31"))
+
+        loop_ms = speedup = "-"
+        if rows <= row_limit:
+            records = to_records(store)
+            assert list(summarize_spending(records).items()) == \
+                list(summarize_by_category(store).items())
+            loop = best_of(lambda: summarize_spending(records))
+            loop_ms = f"{loop * 1000:.2f}"
+            speedup = f"{loop / by_cat:.0f}x"
+            del records
+
+        print(f"{rows:>10} {store.nbytes / 1e6:>9.1f} {loop_ms:>13} "
+              f"{by_cat * 1000:>10.2f} {by_week * 1000:>11.2f} "
+              f"{ranged * 1000:>10.2f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--row-limit", type=int, default=1_000_000,
+                        help="Largest size to also run the row-based engine on")
+    args = parser.parse_args()
+    main(args.sizes, args.row_limit)
@@ -0,0 +1,126 @@
+"""
+Server-Sent Events streaming against the local fake Gemini server.
+
+Runs the real app against a fake server whose streamed replies spend most
+of their latency before the first chunk, and calls /v1/ai/hello and
+/v1/ai/checkin --requests times each, both plain and with
+`Accept: text/event-stream`. Reports, per endpoint, time to the first
+`token` event and to the final event against the plain response time.
+
+Exits with status 1 if any stream sent no `token` event before its final
+(`done` / `result`) event, or ended without one: a stream that only
+delivers the finished answer is no faster than the plain call.
+
+Usage:
+    python -m benchmarks.bench_sse_streaming [--requests 5] [--latency 1.0]
+"""
+import argparse
+import asyncio
+import statistics
+import string
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_load_replay import free_port, start_app, start_fake_gemini
+from benchmarks.fake_gemini_server import FakeGeminiServer
+
+ENDPOINTS = {
+    "hello": ("/v1/ai/hello", {"name": "Sam"}, "done"),
+    "checkin": ("/v1/ai/checkin", {"category": "Food", "selected_option": "Stress"}, "result"),
+}
+
+
+async def plain(client: httpx.AsyncClient, path: str, body: dict) -> float:
+    start = time.perf_counter()
+    response = await client.post(path, json=body)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def streamed(client: httpx.AsyncClient, path: str, body: dict,
+                   final_event: str) -> dict:
+    """Stream one call; return event timings and the order events arrived in."""
+    start = time.perf_counter()
+    first_token = final = None
+    events = []
+    async with client.stream("POST", path, json=body,
+                             headers={"Accept": "text/event-stream"}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("event: "):
+                continue
+            event = line[len("event: "):]
+            events.append(event)
+            if event == "token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif event in (final_event, "error"):
+                final = time.perf_counter() - start
+    tokens_first = bool(events) and events[0] == "token" and events[-1] == final_event
+    return {"first_token": first_token, "final": final, "tokens": events.count("token"),
+            "ok": tokens_first}
+
+
+async def measure(base_url: str, requests: int) -> dict:
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for name, (path, body, final_event) in ENDPOINTS.items():
+            plain_times, streams = [], []
+            for i in range(requests):
+                # Distinct inputs so no call is served from a cache or coalesced
+                varied = {**body, "name": "User " + string.ascii_letters[i % 52] * 3}
+                plain_times.append(await plain(client, path, varied))
+                streams.append(await streamed(client, path, varied, final_event))
+            results[name] = {"plain": plain_times, "streams": streams}
+    return results
+
+
+def _median_ms(values) -> str:
+    values = [v for v in values if v is not None]
+    return f"{statistics.median(values) * 1000:.0f}" if values else "-"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check and time SSE streaming endpoints.")
+    parser.add_argument("--requests", type=int, default=5, help="Calls per endpoint and mode")
+    parser.add_argument("--latency", type=float, default=1.0,
+                        help="Fake Gemini median latency in seconds")
+    parser.add_argument("--app-logs", action="store_true", help="Show the app's log output")
+    args = parser.parse_args()
+
+    fake = FakeGeminiServer(latency_median=args.latency, latency_p99=args.latency * 1.5,
+                            quota_per_minute=0)
+    gemini_port, app_port = free_port(), free_port()
+    runner = start_fake_gemini(fake, gemini_port)
+    env = {"GEMINI_QUOTA_PER_MINUTE": "1000", "GEMINI_CONTEXT_CACHE_ENABLED": "false"}
+    app = start_app(app_port, f"http://127.0.0.1:{gemini_port}", env, args.app_logs)
+    try:
+        results = asyncio.run(measure(f"http://127.0.0.1:{app_port}", args.requests))
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        runner.should_exit = True
+
+    print(f"{'endpoint':<10} {'plain ms':>9} {'first token ms':>15} {'final ms':>9} "
+          f"{'tokens':>7} {'ok':>5}")
+    failed = []
+    for name, result in results.items():
+        streams = result["streams"]
+        ok = sum(s["ok"] for s in streams)
+        print(f"{name:<10} {_median_ms(result['plain']):>9} "
+              f"{_median_ms(s['first_token'] for s in streams):>15} "
+              f"{_median_ms(s['final'] for s in streams):>9} "
+              f"{statistics.median(s['tokens'] for s in streams):>7g} {ok:>2}/{len(streams)}")
+        if ok < len(streams):
+            failed.append(name)
+
+    if failed:
+        print(f"\nNo token events before the final event on: {', '.join(failed)}")
+        return 1
+    print("\nEvery stream sent token events before its final event")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Query latency of the local vector index as the knowledge base grows.
+
+Builds hashing TF-IDF indexes over synthetic KBs (same generator as
+bench_knowledge_retriever) and reports build time, matrix size and
+p50/p99 latency of spending-driven top-k searches, with and without the
+category pre-filter. Target: sub-millisecond queries at 100k entries.
+
+Usage:
+    python -m benchmarks.bench_vector_index [--sizes 1000 10000 100000] [--k 5]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.vector_index import VectorIndex
+from benchmarks.bench_knowledge_retriever import make_kb
+
+QUERIES = 500
+
+
+def latencies_ms(search, categories: int) -> list[float]:
+    rng = random.Random(3)
+    samples = []
+    for _ in range(QUERIES):
+        a, b = rng.randrange(categories), rng.randrange(categories)
+        totals = {f"Category{a}": rng.uniform(10, 200), f"Category{b}": rng.uniform(10, 200)}
+        start = time.perf_counter()
+        search(totals, f"Category{a}")
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples: list[float], p: int) -> float:
+    return statistics.quantiles(samples, n=100)[p - 1]
+
+
+def main(sizes: list[int], k: int):
+    print(f"{'entries':>8} {'build s':>8} {'matrix MB':>10} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'filtered p50':>13} {'filtered p99':>13}")
+    for size in sizes:
+        kb, categories = make_kb(size)
+        start = time.perf_counter()
+        index = VectorIndex(kb)
+        build = time.perf_counter() - start
+
+        full = latencies_ms(lambda totals, _: index.search_spending(totals, k=k), categories)
+        filtered = latencies_ms(
+            lambda totals, category: index.search_spending(totals, k=k, category=category),
+            categories)
+        print(f"{size:>8} {build:>8.2f} {index.nbytes / 1e6:>10.1f} "
+              f"{percentile(full, 50):>8.3f} {percentile(full, 99):>8.3f} "
+              f"{percentile(filtered, 50):>13.3f} {percentile(filtered, 99):>13.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.k)
@@ -0,0 +1,188 @@
+"""
+Minimal in-process stand-in for the google-genai async client.
+
+Implements the parts of `client.aio` the app uses: models.generate_content,
+models.generate_content_stream and caches.create/update/get/delete. Cached
+contents expire on a controllable clock, enforce Gemini's minimum cacheable
+size, and every call records how many input tokens were billed at the full
+rate and how many were served from cache. This lets the preamble cache
+lifecycle (create, reuse, refresh, server-side expiry) run offline.
+
+Tokens are estimated as characters / 4.
+"""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+@dataclass
+class CallRecord:
+    model: str
+    prompt_tokens: int
+    cached_tokens: int
+    system_tokens: int
+
+
+@dataclass
+class _Cache:
+    name: str
+    model: str
+    system_instruction: str
+    expires_at: float
+
+
+class FakeClock:
+    """Manually advanced clock, for stepping through cache expiry."""
+
+    def __init__(self, start: float | None = None):
+        self.now = time.time() if start is None else start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeGeminiClient:
+    """
+    Args:
+        reply: Text every generate call returns
+        latency: Seconds each generate call sleeps
+        min_cache_tokens: Smallest cacheable content, like the real API
+        clock: Wall-clock source for cache expiry
+    """
+
+    def __init__(self, reply: str = "{}", latency: float = 0.0,
+                 min_cache_tokens: int = 1024, clock=time.time):
+        self.reply = reply
+        self.latency = latency
+        self.min_cache_tokens = min_cache_tokens
+        self.clock = clock
+        self.calls: list[CallRecord] = []
+        self.caches: dict[str, _Cache] = {}
+        self.cache_ops = {"create": 0, "update": 0, "delete": 0}
+        self._ids = itertools.count(1)
+
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_content,
+                generate_content_stream=self._generate_content_stream,
+            ),
+            caches=SimpleNamespace(
+                create=self._create_cache,
+                update=self._update_cache,
+                get=self._get_cache,
+                delete=self._delete_cache,
+            ),
+        )
+
+    # ---- caches ----
+
+    def _live_cache(self, name: str) -> _Cache:
+        cache = self.caches.get(name)
+        if cache is None or self.clock() >= cache.expires_at:
+            self.caches.pop(name, None)
+            raise RuntimeError(f"404 NOT_FOUND. CachedContent not found (or expired): {name}")
+        return cache
+
+    def _cached_content(self, cache: _Cache):
+        return SimpleNamespace(
+            name=cache.name,
+            model=cache.model,
+            expire_time=datetime.fromtimestamp(cache.expires_at, tz=timezone.utc),
+            usage_metadata=SimpleNamespace(
+                total_token_count=estimate_tokens(cache.system_instruction)),
+        )
+
+    @staticmethod
+    def _ttl_seconds(config: dict) -> float:
+        return float(str(config.get("ttl", "3600s")).rstrip("s"))
+
+    async def _create_cache(self, *, model: str, config: dict):
+        text = config.get("system_instruction") or ""
+        tokens = estimate_tokens(text)
+        if tokens < self.min_cache_tokens:
+            raise RuntimeError(
+                f"400 INVALID_ARGUMENT. Cached content is too small. "
+                f"total_token_count={tokens}, min_total_token_count={self.min_cache_tokens}")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.caches[name] = _Cache(name, model, text, self.clock() + self._ttl_seconds(config))
+        self.cache_ops["create"] += 1
+        return self._cached_content(self.caches[name])
+
+    async def _update_cache(self, *, name: str, config: dict):
+        cache = self._live_cache(name)
+        cache.expires_at = self.clock() + self._ttl_seconds(config)
+        self.cache_ops["update"] += 1
+        return self._cached_content(cache)
+
+    async def _get_cache(self, *, name: str):
+        return self._cached_content(self._live_cache(name))
+
+    async def _delete_cache(self, *, name: str):
+        self.caches.pop(name, None)
+        self.cache_ops["delete"] += 1
+
+    # ---- models ----
+
+    def _record(self, model: str, contents: str, config: dict | None) -> CallRecord:
+        config = config or {}
+        cached_tokens = system_tokens = 0
+        if config.get("cached_content"):
+            cache = self._live_cache(config["cached_content"])
+            if cache.model != model:
+                raise RuntimeError("400 INVALID_ARGUMENT. Cached content model mismatch")
+            cached_tokens = estimate_tokens(cache.system_instruction)
+        if config.get("system_instruction"):
+            system_tokens = estimate_tokens(config["system_instruction"])
+        record = CallRecord(
+            model=model,
+            prompt_tokens=estimate_tokens(contents) + system_tokens,
+            cached_tokens=cached_tokens,
+            system_tokens=system_tokens,
+        )
+        self.calls.append(record)
+        return record
+
+    def _response(self, record: CallRecord):
+        return SimpleNamespace(
+            text=self.reply,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=record.prompt_tokens + record.cached_tokens,
+                cached_content_token_count=record.cached_tokens,
+            ),
+        )
+
+    async def _generate_content(self, *, model: str, contents: str, config=None):
+        record = self._record(model, contents, config)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._response(record)
+
+    async def _generate_content_stream(self, *, model: str, contents: str, config=None):
+        response = self._response(self._record(model, contents, config))
+
+        async def chunks():
+            for i in range(0, len(response.text), 16):
+                if self.latency:
+                    await asyncio.sleep(self.latency / 4)
+                yield SimpleNamespace(text=response.text[i:i + 16])
+
+        return chunks()
+
+    # ---- accounting ----
+
+    def billed_tokens(self) -> dict:
+        return {
+            "calls": len(self.calls),
+            "full_rate_input_tokens": sum(c.prompt_tokens for c in self.calls),
+            "cached_input_tokens": sum(c.cached_tokens for c in self.calls),
+        }
@@ -0,0 +1,372 @@
+"""
+Local HTTP stand-in for the Gemini REST API, for end-to-end load runs.
+
+Serves the endpoints the google-genai SDK calls (generateContent,
+streamGenerateContent and cachedContents) so the real app can point at it
+through GEMINI_BASE_URL. Unlike `fake_gemini.FakeGeminiClient`, it is a
+separate server, so a load run also exercises the SDK's HTTP transport.
+
+Behaviour under load is configurable:
+- latency: log-normal per call, set by its median and p99
+- quota: calls beyond `quota_per_minute` in any 60 s window get the same
+  429 RESOURCE_EXHAUSTED body Gemini returns
+- injection: a share of calls that would succeed get that 429 anyway,
+  and another share a transient 503 UNAVAILABLE
+- per model: latency and quota can be set for each model name, since
+  Gemini quotas are per model (models without a profile use the defaults)
+- connection setup: the first call on each new client connection waits
+  two extra round trips (TCP + TLS 1.3 handshake to a remote region),
+  which loopback connections would otherwise get for free
+
+Replies are synthesised from the request's responseSchema (property
+examples, else the first enum value, else a placeholder), so
+schema-constrained calls parse. Counters are served at GET /_fake/stats,
+with per-model counters under "models".
+
+Usage:
+    python -m benchmarks.fake_gemini_server [--port 8089] [--latency-median 0.8]
+        [--model gemini-2.5-flash-lite:latency=0.3:p99=1:rpm=30 ...]
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+import orjson
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.fake_gemini import estimate_tokens
+
+RESOURCE_EXHAUSTED = {
+    "error": {
+        "code": 429,
+        "message": "Resource has been exhausted (e.g. check quota).",
+        "status": "RESOURCE_EXHAUSTED",
+    }
+}
+UNAVAILABLE = {
+    "error": {
+        "code": 503,
+        "message": "The model is overloaded. Please try again later.",
+        "status": "UNAVAILABLE",
+    }
+}
+
+# z-score of the 99th percentile of a standard normal
+_Z99 = 2.326
+
+
+def _json(body, status_code: int = 200) -> Response:
+    return Response(orjson.dumps(body), status_code=status_code, media_type="application/json")
+
+
+def example_for(schema: dict | None):
+    """A value that satisfies a Gemini (OpenAPI subset) schema."""
+    if not schema:
+        return "Hello from the fake Gemini server."
+    if "example" in schema:
+        return schema["example"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    kind = str(schema.get("type", "STRING")).upper()
+    if kind == "OBJECT":
+        return {name: example_for(prop) for name, prop in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [example_for(schema.get("items"))]
+    if kind in ("INTEGER", "NUMBER"):
+        return 0
+    if kind == "BOOLEAN":
+        return False
+    return "placeholder"
+
+
+def _text(content) -> str:
+    """Concatenated text of a `contents` / `systemInstruction` value."""
+    if not content:
+        return ""
+    if isinstance(content, dict):
+        content = [content]
+    return "".join(part.get("text", "") for item in content for part in item.get("parts", []))
+
+
+class FakeGeminiServer:
+    """
+    Args:
+        latency_median: Median seconds per generate call
+        latency_p99: 99th percentile seconds per call (= median for fixed latency)
+        quota_per_minute: Calls admitted per sliding 60 s window; 0 for unlimited
+        error_rate: Share of admitted calls answered with an injected 429
+        unavailable_rate: Share of admitted calls answered with an injected 503
+        min_cache_tokens: Smallest cacheable content, like the real API
+        seed: Random seed for latency and injection
+        connect_rtt: Simulated network round trip; new connections pay two
+        unavailable_rate: Share of admitted calls answered with an injected 503
+        models: Model name -> overrides of `latency_median`, `latency_p99`
+            and `quota_per_minute` for that model
+    """
+
+    def __init__(self, latency_median: float = 0.8, latency_p99: float = 4.0,
+                 quota_per_minute: int = 20, error_rate: float = 0.0,
+                 min_cache_tokens: int = 1024, seed: int | None = None,
+                 connect_rtt: float = 0.0, unavailable_rate: float = 0.0,
+                 models: dict[str, dict] | None = None):
+        self.default_profile = _Profile(latency_median, latency_p99, quota_per_minute)
+        self.profiles = {
+            name: _Profile(overrides.get("latency_median", latency_median),
+                           overrides.get("latency_p99", overrides.get("latency_median", latency_p99)),
+                           overrides.get("quota_per_minute", quota_per_minute))
+            for name, overrides in (models or {}).items()
+        }
+        self.error_rate = error_rate
+        self.unavailable_rate = unavailable_rate
+        self.min_cache_tokens = min_cache_tokens
+        self.connect_rtt = connect_rtt
+        self._connections: set = set()
+        self.random = random.Random(seed)
+        self._caches: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self.stats = collections.Counter()
+        self.model_stats: dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self.app = Starlette(routes=[
+            Route("/{version}/models/{model}:generateContent", self.generate, methods=["POST"]),
+            Route("/{version}/models/{model}:streamGenerateContent", self.stream, methods=["POST"]),
+            Route("/{version}/cachedContents", self.create_cache, methods=["POST"]),
+            Route("/{version}/cachedContents/{cache_id}", self.cache,
+                  methods=["GET", "PATCH", "DELETE"]),
+            Route("/_fake/stats", self.get_stats, methods=["GET"]),
+        ])
+
+    # ---- load model ----
+
+    def _profile(self, model: str) -> "_Profile":
+        return self.profiles.get(model, self.default_profile)
+
+    def latency(self, model: str = "") -> float:
+        profile = self._profile(model)
+        if profile.latency_median <= 0:
+            return 0.0
+        return profile.latency_median * math.exp(profile.sigma * self.random.gauss(0, 1))
+
+    def _count(self, model: str, key: str) -> None:
+        self.stats[key] += 1
+        self.model_stats[model][key] += 1
+
+    def _admit(self, model: str = "") -> str | None:
+        """Reason the call is rejected, or None if it may proceed."""
+        self._count(model, "calls")
+        now = time.monotonic()
+        profile = self._profile(model)
+        if profile.quota_per_minute:
+            admitted = profile.admitted
+            while admitted and now - admitted[0] >= 60:
+                admitted.popleft()
+            if len(admitted) >= profile.quota_per_minute:
+                self._count(model, "quota_rejected")
+                return "quota"
+            admitted.append(now)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self._count(model, "injected_429")
+            return "injected"
+        if self.unavailable_rate and self.random.random() < self.unavailable_rate:
+            self._count(model, "injected_503")
+            return "unavailable"
+        return None
+
+    # ---- models ----
+
+    async def _connection_setup(self, request: Request) -> None:
+        peer = request.scope.get("client")
+        if peer not in self._connections:
+            self._connections.add(peer)
+            self.stats["connections"] += 1
+            if self.connect_rtt:
+                await asyncio.sleep(2 * self.connect_rtt)
+
+    async def _prepare(self, request: Request):
+        await self._connection_setup(request)
+        body = orjson.loads(await request.body())
+        rejected = self._admit(request.path_params["model"])
+        if rejected == "unavailable":
+            return body, None, _json(UNAVAILABLE, 503)
+        if rejected:
+            return body, None, _json(RESOURCE_EXHAUSTED, 429)
+        cached_tokens = 0
+        if body.get("cachedContent"):
+            cache = self._live_cache(body["cachedContent"])
+            if cache is None:
+                self.stats["cache_misses"] += 1
+                return body, None, _json({"error": {
+                    "code": 404, "status": "NOT_FOUND",
+                    "message": f"CachedContent not found (or expired): {body['cachedContent']}"}}, 404)
+            cached_tokens = cache["tokens"]
+        prompt_tokens = estimate_tokens(_text(body.get("contents"))) + \
+            estimate_tokens(_text(body.get("systemInstruction")))
+        self.stats["input_tokens"] += prompt_tokens
+        self.stats["cached_input_tokens"] += cached_tokens
+        schema = (body.get("generationConfig") or {}).get("responseSchema")
+        reply = example_for(schema)
+        text = reply if isinstance(reply, str) else orjson.dumps(reply).decode()
+        usage = {
+            "promptTokenCount": prompt_tokens + cached_tokens,
+            "cachedContentTokenCount": cached_tokens,
+            "candidatesTokenCount": estimate_tokens(text),
+        }
+        return body, (text, usage), None
+
+    @staticmethod
+    def _candidate(text: str, usage: dict | None = None, finished: bool = True) -> dict:
+        chunk = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+        if finished:
+            chunk["candidates"][0]["finishReason"] = "STOP"
+        if usage:
+            chunk["usageMetadata"] = usage
+        return chunk
+
+    async def generate(self, request: Request) -> Response:
+        _, reply, error = await self._prepare(request)
+        if error:
+            return error
+        model = request.path_params["model"]
+        await asyncio.sleep(self.latency(model))
+        self._count(model, "succeeded")
+        text, usage = reply
+        return _json(self._candidate(text, usage))
+
+    async def stream(self, request: Request) -> Response:
+        _, reply, error = await self._prepare(request)
+        if error:
+            return error
+        text, usage = reply
+        model = request.path_params["model"]
+        delay = self.latency(model)
+        pieces = [text[i:i + 32] for i in range(0, len(text), 32)] or [""]
+
+        async def events():
+            # Time to first token is most of the latency; the rest is spread out
+            await asyncio.sleep(delay * 0.8)
+            for i, piece in enumerate(pieces):
+                last = i == len(pieces) - 1
+                yield b"data: " + orjson.dumps(
+                    self._candidate(piece, usage if last else None, finished=last)) + b"\r\n\r\n"
+                if not last:
+                    await asyncio.sleep(delay * 0.2 / len(pieces))
+            self._count(model, "succeeded")
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ---- caches ----
+
+    def _live_cache(self, name: str) -> dict | None:
+        cache = self._caches.get(name)
+        if cache is None or time.time() >= cache["expires_at"]:
+            self._caches.pop(name, None)
+            return None
+        return cache
+
+    def _cache_body(self, cache: dict) -> dict:
+        expire = datetime.fromtimestamp(cache["expires_at"], tz=timezone.utc)
+        return {
+            "name": cache["name"],
+            "model": cache["model"],
+            "expireTime": expire.isoformat().replace("+00:00", "Z"),
+            "usageMetadata": {"totalTokenCount": cache["tokens"]},
+        }
+
+    @staticmethod
+    def _ttl(body: dict) -> float:
+        return float(str(body.get("ttl", "3600s")).rstrip("s"))
+
+    async def create_cache(self, request: Request) -> Response:
+        body = orjson.loads(await request.body())
+        tokens = estimate_tokens(_text(body.get("systemInstruction")))
+        if tokens < self.min_cache_tokens:
+            return _json({"error": {
+                "code": 400, "status": "INVALID_ARGUMENT",
+                "message": f"Cached content is too small. total_token_count={tokens}, "
+                           f"min_total_token_count={self.min_cache_tokens}"}}, 400)
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self._caches[name] = {"name": name, "model": body.get("model", ""), "tokens": tokens,
+                              "expires_at": time.time() + self._ttl(body)}
+        self.stats["caches_created"] += 1
+        return _json(self._cache_body(self._caches[name]))
+
+    async def cache(self, request: Request) -> Response:
+        name = f"cachedContents/{request.path_params['cache_id']}"
+        if request.method == "DELETE":
+            self._caches.pop(name, None)
+            return _json({})
+        cache = self._live_cache(name)
+        if cache is None:
+            return _json({"error": {"code": 404, "status": "NOT_FOUND",
+                                    "message": f"CachedContent not found: {name}"}}, 404)
+        if request.method == "PATCH":
+            cache["expires_at"] = time.time() + self._ttl(orjson.loads(await request.body()))
+        return _json(self._cache_body(cache))
+
+    async def get_stats(self, request: Request) -> Response:
+        return _json({**self.stats, "models": {name: dict(counts)
+                                                for name, counts in self.model_stats.items()}})
+
+
+class _Profile:
+    """Latency distribution and quota window for one model."""
+
+    def __init__(self, latency_median: float, latency_p99: float, quota_per_minute: int):
+        self.latency_median = latency_median
+        self.sigma = (math.log(latency_p99 / latency_median) / _Z99
+                      if latency_median > 0 and latency_p99 > latency_median else 0.0)
+        self.quota_per_minute = quota_per_minute
+        self.admitted: collections.deque[float] = collections.deque()
+
+
+_MODEL_OPTIONS = {"latency": ("latency_median", float), "p99": ("latency_p99", float),
+                  "rpm": ("quota_per_minute", int)}
+
+
+def parse_model_profile(spec: str) -> tuple[str, dict]:
+    """`name:latency=0.3:p99=1:rpm=30` -> (name, FakeGeminiServer `models` overrides)."""
+    name, *options = spec.split(":")
+    overrides = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        field, kind = _MODEL_OPTIONS[key]
+        overrides[field] = kind(value)
+    return name, overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API server.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-median", type=float, default=0.8)
+    parser.add_argument("--latency-p99", type=float, default=4.0)
+    parser.add_argument("--quota-per-minute", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--unavailable-rate", type=float, default=0.0)
+    parser.add_argument("--connect-rtt", type=float, default=0.0,
+                        help="Simulated round trip in seconds; new connections pay two")
+    parser.add_argument("--ssl-certfile", default=None, help="Serve HTTPS with this certificate")
+    parser.add_argument("--ssl-keyfile", default=None)
+    parser.add_argument("--model", action="append", default=[], metavar="NAME:latency=S:p99=S:rpm=N",
+                        help="Latency and quota for one model (repeatable)")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(args.latency_median, args.latency_p99,
+                              args.quota_per_minute, args.error_rate,
+                              connect_rtt=args.connect_rtt,
+                              unavailable_rate=args.unavailable_rate,
+                              models=dict(parse_model_profile(spec) for spec in args.model))
+    # Google's front ends keep idle connections open far longer than uvicorn's 5 s default
+    uvicorn.run(server.app, host="127.0.0.1", port=args.port, log_level="warning",
+                timeout_keep_alive=300, ssl_certfile=args.ssl_certfile, ssl_keyfile=args.ssl_keyfile)
+
+
+if __name__ == "__main__":
+    main()
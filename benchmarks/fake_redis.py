@@ -0,0 +1,165 @@
+"""
+Minimal in-process Redis-protocol stand-in for offline runs.
+
+Implements just the commands the quota backend uses (PING, SELECT, AUTH,
+GET, SET [PX], DEL, WATCH, UNWATCH, MULTI, EXEC, DISCARD) with real
+optimistic-locking semantics, so RedisQuotaBackend can be exercised
+without a Redis server.
+
+Usage:
+    python -m benchmarks.fake_redis --port 6379
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values: dict[str, tuple[str, float | None]] = {}
+        self.versions: dict[str, int] = {}
+
+    def get(self, key: str):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.values[key]
+            self._touch(key)
+            return None
+        return value
+
+    def set(self, key: str, value: str, px: int | None):
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self.values[key] = (value, expires_at)
+        self._touch(key)
+
+    def delete(self, key: str) -> int:
+        existed = self.values.pop(key, None) is not None
+        if existed:
+            self._touch(key)
+        return int(existed)
+
+    def _touch(self, key: str):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.watched: dict[str, int] = {}
+        self.queued: list[list[str]] | None = None
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            self.wfile.write(self._dispatch(args))
+
+    def _read_command(self) -> list[str] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            size = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(size + 2)[:-2].decode())
+        return args
+
+    def _dispatch(self, args: list[str]) -> bytes:
+        name = args[0].upper()
+        store: _Store = self.server.store
+
+        if self.queued is not None and name not in ("EXEC", "DISCARD", "MULTI", "WATCH"):
+            self.queued.append(args)
+            return b"+QUEUED\r\n"
+
+        with store.lock:
+            if name in ("PING",):
+                return b"+PONG\r\n"
+            if name in ("SELECT", "AUTH"):
+                return b"+OK\r\n"
+            if name == "WATCH":
+                for key in args[1:]:
+                    self.watched[key] = store.versions.get(key, 0)
+                return b"+OK\r\n"
+            if name == "UNWATCH":
+                self.watched.clear()
+                return b"+OK\r\n"
+            if name == "MULTI":
+                self.queued = []
+                return b"+OK\r\n"
+            if name == "DISCARD":
+                self.queued = None
+                self.watched.clear()
+                return b"+OK\r\n"
+            if name == "EXEC":
+                queued, self.queued = self.queued or [], None
+                conflict = any(
+                    store.versions.get(k, 0) != v for k, v in self.watched.items())
+                self.watched.clear()
+                if conflict:
+                    return b"*-1\r\n"
+                replies = [self._apply(store, cmd) for cmd in queued]
+                return b"*%d\r\n" % len(replies) + b"".join(replies)
+            return self._apply(store, args)
+
+    def _apply(self, store: _Store, args: list[str]) -> bytes:
+        name = args[0].upper()
+        if name == "GET":
+            value = store.get(args[1])
+            if value is None:
+                return b"$-1\r\n"
+            data = value.encode()
+            return b"$%d\r\n%s\r\n" % (len(data), data)
+        if name == "SET":
+            px = None
+            if len(args) >= 5 and args[3].upper() == "PX":
+                px = int(args[4])
+            store.set(args[1], args[2], px)
+            return b"+OK\r\n"
+        if name == "DEL":
+            return b":%d\r\n" % sum(store.delete(k) for k in args[1:])
+        return b"-ERR unknown command '%s'\r\n" % args[0].encode()
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Threaded RESP server. Use as a context manager to run it in the background."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = FakeRedisServer(args.host, args.port)
+    print(f"Fake Redis listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,299 @@
+"""
+Offline microbenchmark suite for the hot-path helpers, with a regression gate.
+
+Times summarize_spending, get_relevant_chunks, build_guidance_text,
+parse_ai_json, BaseRequest.sanitize_name (through request validation) and
+CircuitBreaker.call over parametrised data sizes, writes the results as
+JSON, and compares them against a stored baseline.
+
+Timings are also expressed relative to a fixed pure-Python calibration
+loop measured in the same run, and the comparison uses those relative
+costs, so a baseline recorded on one machine stays usable on a faster or
+slower CI runner. Each case is measured --runs times and the median
+relative cost is compared. A case fails if that grew by more than
+--tolerance; the process then exits with status 1. Cases cheaper than
+NOISE_FLOOR_NS swing by tens of percent between runs on shared runners
+(the breaker and validation calls are around a microsecond), so they are
+reported but not gated.
+
+Usage:
+    python -m benchmarks.suite                      # run and compare with the baseline
+    python -m benchmarks.suite --update-baseline    # run and store a new baseline
+    python -m benchmarks.suite --filter parse_ai_json --output results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.helpers.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.helpers.json_cleaner import parse_ai_json
+from app.models.requests import InsightRequest
+from app.services import knowledge_retriever
+from app.services.knowledge_retriever import (
+    CompiledKnowledgeBase, build_guidance_text, get_relevant_chunks
+)
+from app.services.spending_engine import summarize_spending
+from benchmarks.bench_knowledge_retriever import make_kb
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# Seconds each timing repeat should run for, and repeats per case
+MIN_REPEAT_SECONDS = 0.05
+REPEATS = 7
+
+# Cases faster than this per call are timed and reported but never fail the gate
+NOISE_FLOOR_NS = 5000.0
+
+# name -> list of (params, setup); setup returns the zero-argument op to time
+CASES: Dict[str, List[Tuple[Dict, Callable[[], Callable[[], object]]]]] = {}
+
+
+def case(name: str, **grid):
+    """Register a benchmark over every value of one parameter."""
+    (param, values), = grid.items()
+
+    def register(setup):
+        CASES[name] = [({param: value}, (lambda v=value: setup(v))) for value in values]
+        return setup
+    return register
+
+
+def case_id(name: str, params: Dict) -> str:
+    return name + "[" + ",".join(f"{k}={v}" for k, v in params.items()) + "]"
+
+
+# ---- cases ----
+
+CATEGORIES = ["Food", "Transport", "Entertainment", "Shopping", "Bills"]
+INSIGHT = {
+    "top_category": "Food",
+    "emotional_tone": "reassuring",
+    "suggested_action": "Try preparing one extra meal at home this week.",
+    "aiva_insight": "It looks like food was your top spending category this week.",
+}
+
+
+@case("summarize_spending", rows=[100, 10_000, 100_000])
+def _summarize(rows: int):
+    transactions = [
+        {"amount": (-1 if i % 5 else 1) * (i % 97 + 0.5), "category": CATEGORIES[i % len(CATEGORIES)]}
+        for i in range(rows)
+    ]
+    return lambda: summarize_spending(transactions)
+
+
+def _install_kb(size: int) -> str:
+    entries, _ = make_kb(size)
+    knowledge_retriever._COMPILED_KB = CompiledKnowledgeBase(entries)
+    return "Category0"
+
+
+@case("get_relevant_chunks", kb_entries=[100, 10_000])
+def _relevant_chunks(kb_entries: int):
+    category = _install_kb(kb_entries)
+    return lambda: get_relevant_chunks(category)
+
+
+@case("build_guidance_text", kb_entries=[100, 10_000])
+def _guidance_text(kb_entries: int):
+    category = _install_kb(kb_entries)
+    return lambda: build_guidance_text(category, "friend")
+
+
+@case("parse_ai_json", items=[1, 25, 250])
+def _parse_ai_json(items: int):
+    if items == 1:
+        text = "```json\n" + json.dumps(INSIGHT, indent=2) + "\n```"
+    else:
+        text = json.dumps([{"id": f"user-{i}", **INSIGHT} for i in range(items)])
+    return lambda: parse_ai_json(text)
+
+
+@case("sanitize_name", name_length=[5, 50])
+def _sanitize_name(name_length: int):
+    name = ("Mary-Jane O'Neil " * 4)[:name_length].strip()
+    payload = {"name": f"  {name}  "}
+    return lambda: InsightRequest.model_validate(payload)
+
+
+@case("circuit_breaker_call", state=["closed", "open"])
+def _breaker_call(state: str):
+    breaker = CircuitBreaker("bench", timeout=3600)
+    if state == "open":
+        breaker._open()
+
+        def op():
+            try:
+                breaker.call(int)
+            except CircuitOpenError:
+                pass
+        return op
+    return lambda: breaker.call(int)
+
+
+# ---- runner ----
+
+def _calibrate() -> Callable[[], object]:
+    data = list(range(200))
+    return lambda: sum(x * x for x in data)
+
+
+def time_op(op: Callable[[], object]) -> float:
+    """Best per-call time in seconds over REPEATS auto-ranged repeats."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_REPEAT_SECONDS:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(MIN_REPEAT_SECONDS / elapsed * 1.2))
+    best = elapsed / loops
+    for _ in range(REPEATS - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            op()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def select(name_filter: str | None = None) -> Dict[str, Callable[[], Callable[[], object]]]:
+    """Case id -> setup for every registered case whose name contains `name_filter`."""
+    return {
+        case_id(name, params): setup
+        for name, variants in CASES.items()
+        if not name_filter or name_filter in name
+        for params, setup in variants
+    }
+
+
+def run(cases: Dict[str, Callable[[], Callable[[], object]]], runs: int = 3) -> Dict:
+    """Time every case `runs` times and keep the median of each."""
+    original_kb = knowledge_retriever._COMPILED_KB
+    calibrate = _calibrate()
+    calibrations = []
+    results = {}
+    try:
+        for key, setup in cases.items():
+            op = setup()
+            samples = []
+            for _ in range(runs):
+                # Calibrate next to each measurement so clock drift during the run cancels out
+                calibration = time_op(calibrate)
+                calibrations.append(calibration)
+                ns = time_op(op) * 1e9
+                samples.append((ns / (calibration * 1e9), ns))
+            relative, ns = statistics.median_low(samples)
+            results[key] = {
+                "ns_per_op": round(ns, 1),
+                "relative": round(relative, 4),
+            }
+    finally:
+        knowledge_retriever._COMPILED_KB = original_kb
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "calibration_ns": round(min(calibrations, default=0.0) * 1e9, 1),
+        "results": results,
+    }
+
+
+def keep_best(current: Dict, rerun: Dict) -> None:
+    """Keep the cheaper measurement of each case from `rerun` in `current`."""
+    for key, result in rerun["results"].items():
+        if result["relative"] < current["results"][key]["relative"]:
+            current["results"][key] = result
+
+
+def gated(result: Dict, base: Dict) -> bool:
+    """Whether a case is slow enough for its timing to be trusted by the gate."""
+    return max(result["ns_per_op"], base["ns_per_op"]) >= NOISE_FLOOR_NS
+
+
+def regressed(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    base_results = baseline.get("results", {})
+    return [
+        key for key, result in current["results"].items()
+        if key in base_results and gated(result, base_results[key])
+        and result["relative"] / base_results[key]["relative"] - 1 > tolerance
+    ]
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> None:
+    """Print a comparison table against the baseline."""
+    base_results = baseline.get("results", {})
+    print(f"{'case':<46} {'ns/op':>12} {'baseline':>12} {'change':>8}")
+    for key, result in current["results"].items():
+        base = base_results.get(key)
+        if base is None:
+            print(f"{key:<46} {result['ns_per_op']:>12.1f} {'-':>12} {'new':>8}")
+            continue
+        change = result["relative"] / base["relative"] - 1
+        if not gated(result, base):
+            flag = "  (below noise floor)"
+        else:
+            flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{key:<46} {result['ns_per_op']:>12.1f} {base['ns_per_op']:>12.1f} "
+              f"{change:>+7.0%}{flag}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Write results JSON here")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed growth in relative cost before failing (0.5 = +50%%)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Measurements per case; the median is compared")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Re-measure apparently regressed cases this many times, keeping the best")
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    cases = select(args.filter)
+    current = run(cases, args.runs)
+
+    if args.update_baseline:
+        # A baseline measured on a noisy moment would flag every later run
+        for _ in range(args.retries):
+            keep_best(current, run(cases, args.runs))
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline} ({len(current['results'])} cases)")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline first")
+        return 1
+
+    baseline = json.loads(args.baseline.read_text())
+    # Timer noise is one-sided, so a real regression survives re-measuring
+    for _ in range(args.retries):
+        suspects = regressed(current, baseline, args.tolerance)
+        if not suspects:
+            break
+        keep_best(current, run({key: cases[key] for key in suspects}, args.runs))
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2) + "\n")
+
+    compare(current, baseline, args.tolerance)
+    regressions = regressed(current, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}: "
+              + ", ".join(regressions))
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())